@@ -20,12 +20,22 @@ st.set_page_config(
 
 
 # ── CSS ──
+_CSS_PATHS = tuple(
+    Path(__file__).parent / "assets" / "styles" / name
+    for name in ("main.css", "rtl.css")
+)
+
+
+@st.cache_resource
+def _css_blob(mtimes: tuple) -> str:
+    """Read the stylesheets once per mtime snapshot and return one <style> blob."""
+    css = "\n".join(p.read_text(encoding="utf-8") for p in _CSS_PATHS if p.exists())
+    return f"<style>{css}</style>"
+
+
 def _load_css():
-    base = Path(__file__).parent / "assets" / "styles"
-    for name in ("main.css", "rtl.css"):
-        p = base / name
-        if p.exists():
-            st.markdown(f"<style>{p.read_text(encoding='utf-8')}</style>", unsafe_allow_html=True)
+    mtimes = tuple(p.stat().st_mtime if p.exists() else None for p in _CSS_PATHS)
+    st.markdown(_css_blob(mtimes), unsafe_allow_html=True)
 
 
 _load_css()
@@ -40,39 +50,53 @@ def _init_settings():
         import os
         os.environ.setdefault("AI_PROVIDER", "gemini")
         from config.settings import Settings
-        return Settings()
+        return Settings.from_env()
 
 
 _init_settings()
 
 
 # ── Session state ──
-for _k, _v in {"case_counter": 1, "current_case": None, "current_case_graph": None}.items():
+for _k, _v in {"case_counter": 1, "current_case": None, "current_case_graph": None,
+               "current_case_stats": None}.items():
     if _k not in st.session_state:
         st.session_state[_k] = _v
 
 
+# ── Static markup ──
+HEADER_HTML = (
+    "<div style='text-align:center; padding:1rem 0 0.5rem;'>"
+    "<svg xmlns='http://www.w3.org/2000/svg' width='40' height='40' viewBox='0 0 24 24' fill='none' "
+    "stroke='#a1a1aa' stroke-width='1.5' stroke-linecap='round' stroke-linejoin='round' "
+    "style='display:inline-block; margin-bottom:0.5rem;'>"
+    "<path d='M12 3c.132 0 .263 0 .393 0a7.5 7.5 0 0 0 7.92 12.446a9 9 0 1 1 -8.313-12.454z'/>"
+    "<path d='M17 4a2 2 0 0 0 2 2a2 2 0 0 0 -2 2a2 2 0 0 0 -2 -2a2 2 0 0 0 2 -2'/>"
+    "<path d='M19 11h2m-1 -1v2'/>"
+    "</svg>"
+    "<h1 style='margin:0; font-size:1.75rem; font-weight:700; color:#fafafa;'>دادیار هوشمند</h1>"
+    "<p style='color:#71717a; font-size:0.9rem; margin:0.25rem 0 0;'>"
+    "تحلیل هوشمند پرونده‌های غصب و خلع ید"
+    "</p>"
+    "</div>"
+)
+
+FOOTER_PREFIX = (
+    "<div style='text-align:center; padding:0.5rem 0; color:#52525b; font-size:0.8rem;'>"
+    "توسعه‌دهنده: مهسا میرزایی &middot; "
+)
+FOOTER_SUFFIX = (
+    " &middot; "
+    "نسخه ۱.۲.۰"
+    "</div>"
+)
+
+
 # ── Main ──
 def main():
     sidebar.render_sidebar(st.session_state.current_case)
 
     # Header
-    st.markdown(
-        "<div style='text-align:center; padding:1rem 0 0.5rem;'>"
-        "<svg xmlns='http://www.w3.org/2000/svg' width='40' height='40' viewBox='0 0 24 24' fill='none' "
-        "stroke='#a1a1aa' stroke-width='1.5' stroke-linecap='round' stroke-linejoin='round' "
-        "style='display:inline-block; margin-bottom:0.5rem;'>"
-        "<path d='M12 3c.132 0 .263 0 .393 0a7.5 7.5 0 0 0 7.92 12.446a9 9 0 1 1 -8.313-12.454z'/>"
-        "<path d='M17 4a2 2 0 0 0 2 2a2 2 0 0 0 -2 2a2 2 0 0 0 -2 -2a2 2 0 0 0 2 -2'/>"
-        "<path d='M19 11h2m-1 -1v2'/>"
-        "</svg>"
-        "<h1 style='margin:0; font-size:1.75rem; font-weight:700; color:#fafafa;'>دادیار هوشمند</h1>"
-        "<p style='color:#71717a; font-size:0.9rem; margin:0.25rem 0 0;'>"
-        "تحلیل هوشمند پرونده‌های غصب و خلع ید"
-        "</p>"
-        "</div>",
-        unsafe_allow_html=True,
-    )
+    st.markdown(HEADER_HTML, unsafe_allow_html=True)
 
     # Tabs
     tab_input, tab_analysis, tab_graph = st.tabs([
@@ -96,6 +120,9 @@ def main():
             cached = st.session_state.get(cache_key, {})
             if "graph" in cached:
                 st.session_state.current_case_graph = cached["graph"]
+                # Analyses cached before stats were stored lack the key; the
+                # graph tab then computes the stats from the graph itself
+                st.session_state.current_case_stats = cached.get("graph_stats")
         else:
             st.info("ابتدا اطلاعات پرونده را در تب «ورودی پرونده» وارد کنید.")
 
@@ -108,11 +135,7 @@ def main():
     provider_label = "OpenAI" if provider == "openai" else "Gemini"
     model_label = st.session_state.get("ai_model", "") or "default"
     st.markdown(
-        f"<div style='text-align:center; padding:0.5rem 0; color:#52525b; font-size:0.8rem;'>"
-        f"توسعه‌دهنده: مهسا میرزایی &middot; "
-        f"{provider_label} ({model_label}) &middot; "
-        f"نسخه ۱.۲.۰"
-        f"</div>",
+        FOOTER_PREFIX + f"{provider_label} ({model_label})" + FOOTER_SUFFIX,
         unsafe_allow_html=True,
     )
 
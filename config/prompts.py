@@ -82,24 +82,57 @@ LEGAL_REASONING_PROMPT = """شما در حال تحلیل یک پرونده غص
 # =================================================================
 # Article Applicability Analysis Prompt
 # =================================================================
+# Static instructions and the case facts (shared by every article of a case)
+# come first and the per-article text last, so consecutive calls share the
+# longest possible prefix for the provider's automatic prompt caching.
 
 ARTICLE_APPLICABILITY_PROMPT = """بر اساس ماده قانونی زیر و واقعیات پرونده، تحلیل کنید که این ماده چگونه قابل اعمال است.
 
-ماده {article_number}: {article_title}
-متن ماده: {article_text}
+لطفاً به سوالات زیر پاسخ دهید:
+
+۱. آیا این ماده به پرونده مرتبط است؟ (بله/خیر)
+۲. چرا این ماده مرتبط یا نامرتبط است؟
+۳. کدام عناصر پرونده با این ماده تطابق دارند؟
+۴. چه نتیجه حقوقی از اعمال این ماده حاصل می‌شود؟
+۵. سطح اطمینان شما به این تحلیل چقدر است؟ (درصد)
+
+پاسخ را به صورت ساختاریافته و مختصر ارائه دهید.
 
 واقعیات پرونده:
 {case_facts}
 
-لطفاً به سوالات زیر پاسخ دهید:
+ماده {article_number}: {article_title}
+متن ماده: {article_text}"""
+
+# Same questions for all retrieved articles in a single JSON-mode request
+# (enabled with BATCH_ARTICLE_ANALYSIS); facts first, articles last as above.
+
+BATCH_ARTICLE_APPLICABILITY_PROMPT = """برای هر یک از مواد قانونی زیر، بر اساس واقعیات پرونده تحلیل کنید که آن ماده چگونه قابل اعمال است.
+
+برای هر ماده به سوالات زیر پاسخ دهید:
 
 ۱. آیا این ماده به پرونده مرتبط است؟ (بله/خیر)
 ۲. چرا این ماده مرتبط یا نامرتبط است؟
 ۳. کدام عناصر پرونده با این ماده تطابق دارند؟
 ۴. چه نتیجه حقوقی از اعمال این ماده حاصل می‌شود؟
-۵. سطح اطمینان شما به این تحلیل چقدر است؟ (درصد)
 
-پاسخ را به صورت ساختاریافته و مختصر ارائه دهید."""
+خروجی را فقط به صورت JSON و با ساختار زیر ارائه دهید:
+
+{{
+  "analyses": [
+    {{
+      "article_number": "شماره ماده (عدد)",
+      "analysis": "پاسخ ساختاریافته و مختصر به سوالات بالا",
+      "confidence": "سطح اطمینان شما به این تحلیل (عدد ۰ تا ۱۰۰)"
+    }}
+  ]
+}}
+
+واقعیات پرونده:
+{case_facts}
+
+مواد قانونی:
+{articles}"""
 
 # =================================================================
 # Deduction Generation Prompt
@@ -125,18 +158,11 @@ DEDUCTION_GENERATION_PROMPT = """بر اساس تحلیل‌های انجام ش
 # Verdict Generation Prompt
 # =================================================================
 
+# Static instructions come first and the case data last, so every verdict
+# request shares the same token prefix (after the system prompt) and the
+# provider's automatic prompt caching can reuse it across cases
 VERDICT_GENERATION_PROMPT = """بر اساس زنجیره استدلال کامل، حکم نهایی پرونده را صادر کنید.
 
-زنجیره استدلال:
-{reasoning_chain}
-
-واقعیات پرونده:
-{case_facts}
-
-اطلاعات طرفین:
-خواهان: {plaintiff}
-خوانده: {defendant}
-
 حکم باید شامل بخش‌های زیر باشد:
 
 ۱. **خلاصه پرونده**
@@ -157,7 +183,17 @@ VERDICT_GENERATION_PROMPT = """بر اساس زنجیره استدلال کام
 ۵. **قابل اعتراض**
    - مهلت و نحوه اعتراض
 
-حکم را به زبان رسمی و حقوقی فارسی تنظیم کنید."""
+حکم را به زبان رسمی و حقوقی فارسی تنظیم کنید.
+
+زنجیره استدلال:
+{reasoning_chain}
+
+واقعیات پرونده:
+{case_facts}
+
+اطلاعات طرفین:
+خواهان: {plaintiff}
+خوانده: {defendant}"""
 
 # =================================================================
 # Confidence Scoring Prompt
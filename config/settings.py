@@ -1,17 +1,30 @@
 """
 Configuration settings for the Judicial Decision-Making Simulator.
 
-This module uses Pydantic Settings for type-safe configuration management.
+Settings are a frozen, slotted dataclass parsed from environment variables.
 All settings can be overridden via environment variables defined in .env file.
 
 Author: Master's Thesis Project - Mahsa Mirzaei
 """
 
-from pydantic_settings import BaseSettings
+import os
+from dataclasses import dataclass, fields
 from typing import Optional
 
+from dotenv import load_dotenv
 
-class Settings(BaseSettings):
+
+def _parse_bool(value: str) -> bool:
+    """Parse a boolean environment value ("true"/"1"/"yes"/"on")."""
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Converters from raw environment strings, keyed by field annotation
+_CASTS = {bool: _parse_bool, int: int, float: float, str: str}
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
     """
     Application settings loaded from environment variables.
 
@@ -31,12 +44,16 @@ class Settings(BaseSettings):
     OPENAI_MODEL: str = "gpt-4-turbo-preview"  # Default to GPT-4 Turbo for best reasoning
     OPENAI_TEMPERATURE: float = 0.3  # Low temperature for consistent legal reasoning
     OPENAI_MAX_TOKENS: int = 2000  # Maximum tokens per completion
+    OPENAI_RPM_LIMIT: int = 500  # Client-side cap on chat requests per minute (0 = no cap)
+    OPENAI_TPM_LIMIT: int = 0  # Client-side cap on chat tokens (prompt + max_tokens) per minute, e.g. your tier's TPM (0 = no cap)
+    OPENAI_ECONOMY_MODEL: str = ""  # Cheaper model for verdict drafting, e.g. gpt-4o-mini ("" = use OPENAI_MODEL)
 
     # =================================================================
     # OpenAI Embedding Configuration (for RAG)
     # =================================================================
     EMBEDDING_MODEL: str = "text-embedding-3-small"  # OpenAI embedding model
     EMBEDDING_DIMENSION: int = 1536  # Dimension of embedding vectors
+    EMBEDDING_BATCH_SIZE: int = 100  # Texts per embeddings request (Gemini max 100, OpenAI max 2048)
 
     # =================================================================
     # Gemini Configuration (free-tier alternative)
@@ -45,6 +62,8 @@ class Settings(BaseSettings):
     GEMINI_MODEL: str = "gemini-2.0-flash"  # Free model: 15 RPM, 1M tokens/day
     GEMINI_EMBEDDING_MODEL: str = "models/text-embedding-004"  # Gemini embedding model
     GEMINI_EMBEDDING_DIMENSION: int = 768  # Dimension of Gemini embedding vectors
+    GEMINI_RPM_LIMIT: int = 14  # Client-side cap on generate requests per minute (free tier: 15)
+    GEMINI_ECONOMY_MODEL: str = ""  # Cheaper model for verdict drafting ("" = use GEMINI_MODEL)
 
     # =================================================================
     # RAG (Retrieval-Augmented Generation) Configuration
@@ -52,6 +71,21 @@ class Settings(BaseSettings):
     TOP_K_ARTICLES: int = 5  # Number of articles to retrieve from knowledge base
     SIMILARITY_THRESHOLD: float = 0.7  # Minimum similarity score for relevance
 
+    # =================================================================
+    # Reasoning Configuration
+    # =================================================================
+    BATCH_ARTICLE_ANALYSIS: bool = False  # Analyze all retrieved articles in one JSON request
+    VERDICT_CACHE_TTL: int = 604800  # Seconds a verdict is reused for an identical case (0 = off)
+    VERDICT_ESCALATION_CONFIDENCE: float = 0.6  # Below this confidence the verdict uses the main model
+
+    # =================================================================
+    # Semantic Response Cache (reuse answers to near-identical prompts)
+    # =================================================================
+    # Only consulted for calls that opt in (semantic_cache=True), i.e. prompts
+    # without case-specific names, dates or amounts
+    SEMANTIC_CACHE_ENABLED: bool = False  # Off by default: costs one embedding call per cache miss
+    SEMANTIC_CACHE_THRESHOLD: float = 0.97  # Minimum prompt cosine similarity for a hit
+
     # =================================================================
     # UI Configuration
     # =================================================================
@@ -78,11 +112,30 @@ class Settings(BaseSettings):
     NODE_COLOR_DEDUCTION: str = "#f59e0b"  # Yellow for deductions
     NODE_COLOR_VERDICT: str = "#ef4444"  # Red for final verdict
 
-    class Config:
-        """Pydantic configuration"""
-        env_file = ".env"  # Load from .env file
-        env_file_encoding = "utf-8"  # Support Persian text in .env
-        case_sensitive = True  # Environment variable names are case-sensitive
+    @classmethod
+    def from_env(cls, env_file: str = ".env") -> "Settings":
+        """
+        Build settings from environment variables and the .env file.
+
+        Real environment variables take precedence over .env entries.
+        Names are case-sensitive and unset fields keep their defaults.
+
+        Args:
+            env_file: Path to the .env file (UTF-8, may contain Persian text)
+
+        Returns:
+            Settings: Parsed settings
+
+        Raises:
+            ValueError: If a numeric variable cannot be parsed
+        """
+        load_dotenv(env_file, encoding="utf-8", override=False)
+        values = {}
+        for f in fields(cls):
+            raw = os.environ.get(f.name)
+            if raw is not None:
+                values[f.name] = _CASTS[f.type](raw)
+        return cls(**values)
 
 
 # Global settings instance
@@ -95,7 +148,7 @@ def get_settings() -> Settings:
     Get the global settings instance.
 
     Returns:
-        Settings: The application settings singleton
+        Settings: Application settings
 
     Note:
         For thesis purposes: This lazy initialization pattern ensures settings
@@ -104,5 +157,5 @@ def get_settings() -> Settings:
     """
     global _settings_instance
     if _settings_instance is None:
-        _settings_instance = Settings()
+        _settings_instance = Settings.from_env()
     return _settings_instance
@@ -62,6 +62,7 @@ hidden_imports = streamlit_hiddenimports + [
     'sklearn.feature_extraction.text',
     'sklearn.metrics',
     'sklearn.metrics.pairwise',
+    'joblib',
     'numpy',
     'pandas',
     # Graph & Viz
@@ -72,10 +73,10 @@ hidden_imports = streamlit_hiddenimports + [
     'kaleido',
     # Utilities
     'pydantic',
-    'pydantic_settings',
     'jdatetime',
     'dotenv',
     'jsonschema',
+    'orjson',
 ] + collect_submodules('google.genai') + collect_submodules('hazm')
 
 
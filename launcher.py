@@ -7,7 +7,6 @@ This file is the entry point for PyInstaller builds.
 import sys
 import os
 import socket
-import subprocess
 import threading
 import time
 import webbrowser
@@ -22,27 +21,42 @@ def _get_base_dir() -> Path:
     return Path(__file__).resolve().parent
 
 
-def _find_free_port(start: int = 8501, end: int = 8599) -> int:
-    """Find a free port in the given range."""
-    for port in range(start, end):
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            try:
-                s.bind(("127.0.0.1", port))
-                return port
-            except OSError:
-                continue
-    return start
+def _find_free_port(preferred: int = 8501) -> int:
+    """Use the preferred port if it is free, otherwise let the OS pick one."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        try:
+            s.bind(("127.0.0.1", preferred))
+            return preferred
+        except OSError:
+            pass
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
 
 
 def _open_browser(port: int, max_wait: int = 30):
     """Wait for the server to be ready, then open the browser."""
-    for _ in range(max_wait * 2):
-        try:
-            with socket.create_connection(("127.0.0.1", port), timeout=1):
+    delay = 0.05
+    deadline = time.monotonic() + max_wait
+    while time.monotonic() < deadline:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.settimeout(1)
+            try:
+                s.connect(("127.0.0.1", port))
+            except OSError:
+                pass
+            else:
                 webbrowser.open(f"http://localhost:{port}")
                 return
-        except (ConnectionRefusedError, OSError):
-            time.sleep(0.5)
+        # Back off from 50 ms up to 500 ms — the server is usually up within a second
+        time.sleep(delay)
+        delay = min(delay * 1.5, 0.5)
+
+
+def _run_streamlit():
+    """Import and run Streamlit's CLI; deferred so the launcher itself starts fast."""
+    from streamlit.web.cli import main as st_main
+    st_main()
 
 
 def main():
@@ -63,29 +77,19 @@ def main():
     # Open browser in background thread
     threading.Thread(target=_open_browser, args=(port,), daemon=True).start()
 
-    # Launch Streamlit
+    # Launch Streamlit in-process via its CLI (same path in dev and PyInstaller);
+    # Streamlit installs its own SIGINT handler and shuts the server down on Ctrl+C
+    sys.argv = [
+        "streamlit", "run", app_py,
+        "--server.port", str(port),
+        "--server.headless", "true",
+    ]
     if getattr(sys, "frozen", False):
-        # Inside PyInstaller bundle — run streamlit via its Python API
-        sys.argv = [
-            "streamlit", "run", app_py,
-            "--server.port", str(port),
-            "--server.headless", "true",
+        sys.argv += [
             "--browser.gatherUsageStats", "false",
             "--global.developmentMode", "false",
         ]
-        from streamlit.web.cli import main as st_main
-        st_main()
-    else:
-        # Dev mode — subprocess
-        cmd = [
-            sys.executable, "-m", "streamlit", "run", app_py,
-            "--server.port", str(port),
-            "--server.headless", "true",
-        ]
-        try:
-            subprocess.run(cmd)
-        except KeyboardInterrupt:
-            print("\n👋 خداحافظ!")
+    _run_streamlit()
 
 
 if __name__ == "__main__":
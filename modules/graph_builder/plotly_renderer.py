@@ -14,13 +14,135 @@ Features:
 Author: Master's Thesis Project - Mahsa Mirzaei
 """
 
+from __future__ import annotations
+
+import hashlib
 import networkx as nx
-import plotly.graph_objects as go
-from typing import Dict, Any, List, Tuple, Optional
-import numpy as np
+from typing import TYPE_CHECKING, Dict, Any, List, Tuple, Optional
+import streamlit as st
 
 from config.settings import get_settings
 
+# Plotly and NumPy are imported inside the functions that use them so that
+# importing this module (on every Streamlit rerun) stays cheap
+if TYPE_CHECKING:
+    import numpy as np
+    import plotly.graph_objects as go
+
+
+# Layer codes (the node_type ints stored by ReasoningGraph, FACT → ARTICLE →
+# DEDUCTION → VERDICT) and the Y of each layer
+_FACT, _ARTICLE, _DEDUCTION, _VERDICT = 0, 1, 2, 3
+_LAYER_CODES = frozenset((_FACT, _ARTICLE, _DEDUCTION, _VERDICT))
+_LAYER_Y = (0.9, 0.6, 0.3, 0.0)
+
+# Single-character ellipsis keeps hover payloads smaller than "..."
+TRUNC_MARKER = "…"
+
+# Above this many nodes + edges, traces use WebGL (Scattergl) instead of SVG;
+# below it SVG is cheaper because WebGL has a higher fixed startup cost
+_WEBGL_THRESHOLD = 100
+
+# Cached figures: at most this many graph/size combinations, each kept for
+# at most this many seconds
+_RENDER_CACHE_ENTRIES = 32
+_RENDER_CACHE_TTL = 3600
+
+# Hover tooltips are formatted in the browser from each trace's customdata
+# columns: [label, article number, confidence, text preview]
+_HOVER_TEMPLATE = (
+    "<b>%{customdata[0]}</b>"
+    "<br>اطمینان: %{customdata[2]:.0%}"
+    "<br><br>%{customdata[3]}<extra></extra>"
+)
+_ARTICLE_HOVER_TEMPLATE = (
+    "<b>%{customdata[0]}</b>"
+    "<br>شماره ماده: %{customdata[1]}"
+    "<br>اطمینان: %{customdata[2]:.0%}"
+    "<br><br>%{customdata[3]}<extra></extra>"
+)
+
+
+# Layout properties that do not depend on settings or figure size; built once
+# and applied in the same update_layout call as the per-render properties
+_STATIC_LAYOUT = dict(
+    showlegend=True,
+    hovermode='closest',
+    margin=dict(b=20, l=5, r=5, t=80),
+    plot_bgcolor='#0f172a',  # Dark background
+    paper_bgcolor='#020617',  # Darker outer background
+    xaxis=dict(
+        showgrid=False,
+        zeroline=False,
+        showticklabels=False,
+        range=[-0.05, 1.05]
+    ),
+    yaxis=dict(
+        showgrid=False,
+        zeroline=False,
+        showticklabels=False,
+        range=[-0.1, 1.0]
+    ),
+    # Enable drag mode for better interaction
+    dragmode='pan',
+    modebar=dict(
+        bgcolor='#1e293b',
+        color='#94a3b8',
+        activecolor='#3b82f6'
+    ),
+)
+
+
+def _layout_kernel(layer_ids: np.ndarray) -> np.ndarray:
+    """
+    Compute hierarchical positions for nodes given their layer codes.
+
+    A lone node is centered; otherwise nodes are spread evenly across
+    [0.1, 0.9] in insertion order within their layer.
+
+    Args:
+        layer_ids: (N,) int array of layer codes
+
+    Returns:
+        (N, 2) float64 array of (x, y) coordinates
+    """
+    import numpy as np
+
+    n = layer_ids.shape[0]
+    counts = np.bincount(layer_ids, minlength=len(_LAYER_Y))
+
+    # Rank of each node inside its layer (stable sort keeps insertion order)
+    order = np.argsort(layer_ids, kind='stable')
+    starts = np.cumsum(counts) - counts
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n) - np.repeat(starts, counts)
+
+    layer_sizes = counts[layer_ids]
+    x = np.where(
+        layer_sizes > 1,
+        0.1 + 0.8 * rank / np.maximum(layer_sizes - 1, 1),
+        0.5,
+    )
+    return np.column_stack((x, np.asarray(_LAYER_Y)[layer_ids]))
+
+
+@st.cache_resource(show_spinner=False, max_entries=_RENDER_CACHE_ENTRIES, ttl=_RENDER_CACHE_TTL)
+def _cached_render(
+    fingerprint: str,
+    width: int,
+    height: int,
+    _renderer: "PlotlyRenderer",
+    _graph: nx.DiGraph,
+) -> go.Figure:
+    """
+    Build a figure once per graph fingerprint and size.
+
+    Underscore-prefixed arguments are not hashed by Streamlit; the
+    fingerprint alone identifies the graph. The returned figure is shared
+    between sessions and reruns, so callers get a copy (see render()).
+    """
+    return _renderer._build_figure(_graph, width, height)
+
 
 class PlotlyRenderer:
     """
@@ -51,24 +173,82 @@ class PlotlyRenderer:
         width = width or self.settings.GRAPH_WIDTH
         height = height or self.settings.GRAPH_HEIGHT
 
+        import plotly.graph_objects as go
+
+        # Copy the shared cached figure so callers can update it safely
+        return go.Figure(_cached_render(self._fingerprint(graph), width, height, self, graph))
+
+    @staticmethod
+    def _fingerprint(graph: nx.DiGraph) -> str:
+        """
+        Identify a graph by its content, so reruns and rebuilt copies of the
+        same graph reuse one cached figure.
+
+        Graphs from ReasoningGraph carry the builder's content hash; for any
+        other graph every node and edge attribute is hashed (via repr, since
+        attribute values may be unhashable). blake2b is used rather than
+        hash(), which is salted per process.
+        """
+        content_key = graph.graph.get("content_key")
+        if content_key:
+            return content_key
+        payload = repr((
+            [(node, sorted(attrs.items())) for node, attrs in graph.nodes(data=True)],
+            [(u, v, sorted(attrs.items())) for u, v, attrs in graph.edges(data=True)],
+        ))
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _build_figure(self, graph: nx.DiGraph, width: int, height: int) -> go.Figure:
+        """
+        Build the Plotly figure from scratch (uncached).
+
+        Args:
+            graph: NetworkX directed graph
+            width: Figure width in pixels
+            height: Figure height in pixels
+
+        Returns:
+            Plotly Figure object
+        """
+        import plotly.graph_objects as go
+
+        s = self.settings
+        font = s.FONT_FAMILY
+        colors = {
+            _FACT: s.NODE_COLOR_FACT,
+            _ARTICLE: s.NODE_COLOR_ARTICLE,
+            _DEDUCTION: s.NODE_COLOR_DEDUCTION,
+            _VERDICT: s.NODE_COLOR_VERDICT,
+        }
+
+        if graph.number_of_nodes() + graph.number_of_edges() > _WEBGL_THRESHOLD:
+            scatter_cls = go.Scattergl
+        else:
+            scatter_cls = go.Scatter
+
         # Calculate hierarchical layout
-        pos = self._calculate_hierarchical_layout(graph)
+        node_ids, coords, index, layer_codes = self._calculate_hierarchical_layout(graph)
 
         # Create edge traces
-        edge_trace = self._create_edge_trace(graph, pos)
+        edge_trace = self._create_edge_trace(graph, coords, index, scatter_cls)
 
         # Create node traces (one per node type for legend)
-        node_traces = self._create_node_traces(graph, pos)
+        node_traces = self._create_node_traces(
+            graph, coords, layer_codes, font, colors, scatter_cls
+        )
 
         # Combine all traces
         fig = go.Figure(data=[edge_trace] + node_traces)
 
         # Configure layout
-        fig = self._configure_layout(fig, width, height)
+        fig = self._configure_layout(fig, width, height, font)
 
         return fig
 
-    def _calculate_hierarchical_layout(self, graph: nx.DiGraph) -> Dict[str, Tuple[float, float]]:
+    def _calculate_hierarchical_layout(
+        self,
+        graph: nx.DiGraph
+    ) -> Tuple[List[Any], np.ndarray, Dict[Any, int], np.ndarray]:
         """
         Calculate hierarchical node positions.
 
@@ -78,68 +258,65 @@ class PlotlyRenderer:
             graph: NetworkX graph
 
         Returns:
-            Dict mapping node ID to (x, y) position
+            Tuple of (node IDs, (N, 2) float64 coordinates, node ID -> row index,
+            (N,) int layer codes)
         """
-        # Define layer order and Y positions
-        layers = {
-            'FACT': (0, 0.9),
-            'ARTICLE': (1, 0.6),
-            'DEDUCTION': (2, 0.3),
-            'VERDICT': (3, 0.0)
-        }
+        import numpy as np
 
-        # Group nodes by type
-        nodes_by_layer = {}
+        node_ids = []
+        layer_codes = []
         for node_id, data in graph.nodes(data=True):
-            node_type = data.get('node_type')
-            if node_type not in nodes_by_layer:
-                nodes_by_layer[node_type] = []
-            nodes_by_layer[node_type].append(node_id)
-
-        # Calculate positions
-        pos = {}
-        for node_type, (layer_index, y_base) in layers.items():
-            nodes = nodes_by_layer.get(node_type, [])
-            num_nodes = len(nodes)
-
-            if num_nodes == 0:
-                continue
-
-            # Distribute nodes horizontally across the layer
-            for i, node_id in enumerate(nodes):
-                # Center nodes if only one or two
-                if num_nodes == 1:
-                    x = 0.5
-                else:
-                    # Spread nodes evenly
-                    x = 0.1 + (i / (num_nodes - 1)) * 0.8
+            code = data.get('node_type')
+            if code in _LAYER_CODES:
+                node_ids.append(node_id)
+                layer_codes.append(code)
 
-                pos[node_id] = (x, y_base)
+        layer_codes = np.asarray(layer_codes, dtype=np.int64)
+        coords = _layout_kernel(layer_codes)
+        index = {node_id: i for i, node_id in enumerate(node_ids)}
 
-        return pos
+        return node_ids, coords, index, layer_codes
 
-    def _create_edge_trace(self, graph: nx.DiGraph, pos: Dict) -> go.Scatter:
+    def _create_edge_trace(
+        self,
+        graph: nx.DiGraph,
+        coords: np.ndarray,
+        index: Dict[Any, int],
+        scatter_cls: type
+    ) -> go.Scatter:
         """
         Create edge trace for graph connections.
 
         Args:
             graph: NetworkX graph
-            pos: Node positions
+            coords: (N, 2) node coordinates
+            index: Node ID -> row in coords
+            scatter_cls: go.Scatter (SVG) or go.Scattergl (WebGL)
 
         Returns:
             Plotly Scatter trace for edges
         """
-        edge_x = []
-        edge_y = []
-
-        for edge in graph.edges():
-            x0, y0 = pos[edge[0]]
-            x1, y1 = pos[edge[1]]
-
-            edge_x.extend([x0, x1, None])
-            edge_y.extend([y0, y1, None])
-
-        edge_trace = go.Scatter(
+        import numpy as np
+
+        num_edges = graph.number_of_edges()
+
+        edges_arr = np.fromiter(
+            (index[n] for edge in graph.edges() for n in edge),
+            dtype=np.int64,
+            count=2 * num_edges,
+        ).reshape(-1, 2)
+        src = coords[edges_arr[:, 0]]
+        dst = coords[edges_arr[:, 1]]
+
+        # Each edge is drawn as [x0, x1, NaN] so Plotly breaks the line between edges
+        edge_x = np.full(3 * num_edges, np.nan)
+        edge_y = np.full(3 * num_edges, np.nan)
+        edge_x[0::3] = src[:, 0]
+        edge_x[1::3] = dst[:, 0]
+        edge_y[0::3] = src[:, 1]
+        edge_y[1::3] = dst[:, 1]
+
+        edge_trace = scatter_cls(
             x=edge_x,
             y=edge_y,
             mode='lines',
@@ -153,72 +330,80 @@ class PlotlyRenderer:
 
         return edge_trace
 
-    def _create_node_traces(self, graph: nx.DiGraph, pos: Dict) -> List[go.Scatter]:
+    def _create_node_traces(
+        self,
+        graph: nx.DiGraph,
+        coords: np.ndarray,
+        layer_codes: np.ndarray,
+        font: str,
+        colors: Dict[int, str],
+        scatter_cls: type
+    ) -> List[go.Scatter]:
         """
         Create node traces (one per node type for legend).
 
         Args:
             graph: NetworkX graph
-            pos: Node positions
+            coords: (N, 2) node coordinates
+            layer_codes: (N,) layer code per coords row, in graph node order
+            font: Font family for labels and hover text
+            colors: Node color per layer code
+            scatter_cls: go.Scatter (SVG) or go.Scattergl (WebGL)
 
         Returns:
             List of Plotly Scatter traces
         """
-        # Group nodes by type
+        import numpy as np
+
         node_groups = {
-            'FACT': {'nodes': [], 'color': self.settings.NODE_COLOR_FACT, 'label': 'واقعیات'},
-            'ARTICLE': {'nodes': [], 'color': self.settings.NODE_COLOR_ARTICLE, 'label': 'مواد قانونی'},
-            'DEDUCTION': {'nodes': [], 'color': self.settings.NODE_COLOR_DEDUCTION, 'label': 'نتیجه‌گیری'},
-            'VERDICT': {'nodes': [], 'color': self.settings.NODE_COLOR_VERDICT, 'label': 'حکم نهایی'}
+            _FACT: {'color': colors[_FACT], 'label': 'واقعیات'},
+            _ARTICLE: {'color': colors[_ARTICLE], 'label': 'مواد قانونی'},
+            _DEDUCTION: {'color': colors[_DEDUCTION], 'label': 'نتیجه‌گیری'},
+            _VERDICT: {'color': colors[_VERDICT], 'label': 'حکم نهایی'}
         }
 
-        for node_id, data in graph.nodes(data=True):
-            node_type = data.get('node_type')
-            if node_type in node_groups:
-                node_groups[node_type]['nodes'].append((node_id, data))
-
-        # Create trace for each node type
-        traces = []
+        # Rows of each group come straight from the layout's layer codes, so
+        # buffers are sized up front and nodes are walked only once
         for node_type, group_data in node_groups.items():
-            if not group_data['nodes']:
-                continue
-
-            node_x = []
-            node_y = []
-            node_text = []
-            node_sizes = []
-            hover_text = []
+            rows = np.flatnonzero(layer_codes == node_type)
+            group_data['rows'] = rows
+            group_data['sizes'] = np.empty(rows.shape[0], dtype=np.float64)
+            group_data['text'] = [None] * rows.shape[0]
+            group_data['custom'] = np.empty((rows.shape[0], 4), dtype=object)
+            group_data['fill'] = 0
 
-            for node_id, data in group_data['nodes']:
-                x, y = pos[node_id]
-                node_x.append(x)
-                node_y.append(y)
-
-                # Node label
-                label = data.get('label', node_id)
-                node_text.append(label)
+        for node_id, data in graph.nodes(data=True):
+            group_data = node_groups.get(data.get('node_type'))
+            if group_data is None:
+                continue
+            i = group_data['fill']
+            group_data['fill'] = i + 1
 
-                # Node size
-                size = data.get('size', 20)
-                node_sizes.append(size)
+            group_data['sizes'][i] = data.get('size', 20)
 
-                # Hover text
-                text = data.get('text', '')
-                confidence = data.get('confidence', 0.0)
-                article_num = data.get('article_number')
+            label = data.get('label') or data.get('label_id', node_id)
+            group_data['text'][i] = label
 
-                hover_parts = [f"<b>{label}</b>"]
-                if article_num:
-                    hover_parts.append(f"شماره ماده: {article_num}")
-                hover_parts.append(f"اطمینان: {confidence*100:.0f}%")
+            # Hover text (truncated preview)
+            text = data.get('text', '')
+            article_num = data.get('article_number')
+            text_preview = text if len(text) <= 150 else text[:150] + TRUNC_MARKER
+            group_data['custom'][i] = (
+                label, article_num or "", data.get('confidence', 0.0), text_preview
+            )
 
-                # Truncate text for hover
-                text_preview = text[:150] + "..." if len(text) > 150 else text
-                hover_parts.append(f"<br>{text_preview}")
+        # Create trace for each node type
+        traces = []
+        for node_type, group_data in node_groups.items():
+            if not group_data['fill']:
+                continue
 
-                hover_text.append("<br>".join(hover_parts))
+            node_x = coords[group_data['rows'], 0]
+            node_y = coords[group_data['rows'], 1]
+            node_text = group_data['text']
+            node_sizes = group_data['sizes']
 
-            trace = go.Scatter(
+            trace = scatter_cls(
                 x=node_x,
                 y=node_y,
                 mode='markers+text',
@@ -226,7 +411,7 @@ class PlotlyRenderer:
                 text=node_text,
                 textposition='bottom center',
                 textfont=dict(
-                    family=self.settings.FONT_FAMILY,
+                    family=font,
                     size=12,
                     color='#f8fafc'
                 ),
@@ -235,12 +420,14 @@ class PlotlyRenderer:
                     color=group_data['color'],
                     line=dict(width=2, color='#1e293b')
                 ),
-                hovertext=hover_text,
-                hoverinfo='text',
+                customdata=group_data['custom'],
+                hovertemplate=(
+                    _ARTICLE_HOVER_TEMPLATE if node_type == _ARTICLE else _HOVER_TEMPLATE
+                ),
                 hoverlabel=dict(
                     bgcolor='#1e293b',
                     font=dict(
-                        family=self.settings.FONT_FAMILY,
+                        family=font,
                         size=13,
                         color='#f8fafc'
                     ),
@@ -252,7 +439,7 @@ class PlotlyRenderer:
 
         return traces
 
-    def _configure_layout(self, fig: go.Figure, width: int, height: int) -> go.Figure:
+    def _configure_layout(self, fig: go.Figure, width: int, height: int, font: str) -> go.Figure:
         """
         Configure figure layout with Persian font and dark theme.
 
@@ -260,22 +447,23 @@ class PlotlyRenderer:
             fig: Plotly figure
             width: Width in pixels
             height: Height in pixels
+            font: Font family for all figure text
 
         Returns:
             Configured figure
         """
         fig.update_layout(
+            **_STATIC_LAYOUT,
             title=dict(
                 text="گراف استدلال قضایی",
                 font=dict(
-                    family=self.settings.FONT_FAMILY,
+                    family=font,
                     size=24,
                     color='#f8fafc'
                 ),
                 x=0.5,
                 xanchor='center'
             ),
-            showlegend=True,
             legend=dict(
                 orientation="h",
                 yanchor="bottom",
@@ -283,7 +471,7 @@ class PlotlyRenderer:
                 xanchor="right",
                 x=1,
                 font=dict(
-                    family=self.settings.FONT_FAMILY,
+                    family=font,
                     size=14,
                     color='#f8fafc'
                 ),
@@ -291,54 +479,23 @@ class PlotlyRenderer:
                 bordercolor='#334155',
                 borderwidth=1
             ),
-            hovermode='closest',
-            margin=dict(b=20, l=5, r=5, t=80),
-            plot_bgcolor='#0f172a',  # Dark background
-            paper_bgcolor='#020617',  # Darker outer background
             width=width,
             height=height,
-            xaxis=dict(
-                showgrid=False,
-                zeroline=False,
-                showticklabels=False,
-                range=[-0.05, 1.05]
-            ),
-            yaxis=dict(
-                showgrid=False,
-                zeroline=False,
-                showticklabels=False,
-                range=[-0.1, 1.0]
-            ),
             font=dict(
-                family=self.settings.FONT_FAMILY,
+                family=font,
                 color='#f8fafc'
             )
         )
 
-        # Enable drag mode for better interaction
-        fig.update_layout(
-            dragmode='pan',
-            modebar=dict(
-                bgcolor='#1e293b',
-                color='#94a3b8',
-                activecolor='#3b82f6'
-            )
-        )
-
         return fig
 
 
-# Global instance
-_renderer_instance: Optional[PlotlyRenderer] = None
-
+@st.cache_resource
 def get_plotly_renderer() -> PlotlyRenderer:
     """
-    Get global Plotly renderer instance.
+    Get global Plotly renderer instance (cached by Streamlit).
 
     Returns:
         PlotlyRenderer singleton
     """
-    global _renderer_instance
-    if _renderer_instance is None:
-        _renderer_instance = PlotlyRenderer()
-    return _renderer_instance
+    return PlotlyRenderer()
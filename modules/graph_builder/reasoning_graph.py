@@ -13,7 +13,11 @@ Node types:
 Author: Master's Thesis Project - Mahsa Mirzaei
 """
 
+import hashlib
+
 import networkx as nx
+import numpy as np
+import orjson
 from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
 
@@ -21,17 +25,99 @@ from modules.legal_engine.reasoning_engine import ReasoningResult, ReasoningStep
 from config.settings import get_settings
 
 
+# Node types are stored on the graph as small ints (layer order); the names
+# are only used for display and for get_node_layers() keys
+NODE_FACT, NODE_ARTICLE, NODE_DEDUCTION, NODE_VERDICT = 0, 1, 2, 3
+NODE_TYPE_NAMES = ("FACT", "ARTICLE", "DEDUCTION", "VERDICT")
+
+# Edge relationships are stored as ints too; RELATIONSHIP_LABELS translates
+# them to Persian for display
+REL_APPLIES, REL_LEADS, REL_TO = 0, 1, 2
+RELATIONSHIP_LABELS = ("تطبیق با", "منجر به", "منتهی به")
+
+# Marker size of each layer and relationship of the edges entering it
+_LAYER_CODES = frozenset(range(len(NODE_TYPE_NAMES)))
+_LAYER_SIZES = (20, 30, 25, 35)
+_LAYER_RELATIONSHIPS = (None, REL_APPLIES, REL_LEADS, REL_TO)
+
+
 @dataclass
 class GraphNode:
     """Represents a node in the reasoning graph."""
-    node_id: str
-    node_type: str  # FACT, ARTICLE, DEDUCTION, VERDICT
+    node_id: int
+    node_type: int  # NODE_FACT, NODE_ARTICLE, NODE_DEDUCTION, NODE_VERDICT
     text: str
     confidence: float = 0.0
     article_num: Optional[int] = None
     metadata: Dict[str, Any] = None
 
 
+@dataclass
+class ReasoningGraphData:
+    """
+    Reasoning graph as flat arrays (struct of arrays).
+
+    Row i of the node arrays describes node ``node_ids[i]``; edges are the
+    parallel ``edge_src``/``edge_dst`` arrays of node IDs. A NetworkX graph
+    is only materialized by ``to_networkx()``.
+    """
+    node_ids: np.ndarray  # (N,) int32
+    node_type: np.ndarray  # (N,) uint8 NODE_* code
+    confidence: np.ndarray  # (N,) float64
+    edge_src: np.ndarray  # (E,) int32
+    edge_dst: np.ndarray  # (E,) int32
+    attrs: List[Dict[str, Any]]  # Per-node display attributes (text, label, ...)
+    layer_colors: Tuple[str, ...]  # Node color per type code
+
+    def to_networkx(self) -> nx.DiGraph:
+        """
+        Materialize the arrays as a NetworkX directed graph.
+
+        Returns:
+            NetworkX directed graph with the same node/edge attributes
+            the builder has always produced
+        """
+        graph = nx.DiGraph()
+        node_ids = self.node_ids.tolist()
+        confidence = self.confidence.tolist()
+
+        for code in range(len(NODE_TYPE_NAMES)):
+            rows = np.flatnonzero(self.node_type == code).tolist()
+            graph.add_nodes_from(
+                ((node_ids[i], {**self.attrs[i], "confidence": confidence[i]}) for i in rows),
+                node_type=code,
+                color=self.layer_colors[code],
+                size=_LAYER_SIZES[code]
+            )
+
+        # Edges entering the same layer share one relationship label
+        # (node IDs are ascending, so searchsorted maps IDs back to rows)
+        dst_type = self.node_type[np.searchsorted(self.node_ids, self.edge_dst)]
+        for code in range(NODE_ARTICLE, len(NODE_TYPE_NAMES)):
+            mask = dst_type == code
+            graph.add_edges_from(
+                zip(self.edge_src[mask].tolist(), self.edge_dst[mask].tolist()),
+                relationship=_LAYER_RELATIONSHIPS[code]
+            )
+
+        return graph
+
+
+def _stats_kernel(node_type: np.ndarray, confidence: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Reduce the node arrays to per-type counts and the confidence sum.
+
+    Args:
+        node_type: (N,) uint8 type codes
+        confidence: (N,) float64 confidences
+
+    Returns:
+        Tuple of ((4,) counts indexed by type code, confidence sum)
+    """
+    counts = np.bincount(node_type, minlength=len(NODE_TYPE_NAMES))
+    return counts, float(confidence.sum())
+
+
 class ReasoningGraph:
     """
     Construct NetworkX directed graph from reasoning result.
@@ -43,14 +129,39 @@ class ReasoningGraph:
     def __init__(self):
         """Initialize graph builder."""
         self.settings = get_settings()
+        # Node colors per type code, read from settings once
+        self._layer_colors: Tuple[str, ...] = (
+            self.settings.NODE_COLOR_FACT,
+            self.settings.NODE_COLOR_ARTICLE,
+            self.settings.NODE_COLOR_DEDUCTION,
+            self.settings.NODE_COLOR_VERDICT,
+        )
         self.graph: Optional[nx.DiGraph] = None
+        self.data: Optional[ReasoningGraphData] = None
+        self._data_graph: Optional[nx.DiGraph] = None  # Graph materialized from self.data
         self.node_counter = 0
+        # Node IDs per layer, filled as nodes are added; _layers_graph is the
+        # graph the index describes, so an externally assigned graph is detected
+        self._layers: Dict[str, List[int]] = {}
+        self._layers_graph: Optional[nx.DiGraph] = None
+        self._reset_buffers()
+
+    def _reset_buffers(self):
+        """Clear the per-build node and edge buffers."""
+        self._node_ids: List[int] = []
+        self._node_types: List[int] = []
+        self._confidences: List[float] = []
+        self._attrs: List[Dict[str, Any]] = []
+        self._edge_src: List[np.ndarray] = []
+        self._edge_dst: List[np.ndarray] = []
 
     def build_from_reasoning(self, reasoning_result: ReasoningResult) -> nx.DiGraph:
         """
         Build graph from reasoning result.
 
-        Creates hierarchical graph: Facts → Articles → Deductions → Verdict
+        Creates hierarchical graph: Facts → Articles → Deductions → Verdict.
+        Nodes and edges are collected into flat arrays (``self.data``) and
+        converted to NetworkX once at the end.
 
         Args:
             reasoning_result: Complete reasoning analysis
@@ -58,17 +169,15 @@ class ReasoningGraph:
         Returns:
             NetworkX directed graph
         """
-        self.graph = nx.DiGraph()
         self.node_counter = 0
+        self._layers = {name: [] for name in NODE_TYPE_NAMES}
+        self._reset_buffers()
 
         # Add fact nodes
-        fact_nodes = self._add_fact_nodes(reasoning_result.reasoning_steps)
+        fact_nodes = self._add_fact_nodes(reasoning_result.fact_steps)
 
         # Add article nodes and connect to facts
-        article_nodes = self._add_article_nodes(
-            reasoning_result.reasoning_steps,
-            fact_nodes
-        )
+        article_nodes = self._add_article_nodes(reasoning_result.article_steps, fact_nodes)
 
         # Add deduction nodes and connect to articles
         deduction_nodes = self._add_deduction_nodes(
@@ -82,89 +191,142 @@ class ReasoningGraph:
             deduction_nodes
         )
 
+        empty = np.empty(0, dtype=np.int32)
+        self.data = ReasoningGraphData(
+            node_ids=np.asarray(self._node_ids, dtype=np.int32),
+            node_type=np.asarray(self._node_types, dtype=np.uint8),
+            confidence=np.asarray(self._confidences, dtype=np.float64),
+            edge_src=np.concatenate(self._edge_src) if self._edge_src else empty,
+            edge_dst=np.concatenate(self._edge_dst) if self._edge_dst else empty,
+            attrs=self._attrs,
+            layer_colors=self._layer_colors,
+        )
+        self._reset_buffers()
+
+        self.graph = self.data.to_networkx()
+        # Lets the renderer cache the figure by content
+        self.graph.graph["content_key"] = self._content_key(reasoning_result)
+        self._data_graph = self.graph
+        self._layers_graph = self.graph
         return self.graph
 
-    def _add_fact_nodes(self, steps: List[ReasoningStep]) -> List[str]:
+    def _content_key(self, reasoning_result: ReasoningResult) -> str:
+        """
+        Hash everything the graph is built from.
+
+        Args:
+            reasoning_result: Reasoning result
+
+        Returns:
+            Hex digest identifying the graph content
+        """
+        payload = orjson.dumps((
+            [
+                (s.step_type, s.content, s.confidence, s.related_article)
+                for s in reasoning_result.reasoning_steps
+            ],
+            reasoning_result.deductions,
+            reasoning_result.overall_confidence,
+            self._layer_colors,
+        ))
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def _append_layer(
+        self,
+        node_type: int,
+        node_ids: List[int],
+        confidences: List[float],
+        attrs: List[Dict[str, Any]],
+        parent_ids: List[int]
+    ):
+        """
+        Append one layer of nodes to the buffers and connect every node to
+        every node of the parent layer.
+
+        Args:
+            node_type: Layer code (NODE_FACT ... NODE_VERDICT)
+            node_ids: IDs of the new nodes
+            confidences: Confidence per new node
+            attrs: Display attributes per new node
+            parent_ids: IDs of the previous layer (empty for facts)
+        """
+        self._node_ids.extend(node_ids)
+        self._node_types.extend([node_type] * len(node_ids))
+        self._confidences.extend(confidences)
+        self._attrs.extend(attrs)
+        self._layers[NODE_TYPE_NAMES[node_type]].extend(node_ids)
+
+        if parent_ids and node_ids:
+            # Complete bipartite edges, grouped by child: (p0, c0), (p1, c0), ...
+            self._edge_src.append(np.tile(np.asarray(parent_ids, dtype=np.int32), len(node_ids)))
+            self._edge_dst.append(np.repeat(np.asarray(node_ids, dtype=np.int32), len(parent_ids)))
+
+    def _add_fact_nodes(self, fact_steps: List[ReasoningStep]) -> List[int]:
         """
         Add fact nodes to graph.
 
         Args:
-            steps: All reasoning steps
+            fact_steps: Reasoning steps of type FACT
 
         Returns:
             List of fact node IDs
         """
-        fact_steps = [s for s in steps if s.step_type == "FACT"]
-        node_ids = []
-
-        for step in fact_steps:
-            node_id = self._create_node_id("FACT")
-
-            self.graph.add_node(
-                node_id,
-                node_type="FACT",
-                text=step.content,
-                confidence=step.confidence,
-                color=self.settings.NODE_COLOR_FACT,
-                size=20
-            )
-
-            node_ids.append(node_id)
+        node_ids = self._create_node_ids(len(fact_steps))
+
+        self._append_layer(
+            NODE_FACT,
+            node_ids,
+            [step.confidence for step in fact_steps],
+            [
+                {"label_id": f"FACT_{node_id}", "text": step.content}
+                for node_id, step in zip(node_ids, fact_steps)
+            ],
+            []
+        )
 
         return node_ids
 
     def _add_article_nodes(
         self,
-        steps: List[ReasoningStep],
-        fact_nodes: List[str]
-    ) -> List[str]:
+        article_steps: List[ReasoningStep],
+        fact_nodes: List[int]
+    ) -> List[int]:
         """
         Add article nodes and connect them to fact nodes.
 
         Args:
-            steps: All reasoning steps
+            article_steps: Reasoning steps of type ARTICLE
             fact_nodes: List of fact node IDs
 
         Returns:
             List of article node IDs
         """
-        article_steps = [s for s in steps if s.step_type == "ARTICLE"]
-        node_ids = []
-
-        for step in article_steps:
-            node_id = self._create_node_id("ARTICLE")
-
-            # Create label with article number
-            label = f"ماده {step.related_article}"
-
-            self.graph.add_node(
-                node_id,
-                node_type="ARTICLE",
-                text=step.content,
-                label=label,
-                article_number=step.related_article,
-                confidence=step.confidence,
-                color=self.settings.NODE_COLOR_ARTICLE,
-                size=30  # Larger for articles
-            )
-
-            # Connect to all fact nodes (articles analyze facts)
-            for fact_node in fact_nodes:
-                self.graph.add_edge(
-                    fact_node,
-                    node_id,
-                    relationship="تطبیق با"
-                )
-
-            node_ids.append(node_id)
+        node_ids = self._create_node_ids(len(article_steps))
+
+        # Every article is connected to all fact nodes (articles analyze facts)
+        self._append_layer(
+            NODE_ARTICLE,
+            node_ids,
+            [step.confidence for step in article_steps],
+            [
+                {
+                    "label_id": f"ARTICLE_{node_id}",
+                    "text": step.content,
+                    "label": f"ماده {step.related_article}",  # Label with article number
+                    "article_number": step.related_article,
+                }
+                for node_id, step in zip(node_ids, article_steps)
+            ],
+            fact_nodes
+        )
 
         return node_ids
 
     def _add_deduction_nodes(
         self,
         deductions: List[str],
-        article_nodes: List[str]
-    ) -> List[str]:
+        article_nodes: List[int]
+    ) -> List[int]:
         """
         Add deduction nodes and connect to article nodes.
 
@@ -175,38 +337,27 @@ class ReasoningGraph:
         Returns:
             List of deduction node IDs
         """
-        node_ids = []
-
-        for i, deduction in enumerate(deductions, 1):
-            node_id = self._create_node_id("DEDUCTION")
-
-            self.graph.add_node(
-                node_id,
-                node_type="DEDUCTION",
-                text=deduction,
-                label=f"نتیجه {i}",
-                confidence=0.8,
-                color=self.settings.NODE_COLOR_DEDUCTION,
-                size=25
-            )
-
-            # Connect to article nodes (deductions derive from articles)
-            for article_node in article_nodes:
-                self.graph.add_edge(
-                    article_node,
-                    node_id,
-                    relationship="منجر به"
-                )
-
-            node_ids.append(node_id)
+        node_ids = self._create_node_ids(len(deductions))
+
+        # Every deduction is connected to all article nodes (deductions derive from articles)
+        self._append_layer(
+            NODE_DEDUCTION,
+            node_ids,
+            [0.8] * len(node_ids),
+            [
+                {"label_id": f"DEDUCTION_{node_id}", "text": deduction, "label": f"نتیجه {i}"}
+                for i, (node_id, deduction) in enumerate(zip(node_ids, deductions), 1)
+            ],
+            article_nodes
+        )
 
         return node_ids
 
     def _add_verdict_node(
         self,
         reasoning_result: ReasoningResult,
-        deduction_nodes: List[str]
-    ) -> str:
+        deduction_nodes: List[int]
+    ) -> int:
         """
         Add final verdict node.
 
@@ -217,45 +368,51 @@ class ReasoningGraph:
         Returns:
             Verdict node ID
         """
-        node_id = self._create_node_id("VERDICT")
+        node_id = self._create_node_id()
 
         # Determine verdict text (simplified)
         verdict_text = f"حکم نهایی\nاطمینان: {reasoning_result.overall_confidence*100:.0f}%"
 
-        self.graph.add_node(
-            node_id,
-            node_type="VERDICT",
-            text=verdict_text,
-            label="حکم نهایی",
-            confidence=reasoning_result.overall_confidence,
-            color=self.settings.NODE_COLOR_VERDICT,
-            size=35  # Largest node
+        # All deductions are connected to the verdict
+        self._append_layer(
+            NODE_VERDICT,
+            [node_id],
+            [reasoning_result.overall_confidence],
+            [{"label_id": f"VERDICT_{node_id}", "text": verdict_text, "label": "حکم نهایی"}],
+            deduction_nodes
         )
 
-        # Connect all deductions to verdict
-        for deduction_node in deduction_nodes:
-            self.graph.add_edge(
-                deduction_node,
-                node_id,
-                relationship="منتهی به"
-            )
-
         return node_id
 
-    def _create_node_id(self, node_type: str) -> str:
+    def _create_node_id(self) -> int:
         """
         Create unique node ID.
 
-        Args:
-            node_type: Type of node
+        Nodes are keyed by small integers, which NetworkX hashes and compares
+        faster than strings; the readable "FACT_3"-style name is kept in the
+        node's label_id attribute.
 
         Returns:
             Unique node ID
         """
         self.node_counter += 1
-        return f"{node_type}_{self.node_counter}"
+        return self.node_counter
 
-    def get_node_layers(self) -> Dict[str, List[str]]:
+    def _create_node_ids(self, count: int) -> List[int]:
+        """
+        Create a block of consecutive unique node IDs.
+
+        Args:
+            count: Number of IDs to create
+
+        Returns:
+            List of unique node IDs
+        """
+        start = self.node_counter + 1
+        self.node_counter += count
+        return list(range(start, self.node_counter + 1))
+
+    def get_node_layers(self) -> Dict[str, List[int]]:
         """
         Get nodes organized by layer (for hierarchical layout).
 
@@ -265,6 +422,12 @@ class ReasoningGraph:
         if not self.graph:
             return {}
 
+        # The index kept during build_from_reasoning is valid unless the graph
+        # was replaced or had nodes added/removed since
+        indexed = sum(len(ids) for ids in self._layers.values())
+        if self._layers_graph is self.graph and indexed == self.graph.number_of_nodes():
+            return self._layers
+
         layers = {
             "FACT": [],
             "ARTICLE": [],
@@ -273,10 +436,12 @@ class ReasoningGraph:
         }
 
         for node_id, data in self.graph.nodes(data=True):
-            node_type = data.get('node_type')
-            if node_type in layers:
-                layers[node_type].append(node_id)
+            code = data.get('node_type')
+            if code in _LAYER_CODES:
+                layers[NODE_TYPE_NAMES[code]].append(node_id)
 
+        self._layers = layers
+        self._layers_graph = self.graph
         return layers
 
     def get_statistics(self) -> Dict[str, Any]:
@@ -289,12 +454,32 @@ class ReasoningGraph:
         if not self.graph:
             return {}
 
+        num_nodes = self.graph.number_of_nodes()
+
+        if (
+            self.data is not None
+            and self._data_graph is self.graph
+            and self.data.node_ids.shape[0] == num_nodes
+        ):
+            # Graph built here and unchanged: reduce the flat arrays directly
+            type_counts, confidence_sum = _stats_kernel(self.data.node_type, self.data.confidence)
+            counts = type_counts.tolist()
+        else:
+            # One pass over the nodes for all per-type counts and the confidence sum
+            counts = [0] * len(NODE_TYPE_NAMES)
+            confidence_sum = 0.0
+            for _, d in self.graph.nodes(data=True):
+                code = d.get('node_type')
+                if code in _LAYER_CODES:
+                    counts[code] += 1
+                confidence_sum += d.get('confidence', 0)
+
         return {
-            'total_nodes': self.graph.number_of_nodes(),
+            'total_nodes': num_nodes,
             'total_edges': self.graph.number_of_edges(),
-            'num_facts': len([n for n, d in self.graph.nodes(data=True) if d.get('node_type') == 'FACT']),
-            'num_articles': len([n for n, d in self.graph.nodes(data=True) if d.get('node_type') == 'ARTICLE']),
-            'num_deductions': len([n for n, d in self.graph.nodes(data=True) if d.get('node_type') == 'DEDUCTION']),
-            'has_verdict': any(d.get('node_type') == 'VERDICT' for _, d in self.graph.nodes(data=True)),
-            'average_confidence': sum(d.get('confidence', 0) for _, d in self.graph.nodes(data=True)) / max(self.graph.number_of_nodes(), 1)
+            'num_facts': counts[NODE_FACT],
+            'num_articles': counts[NODE_ARTICLE],
+            'num_deductions': counts[NODE_DEDUCTION],
+            'has_verdict': counts[NODE_VERDICT] > 0,
+            'average_confidence': confidence_sum / max(num_nodes, 1)
         }
@@ -7,15 +7,33 @@ Includes shared caching logic and common utilities.
 Author: Master's Thesis Project - Mahsa Mirzaei
 """
 
+import asyncio
 import hashlib
-import json
+import sqlite3
+import struct
+import threading
 import time
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterator, List, Tuple
 
+import numpy as np
+import orjson
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
+# (provider, model, temperature, max_tokens, system_prompt, prompt)
+CacheKey = Tuple[str, str, float, int, str, str]
+
+
+class StreamInterruptedError(Exception):
+    """
+    A streamed completion failed after it was opened.
+
+    Chunks yielded before the failure are an incomplete answer: callers
+    should discard them and fall back to get_completion().
+    """
 
 class LLMClient(ABC):
     """
@@ -32,8 +50,19 @@ class LLMClient(ABC):
     - embedding_dimension: Dimension of embedding vectors
     """
 
-    _cache: Dict[str, Any] = {}
-    _cache_file: Path = Path(__file__).resolve().parent.parent.parent / "data" / "llm_cache.json"
+    # SQLite key/value store (WAL mode) shared by all clients in the process
+    # and safe to use from several Streamlit processes at once
+    _cache_file: Path = Path(__file__).resolve().parent.parent.parent / "data" / "llm_cache.sqlite3"
+    _cache_max_entries: int = 10_000  # Least recently used entries beyond this are evicted
+    _cache_db: Optional[sqlite3.Connection] = None
+    _cache_lock = threading.Lock()
+    # Hot entries kept in process so repeat hits skip SQLite and JSON decoding
+    _memory_cache: "OrderedDict[CacheKey, Tuple[Any, float]]" = OrderedDict()  # key -> (value, created_at)
+    _memory_cache_max_entries: int = 256
+    # Semantic cache: per namespace, a matrix of unit-norm prompt embeddings
+    # (float32, one row per entry) and the matching responses
+    _semantic_cache: Dict[str, Tuple[np.ndarray, List[str]]] = {}
+    _semantic_cache_max_entries: int = 1000  # Per namespace; oldest dropped first
 
     def __init__(self):
         """Initialize shared cache."""
@@ -69,8 +98,19 @@ class LLMClient(ABC):
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
         use_cache: bool = True,
+        cache_ttl: Optional[float] = None,
+        semantic_cache: bool = False,
     ) -> Optional[str]:
-        """Get text completion from the LLM."""
+        """
+        Get text completion from the LLM.
+
+        A cached response older than *cache_ttl* seconds is ignored and
+        regenerated (None keeps cached responses indefinitely). With
+        *semantic_cache* (and SEMANTIC_CACHE_ENABLED) the answer to a
+        near-identical earlier prompt may be reused; only pass it for prompts
+        without case-specific fields, since prompts differing only in names,
+        dates or amounts are near-identical too.
+        """
         ...
 
     @abstractmethod
@@ -79,8 +119,15 @@ class LLMClient(ABC):
         prompt: str,
         system_prompt: Optional[str] = None,
         temperature: float = 0.1,
+        use_cache: bool = False,
+        cache_ttl: Optional[float] = None,
     ) -> Optional[Dict[str, Any]]:
-        """Get structured JSON response from the LLM."""
+        """
+        Get structured JSON response from the LLM.
+
+        Responses are only cached when *use_cache* is set; the raw JSON text
+        is stored and parsed on every hit, so callers never share one dict.
+        """
         ...
 
     @abstractmethod
@@ -98,40 +145,327 @@ class LLMClient(ABC):
         """Count tokens in text."""
         ...
 
+    # ─── Streaming ────────────────────────────────────────────────────
+
+    def get_completion_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        cache_ttl: Optional[float] = None,
+    ) -> Iterator[str]:
+        """
+        Yield the completion in chunks as they arrive (for st.write_stream).
+
+        Providers without a streaming API fall back to yielding the whole
+        get_completion() result as a single chunk. Streaming providers retry
+        opening the stream like get_completion() and raise
+        StreamInterruptedError if it breaks off part way.
+        """
+        result = self.get_completion(
+            prompt,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            use_cache=use_cache,
+            cache_ttl=cache_ttl,
+        )
+        if result:
+            yield result
+
+    # ─── Worker threads ───────────────────────────────────────────────
+    # Blocking SDK calls (and their retry back-off sleeps) can be moved off
+    # the event loop with this, so several of them are awaited together.
+
+    async def _run_in_thread(self, func, *args, **kwargs):
+        """
+        Run a blocking call in a worker thread.
+
+        The current Streamlit script context is attached to the worker so
+        st.warning / st.error inside the call still reach the page.
+        """
+        ctx = get_script_run_ctx()
+
+        def _call():
+            if ctx is not None:
+                add_script_run_ctx(threading.current_thread(), ctx)
+            return func(*args, **kwargs)
+
+        return await asyncio.to_thread(_call)
+
     # ─── Shared cache helpers ─────────────────────────────────────────
 
-    def _cache_key(self, prompt: str, **kwargs) -> str:
-        """Generate a cache key that includes provider + model."""
-        key_data = (
-            f"{self.provider_name}_{self.model_name}_"
-            f"{prompt}_{kwargs.get('temperature', 0.3)}_{kwargs.get('max_tokens', 2000)}"
+    def _cache_key(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> CacheKey:
+        """
+        Build the cache key: provider, model, sampling parameters and prompts.
+
+        The in-memory layer is keyed by this tuple directly (str hashes are
+        cached by CPython), so a memory hit never hashes the prompt text;
+        the digest from _disk_key() is only computed when SQLite is touched.
+        JSON-mode requests (json_mode=True) get keys of their own.
+        """
+        provider = self.provider_name
+        if kwargs.get('json_mode'):
+            provider += ":json"
+        return (
+            provider,
+            self.model_name,
+            float(kwargs.get('temperature', 0.3)),
+            int(kwargs.get('max_tokens', 2000)),
+            system_prompt or "",
+            prompt,
         )
-        return hashlib.md5(key_data.encode()).hexdigest()
+
+    @staticmethod
+    def _disk_key(key: CacheKey) -> str:
+        """Hash a cache key into the fixed-size identifier stored in SQLite."""
+        # BLAKE2b is faster than MD5 on 64-bit CPUs; feeding the short
+        # parameters and the prompts separately avoids building one large string
+        provider, model, temperature, max_tokens, system_prompt, prompt = key
+        system_bytes = system_prompt.encode("utf-8")
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(f"{provider}|{model}|".encode())
+        hasher.update(struct.pack("<dII", temperature, max_tokens, len(system_bytes)))
+        hasher.update(system_bytes)
+        hasher.update(prompt.encode("utf-8"))
+        return hasher.hexdigest()
 
     def _load_cache(self):
-        """Load response cache from disk."""
+        """Open the shared cache database (once per process)."""
+        # Checked and opened under the lock, so clients created concurrently
+        # share one connection
+        with LLMClient._cache_lock:
+            if LLMClient._cache_db is not None:
+                return
+            try:
+                self._cache_file.parent.mkdir(parents=True, exist_ok=True)
+                db = sqlite3.connect(self._cache_file, timeout=30, check_same_thread=False)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("PRAGMA synchronous=NORMAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                    "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                db.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS semantic_cache ("
+                    "namespace TEXT NOT NULL, embedding BLOB NOT NULL, value TEXT NOT NULL)"
+                )
+                db.execute("CREATE INDEX IF NOT EXISTS semantic_cache_ns ON semantic_cache (namespace)")
+                db.commit()
+                LLMClient._cache_db = db
+            except Exception as e:
+                print(f"Failed to load cache: {e}")
+
+    def _cache_get(self, key: CacheKey, max_age: Optional[float] = None) -> Optional[Any]:
+        """
+        Return the cached response for *key*, or None on a miss.
+
+        Args:
+            key: Value from _cache_key()
+            max_age: Entries older than this many seconds count as a miss
+        """
+        now = time.time()
+        with LLMClient._cache_lock:
+            entry = LLMClient._memory_cache.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if max_age is None or now - created_at <= max_age:
+                    LLMClient._memory_cache.move_to_end(key)
+                    return value
+
+        db = LLMClient._cache_db
+        if db is None:
+            return None
+        disk_key = self._disk_key(key)
         try:
-            if self._cache_file.exists():
-                with open(self._cache_file, "r", encoding="utf-8") as f:
-                    LLMClient._cache = json.load(f)
+            with LLMClient._cache_lock:
+                row = db.execute(
+                    "SELECT value, created_at FROM llm_cache WHERE key = ?", (disk_key,)
+                ).fetchone()
+                if row is None or (max_age is not None and now - row[1] > max_age):
+                    return None
+                with db:
+                    db.execute(
+                        "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, disk_key)
+                    )
+            value = orjson.loads(row[0])
         except Exception as e:
-            print(f"Failed to load cache: {e}")
-            LLMClient._cache = {}
+            print(f"Failed to read cache: {e}")
+            return None
+        self._memory_cache_put(key, value, row[1])
+        return value
+
+    def _memory_cache_put(self, key: CacheKey, value: Any, created_at: float):
+        """Remember *value* in the in-process LRU layer."""
+        with LLMClient._cache_lock:
+            LLMClient._memory_cache[key] = (value, created_at)
+            LLMClient._memory_cache.move_to_end(key)
+            if len(LLMClient._memory_cache) > self._memory_cache_max_entries:
+                LLMClient._memory_cache.popitem(last=False)
 
-    def _save_cache(self):
-        """Save response cache to disk."""
+    def _cache_set(self, key: CacheKey, value: Any):
+        """Store a response, evicting least recently used entries past the limit."""
+        now = time.time()
+        self._memory_cache_put(key, value, now)
+        db = LLMClient._cache_db
+        if db is None:
+            return
         try:
-            self._cache_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self._cache_file, "w", encoding="utf-8") as f:
-                json.dump(LLMClient._cache, f, ensure_ascii=False, indent=2)
+            with LLMClient._cache_lock, db:
+                db.execute(
+                    "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)",
+                    (self._disk_key(key), orjson.dumps(value).decode(), now, now),
+                )
+                db.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self._cache_max_entries,),
+                )
         except Exception as e:
             print(f"Failed to save cache: {e}")
 
     def clear_cache(self):
         """Clear the response cache."""
-        LLMClient._cache = {}
-        if self._cache_file.exists():
-            self._cache_file.unlink()
+        with LLMClient._cache_lock:
+            LLMClient._memory_cache.clear()
+        db = LLMClient._cache_db
+        if db is None:
+            return
+        with LLMClient._cache_lock, db:
+            db.execute("DELETE FROM llm_cache")
+            db.execute("DELETE FROM semantic_cache")
+            LLMClient._semantic_cache.clear()
+
+    # ─── Semantic cache helpers ───────────────────────────────────────
+
+    def _semantic_namespace(self, system_prompt: Optional[str], **kwargs) -> str:
+        """Key for the set of requests whose responses are interchangeable."""
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(
+            f"{self.provider_name}|{self.model_name}|"
+            f"{kwargs.get('temperature', 0.3)}|{kwargs.get('max_tokens', 2000)}|".encode()
+        )
+        hasher.update((system_prompt or "").encode("utf-8"))
+        return hasher.hexdigest()
+
+    def _semantic_entries(self, namespace: str) -> Tuple[np.ndarray, List[str]]:
+        """
+        Return (embeddings, responses) for *namespace*, loading them from disk once.
+
+        The caller must hold _cache_lock. The returned arrays are never
+        modified in place (_semantic_cache_set replaces them), so they may be
+        read after the lock is released.
+        """
+        entries = LLMClient._semantic_cache.get(namespace)
+        if entries is not None:
+            return entries
+
+        rows = []
+        db = LLMClient._cache_db
+        if db is not None:
+            try:
+                rows = db.execute(
+                    "SELECT embedding, value FROM semantic_cache WHERE namespace = ? ORDER BY rowid",
+                    (namespace,),
+                ).fetchall()
+            except Exception as e:
+                print(f"Failed to read semantic cache: {e}")
+
+        if rows:
+            matrix = np.vstack([np.frombuffer(blob, dtype=np.float32) for blob, _ in rows])
+            entries = (matrix, [orjson.loads(value) for _, value in rows])
+        else:
+            entries = (np.empty((0, self.embedding_dimension), dtype=np.float32), [])
+        LLMClient._semantic_cache[namespace] = entries
+        return entries
+
+    def _embed_for_similarity(self, text: str) -> Optional[np.ndarray]:
+        """Unit-norm float32 embedding of *text* for the semantic cache (None on failure)."""
+        embedding = self.get_embedding(text)
+        if embedding is None:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    def _semantic_cache_lookup(
+        self, prompt: str, system_prompt: Optional[str], **kwargs
+    ) -> Tuple[Optional[Tuple[str, np.ndarray]], Optional[str]]:
+        """
+        Look up the response to a near-identical earlier prompt.
+
+        Args:
+            prompt: User prompt
+            system_prompt: System prompt
+            **kwargs: Sampling parameters (temperature, max_tokens)
+
+        Returns:
+            Tuple of ((namespace, prompt embedding) for _semantic_cache_set,
+            or None if the prompt could not be embedded; cached response or
+            None on a miss)
+        """
+        vector = self._embed_for_similarity(prompt)
+        if vector is None:
+            return None, None
+        namespace = self._semantic_namespace(system_prompt, **kwargs)
+        cached = self._semantic_cache_get(
+            namespace, vector, self.settings.SEMANTIC_CACHE_THRESHOLD
+        )
+        return (namespace, vector), cached
+
+    def _semantic_cache_get(self, namespace: str, vector: np.ndarray, threshold: float) -> Optional[str]:
+        """
+        Return the cached response whose prompt is most similar to *vector*.
+
+        Args:
+            namespace: Value from _semantic_namespace()
+            vector: Unit-norm float32 prompt embedding
+            threshold: Minimum cosine similarity for a hit
+
+        Returns:
+            Cached response, or None on a miss
+        """
+        with LLMClient._cache_lock:
+            matrix, responses = self._semantic_entries(namespace)
+        if not responses or matrix.shape[1] != vector.shape[0]:
+            return None
+        scores = matrix @ vector
+        best = int(scores.argmax())
+        return responses[best] if scores[best] >= threshold else None
+
+    def _semantic_cache_set(self, namespace: str, vector: np.ndarray, value: str):
+        """Add a (prompt embedding, response) pair to the semantic cache."""
+        with LLMClient._cache_lock:
+            matrix, responses = self._semantic_entries(namespace)
+            if matrix.shape[1] != vector.shape[0]:
+                return
+            keep = self._semantic_cache_max_entries - 1
+            LLMClient._semantic_cache[namespace] = (
+                np.vstack([matrix[-keep:], vector[None, :]]),
+                responses[-keep:] + [value],
+            )
+
+        db = LLMClient._cache_db
+        if db is None:
+            return
+        try:
+            with LLMClient._cache_lock, db:
+                db.execute(
+                    "INSERT INTO semantic_cache VALUES (?, ?, ?)",
+                    (namespace, vector.tobytes(), orjson.dumps(value).decode()),
+                )
+                db.execute(
+                    "DELETE FROM semantic_cache WHERE namespace = ? AND rowid NOT IN ("
+                    "SELECT rowid FROM semantic_cache WHERE namespace = ? "
+                    "ORDER BY rowid DESC LIMIT ?)",
+                    (namespace, namespace, self._semantic_cache_max_entries),
+                )
+        except Exception as e:
+            print(f"Failed to save semantic cache: {e}")
 
     # ─── Shared retry helper ─────────────────────────────────────────
 
@@ -19,6 +19,8 @@ from config.settings import get_settings
 _client_instance: Optional[LLMClient] = None
 _current_provider: Optional[str] = None
 _current_model: Optional[str] = None
+# Client for the provider's cheaper model (see get_economy_client)
+_economy_client: Optional[LLMClient] = None
 
 
 def get_llm_client() -> LLMClient:
@@ -52,6 +54,39 @@ def get_llm_client() -> LLMClient:
     return _client_instance
 
 
+def get_economy_client() -> LLMClient:
+    """
+    Get a client for the active provider's cheaper model.
+
+    Used for formatting-heavy steps such as drafting the verdict. Falls
+    back to the active client when no economy model is configured for
+    the provider (OPENAI_ECONOMY_MODEL / GEMINI_ECONOMY_MODEL).
+
+    Returns:
+        An LLMClient instance
+    """
+    global _economy_client
+
+    client = get_llm_client()
+    settings = get_settings()
+    model = {
+        "openai": settings.OPENAI_ECONOMY_MODEL,
+        "gemini": settings.GEMINI_ECONOMY_MODEL,
+    }.get(client.provider_name, "")
+
+    if not model or model == client.model_name:
+        return client
+
+    if (
+        _economy_client is None
+        or _economy_client.provider_name != client.provider_name
+        or _economy_client.model_name != model
+    ):
+        _economy_client = _build_client(client.provider_name, model)
+
+    return _economy_client
+
+
 def _build_client(provider: str, model: str = "") -> LLMClient:
     """
     Build a new LLM client for the given provider.
@@ -78,10 +113,11 @@ def reset_client():
     Call this when user changes provider/model/API-key in sidebar
     so that the next get_llm_client() call creates a fresh client.
     """
-    global _client_instance, _current_provider, _current_model
+    global _client_instance, _current_provider, _current_model, _economy_client
     _client_instance = None
     _current_provider = None
     _current_model = None
+    _economy_client = None
 
     # Reset all downstream singletons that hold a reference to the old client
     _reset_downstream_singletons()
@@ -95,7 +131,7 @@ def _reset_downstream_singletons():
 
     _ee._extractor_instance = None
     _re._engine_instance = None
-    _vg._verdict_instance = None
+    _vg._generator_instance = None
 
     # Clear the Streamlit-cached knowledge base so FAISS index is rebuilt
     try:
@@ -26,6 +26,38 @@ from modules.legal_engine.client_factory import get_llm_client
 from config.prompts import ENTITY_EXTRACTION_PROMPT
 
 
+# Inputs shorter than this cannot hold a case description; they are rejected
+# before the LLM call (the input form enforces the same 50-character minimum)
+MIN_CASE_LENGTH = 50
+MIN_CASE_WORDS = 5
+
+# Required fields and the warning shown when each one is missing
+VALIDATION_CHECKS = (
+    ("plaintiff", "⚠️ نام خواهان مشخص نیست"),
+    ("defendant", "⚠️ نام خوانده مشخص نیست"),
+    ("case_type", "⚠️ نوع پرونده مشخص نیست"),
+    ("claims", "⚠️ ادعاهای خواهان مشخص نیست"),
+    ("key_facts", "⚠️ واقعیات پرونده ناقص است"),
+)
+
+
+# Shared normalizer: building one compiles many regexes, and the extractor
+# singleton is recreated on every provider switch
+_normalizer_instance: Optional[Normalizer] = None
+
+def _get_normalizer() -> Normalizer:
+    """
+    Get the shared hazm Normalizer (stateless between calls).
+
+    Returns:
+        Normalizer singleton
+    """
+    global _normalizer_instance
+    if _normalizer_instance is None:
+        _normalizer_instance = Normalizer()
+    return _normalizer_instance
+
+
 class CaseEntities(BaseModel):
     """
     Structured representation of extracted case entities.
@@ -50,7 +82,7 @@ class EntityExtractor:
     def __init__(self):
         """Initialize extractor with LLM client and Persian normalizer."""
         self.client = get_llm_client()
-        self.normalizer = Normalizer()
+        self.normalizer = _get_normalizer()
 
     def extract(self, case_description: str) -> Optional[CaseEntities]:
         """
@@ -65,6 +97,12 @@ class EntityExtractor:
         # Normalize Persian text
         normalized_text = self.normalizer.normalize(case_description)
 
+        # Skip the network round-trip for inputs too short to be a case
+        stripped = normalized_text.strip()
+        if len(stripped) < MIN_CASE_LENGTH or len(stripped.split()) < MIN_CASE_WORDS:
+            st.warning("⚠️ شرح پرونده برای استخراج اطلاعات بسیار کوتاه است")
+            return None
+
         # Format prompt
         prompt = ENTITY_EXTRACTION_PROMPT.format(case_description=normalized_text)
 
@@ -98,26 +136,12 @@ class EntityExtractor:
             Tuple of (entities, warnings)
         """
         entities = self.extract(case_description)
-        warnings = []
 
         if not entities:
             return None, ["استخراج اطلاعات ناموفق بود"]
 
         # Validation warnings
-        if not entities.plaintiff:
-            warnings.append("⚠️ نام خواهان مشخص نیست")
-
-        if not entities.defendant:
-            warnings.append("⚠️ نام خوانده مشخص نیست")
-
-        if not entities.case_type:
-            warnings.append("⚠️ نوع پرونده مشخص نیست")
-
-        if not entities.claims:
-            warnings.append("⚠️ ادعاهای خواهان مشخص نیست")
-
-        if not entities.key_facts:
-            warnings.append("⚠️ واقعیات پرونده ناقص است")
+        warnings = [msg for attr, msg in VALIDATION_CHECKS if not getattr(entities, attr)]
 
         return entities, warnings
 
@@ -7,13 +7,24 @@ Gemini 2.0 Flash is free-tier and provides a great alternative to GPT-4.
 Author: Master's Thesis Project - Mahsa Mirzaei
 """
 
-import json
-from typing import Optional, Dict, Any, List
+import hashlib
+import itertools
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Iterator, List
 
+import numpy as np
+import orjson
 import streamlit as st
 
-from modules.legal_engine.base_client import LLMClient
+from modules.legal_engine.base_client import LLMClient, StreamInterruptedError
+from modules.legal_engine.rate_limiter import get_concurrency_limiter, get_rate_limiter
 from config.settings import get_settings
+from config.prompts import LEGAL_EXPERT_SYSTEM_PROMPT
+
+# Texts at least this long are token-counted locally instead of via the API
+_TOKEN_API_MAX_CHARS = 500
+# Memoized token counts kept per client (least recently used dropped first)
+_TOKEN_CACHE_SIZE = 1024
 
 
 class GeminiClient(LLMClient):
@@ -56,6 +67,15 @@ class GeminiClient(LLMClient):
         )
 
         self._embedding_model = self.settings.GEMINI_EMBEDDING_MODEL
+        self._token_counts: OrderedDict = OrderedDict()  # content hash -> token count
+
+        # Pace generate_content calls under the RPM quota instead of
+        # relying on retries after ResourceExhausted, and adapt how many
+        # run at once to what the server is currently accepting
+        self._rate_limiter = get_rate_limiter(
+            f"gemini|{self._api_key}", self.settings.GEMINI_RPM_LIMIT
+        )
+        self._concurrency_limiter = get_concurrency_limiter(f"gemini|{self._api_key}")
 
         # Import and configure SDK (new google-genai package)
         try:
@@ -69,6 +89,11 @@ class GeminiClient(LLMClient):
             )
 
         self._google_exceptions = google_exceptions
+        # 429 and 5xx errors shrink the adaptive concurrency limit
+        self._overload_exceptions = (
+            google_exceptions.ResourceExhausted,
+            google_exceptions.ServerError,
+        )
         self._genai_types = genai_types
 
         # Create client instance (replaces old genai.configure() pattern)
@@ -105,30 +130,46 @@ class GeminiClient(LLMClient):
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
         use_cache: bool = True,
+        cache_ttl: Optional[float] = None,
+        semantic_cache: bool = False,
     ) -> Optional[str]:
         """Get text completion from Gemini."""
         if system_prompt is None:
-            from config.prompts import LEGAL_EXPERT_SYSTEM_PROMPT
             system_prompt = LEGAL_EXPERT_SYSTEM_PROMPT
 
         temperature = temperature if temperature is not None else self.settings.OPENAI_TEMPERATURE  # shared default
         max_tokens = max_tokens or self.settings.OPENAI_MAX_TOKENS  # shared default
 
         # Check cache
-        cache_key = self._cache_key(prompt, temperature=temperature, max_tokens=max_tokens)
-        if use_cache and cache_key in self._cache:
-            return self._cache[cache_key]
+        cache_key = self._cache_key(
+            prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens
+        )
+        if use_cache:
+            cached = self._cache_get(cache_key, max_age=cache_ttl)
+            if cached is not None:
+                return cached
+
+        # Near-duplicate prompts (a few characters apart) can reuse an answer
+        semantic_slot = None
+        if use_cache and semantic_cache and self.settings.SEMANTIC_CACHE_ENABLED:
+            semantic_slot, cached = self._semantic_cache_lookup(
+                prompt, system_prompt, temperature=temperature, max_tokens=max_tokens
+            )
+            if cached is not None:
+                return cached
 
         def _call():
-            response = self._client.models.generate_content(
-                model=self._model_name,
-                contents=prompt,
-                config=self._genai_types.GenerateContentConfig(
-                    system_instruction=system_prompt,
-                    temperature=temperature,
-                    max_output_tokens=max_tokens,
-                ),
-            )
+            self._rate_limiter.wait()
+            with self._concurrency_limiter.slot(self._overload_exceptions):
+                response = self._client.models.generate_content(
+                    model=self._model_name,
+                    contents=prompt,
+                    config=self._genai_types.GenerateContentConfig(
+                        system_instruction=system_prompt,
+                        temperature=temperature,
+                        max_output_tokens=max_tokens,
+                    ),
+                )
             return response.text
 
         result = self._retry_with_backoff(
@@ -141,11 +182,104 @@ class GeminiClient(LLMClient):
         )
 
         if result and use_cache:
-            self._cache[cache_key] = result
-            self._save_cache()
+            self._cache_set(cache_key, result)
+            if semantic_slot is not None:
+                self._semantic_cache_set(*semantic_slot, result)
 
         return result
 
+    def get_completion_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        cache_ttl: Optional[float] = None,
+    ) -> Iterator[str]:
+        """
+        Stream a text completion from Gemini chunk by chunk.
+
+        Raises:
+            StreamInterruptedError: If the stream fails after it was opened
+        """
+        if system_prompt is None:
+            system_prompt = LEGAL_EXPERT_SYSTEM_PROMPT
+
+        temperature = temperature if temperature is not None else self.settings.OPENAI_TEMPERATURE  # shared default
+        max_tokens = max_tokens or self.settings.OPENAI_MAX_TOKENS  # shared default
+
+        # A cached answer is yielded in one piece
+        cache_key = self._cache_key(
+            prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens
+        )
+        if use_cache:
+            cached = self._cache_get(cache_key, max_age=cache_ttl)
+            if cached is not None:
+                yield cached
+                return
+
+        def _open():
+            self._rate_limiter.wait()
+            # The concurrency slot covers sending the request and receiving
+            # the first chunk only: held across yields it would stay taken
+            # for as long as the consumer reads, and an abandoned stream
+            # would be counted as a fast success
+            with self._concurrency_limiter.slot(self._overload_exceptions):
+                stream = iter(self._client.models.generate_content_stream(
+                    model=self._model_name,
+                    contents=prompt,
+                    config=self._genai_types.GenerateContentConfig(
+                        system_instruction=system_prompt,
+                        temperature=temperature,
+                        max_output_tokens=max_tokens,
+                    ),
+                ))
+                return stream, next(stream, None)
+
+        # Opening the stream is retried like get_completion(); a failure
+        # after text has been yielded can't be, so it is handed to the caller
+        opened = self._retry_with_backoff(
+            _open,
+            rate_limit_exceptions=(self._google_exceptions.ResourceExhausted,),
+            api_exceptions=(
+                self._google_exceptions.GoogleAPIError,
+                self._google_exceptions.InvalidArgument,
+            ),
+        )
+        if opened is None:
+            return
+        stream, first = opened
+
+        chunks = []
+        try:
+            for chunk in itertools.chain([first] if first is not None else [], stream):
+                if chunk.text:
+                    chunks.append(chunk.text)
+                    yield chunk.text
+        except Exception as e:
+            raise StreamInterruptedError(str(e)) from e
+
+        if chunks and use_cache:
+            self._cache_set(cache_key, "".join(chunks))
+
+    def _embed_for_similarity(self, text: str) -> Optional[np.ndarray]:
+        """Unit-norm float32 embedding of *text* for the semantic cache (None on failure)."""
+        try:
+            result = self._client.models.embed_content(
+                model=self._embedding_model,
+                contents=text,
+                config=self._genai_types.EmbedContentConfig(
+                    task_type="SEMANTIC_SIMILARITY",
+                ),
+            )
+        except Exception as e:
+            print(f"Failed to embed prompt for semantic cache: {e}")
+            return None
+        vector = np.asarray(result.embeddings[0].values, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
     # ─── Structured JSON ──────────────────────────────────────────────
 
     def get_structured_json(
@@ -153,24 +287,36 @@ class GeminiClient(LLMClient):
         prompt: str,
         system_prompt: Optional[str] = None,
         temperature: float = 0.1,
+        use_cache: bool = False,
+        cache_ttl: Optional[float] = None,
     ) -> Optional[Dict[str, Any]]:
         """Get structured JSON response from Gemini."""
         if system_prompt is None:
             system_prompt = "شما باید خروجی را به صورت JSON معتبر ارائه دهید."
 
-        try:
-            response = self._client.models.generate_content(
-                model=self._model_name,
-                contents=prompt,
-                config=self._genai_types.GenerateContentConfig(
-                    system_instruction=system_prompt,
-                    temperature=temperature,
-                    response_mime_type="application/json",
-                ),
-            )
-            return json.loads(response.text)
+        cache_key = self._cache_key(
+            prompt, system_prompt=system_prompt, temperature=temperature, json_mode=True
+        )
+        if use_cache:
+            cached = self._cache_get(cache_key, max_age=cache_ttl)
+            if cached is not None:
+                return orjson.loads(cached)
 
-        except json.JSONDecodeError as e:
+        try:
+            self._rate_limiter.wait()
+            with self._concurrency_limiter.slot(self._overload_exceptions):
+                response = self._client.models.generate_content(
+                    model=self._model_name,
+                    contents=prompt,
+                    config=self._genai_types.GenerateContentConfig(
+                        system_instruction=system_prompt,
+                        temperature=temperature,
+                        response_mime_type="application/json",
+                    ),
+                )
+            result = orjson.loads(response.text)
+
+        except orjson.JSONDecodeError as e:
             st.error(f"❌ خطا در پردازش JSON: {str(e)}")
             return None
         except self._google_exceptions.ResourceExhausted as e:
@@ -183,6 +329,11 @@ class GeminiClient(LLMClient):
             st.error(f"❌ خطا در دریافت JSON از Gemini: {str(e)}")
             return None
 
+        if use_cache:
+            self._cache_set(cache_key, response.text)
+
+        return result
+
     # ─── Embeddings ───────────────────────────────────────────────────
 
     def get_embedding(self, text: str) -> Optional[List[float]]:
@@ -201,16 +352,26 @@ class GeminiClient(LLMClient):
             return None
 
     def get_embeddings_batch(self, texts: List[str]) -> Optional[List[List[float]]]:
-        """Generate embeddings for multiple texts."""
+        """Generate embeddings for multiple texts (one request per batch)."""
         try:
+            batch_size = self.settings.EMBEDDING_BATCH_SIZE
+            config = self._genai_types.EmbedContentConfig(
+                task_type="RETRIEVAL_DOCUMENT",
+            )
+            # Embed each distinct text once and fan the vectors back out
+            unique_texts = list(dict.fromkeys(texts))
             all_embeddings = []
-            for text in texts:
-                emb = self.get_embedding(text)
-                if emb:
-                    all_embeddings.append(emb)
-                else:
-                    all_embeddings.append([0.0] * self.embedding_dimension)
-            return all_embeddings
+
+            for i in range(0, len(unique_texts), batch_size):
+                result = self._client.models.embed_content(
+                    model=self._embedding_model,
+                    contents=unique_texts[i:i + batch_size],
+                    config=config,
+                )
+                all_embeddings.extend(e.values for e in result.embeddings)
+
+            by_text = dict(zip(unique_texts, all_embeddings))
+            return [by_text[text] for text in texts]
         except Exception as e:
             st.error(f"❌ خطا در تولید embeddings (Gemini): {str(e)}")
             return None
@@ -218,13 +379,33 @@ class GeminiClient(LLMClient):
     # ─── Token counting ───────────────────────────────────────────────
 
     def count_tokens(self, text: str) -> int:
-        """Count tokens using Gemini's built-in tokenizer."""
-        try:
-            result = self._client.models.count_tokens(
-                model=self._model_name,
-                contents=text,
-            )
-            return result.total_tokens
-        except Exception:
-            # Rough estimate: ~4 chars per token for Persian
-            return len(text) // 4
+        """
+        Count tokens, calling Gemini's tokenizer only for short texts.
+
+        Long texts are estimated locally (~3.5 chars per token for Persian),
+        which is accurate enough for budget checks and saves a round trip.
+        Results are memoized by content hash.
+        """
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+        count = self._token_counts.get(key)
+        if count is not None:
+            self._token_counts.move_to_end(key)
+            return count
+
+        count = None
+        if len(text) < _TOKEN_API_MAX_CHARS:
+            try:
+                result = self._client.models.count_tokens(
+                    model=self._model_name,
+                    contents=text,
+                )
+                count = result.total_tokens
+            except Exception:
+                pass
+        if count is None:
+            count = max(1, int(len(text) / 3.5))
+
+        self._token_counts[key] = count
+        if len(self._token_counts) > _TOKEN_CACHE_SIZE:
+            self._token_counts.popitem(last=False)
+        return count
@@ -8,16 +8,28 @@ providing semantic search capabilities using TF-IDF + cosine similarity
 Author: Master's Thesis Project - Mahsa Mirzaei
 """
 
-import json
+import hashlib
+import os
+from collections import deque
+from functools import lru_cache
+import joblib
 import numpy as np
+import orjson
+import sklearn
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import streamlit as st
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.metrics.pairwise import linear_kernel
 
 from config.settings import get_settings
 
+# Below this many matrix cells (~20 MB as float32) the TF-IDF matrix is kept
+# dense, so scoring a query is one BLAS matrix-vector product
+_DENSE_MAX_CELLS = 5_000_000
+# Distinct queries whose score vectors are memoized per knowledge base
+_QUERY_CACHE_SIZE = 256
+
 
 class LegalKnowledgeBase:
     """
@@ -37,28 +49,88 @@ class LegalKnowledgeBase:
         # Paths – anchored to this file's location for portability
         _project_root = Path(__file__).resolve().parent.parent.parent
         self.articles_file = _project_root / "data" / "legal_articles.json"
+        self.tfidf_cache_file = _project_root / "data" / "tfidf_cache.joblib"
 
-        # Load articles
-        self.articles = self._load_articles()
+        # Load articles and legal concepts (the file is read once)
+        data = self._load_data()
+        self.articles = data.get('articles', [])
+        self._concepts = data.get('legal_concepts', {})
+        self._by_number = {a['article_number']: a for a in self.articles}
         self.article_texts = [self._article_to_text(a) for a in self.articles]
 
-        # Build TF-IDF model (local, no API)
-        self._vectorizer = TfidfVectorizer(
+        # Lower-cased keywords/text, computed once instead of per query
+        self._kw_lower = [[kw.lower() for kw in a.get('keywords', [])] for a in self.articles]
+        self._text_lower = [a['text'].lower() for a in self.articles]
+
+        # Distinct keywords across all articles and an (articles x keywords)
+        # count matrix, so a query is scanned once per distinct keyword
+        self._kw_vocab = sorted({kw for kws in self._kw_lower for kw in kws})
+        vocab_index = {kw: j for j, kw in enumerate(self._kw_vocab)}
+        self._kw_incidence = np.zeros((len(self.articles), len(self._kw_vocab)), dtype=np.float32)
+        for i, kws in enumerate(self._kw_lower):
+            for kw in kws:
+                self._kw_incidence[i, vocab_index[kw]] += 1
+        self._kw_totals = np.maximum([len(kws) for kws in self._kw_lower], 1).astype(np.float32)
+
+        # Build TF-IDF model (local, no API), reusing the on-disk copy
+        # when the article texts haven't changed
+        self._vectorizer, self._tfidf_matrix = self._load_or_fit_tfidf()
+        n_rows, n_cols = self._tfidf_matrix.shape
+        self._tfidf_dense = (
+            self._tfidf_matrix.toarray() if n_rows * n_cols <= _DENSE_MAX_CELLS else None
+        )
+
+        # Streamlit reruns repeat the same queries; memoize their score vectors
+        self._score_query = lru_cache(maxsize=_QUERY_CACHE_SIZE)(self._tfidf_scores)
+        self._score_keywords = lru_cache(maxsize=_QUERY_CACHE_SIZE)(self._keyword_match_scores)
+
+    def _load_data(self) -> Dict[str, Any]:
+        """Load legal articles and concepts from JSON file."""
+        try:
+            return orjson.loads(self.articles_file.read_bytes())
+        except Exception as e:
+            st.error(f"❌ خطا در بارگذاری مواد قانونی: {str(e)}")
+            return {}
+
+    def _load_or_fit_tfidf(self):
+        """
+        Load the fitted TF-IDF vectorizer and matrix from disk, or fit them.
+
+        The cache is keyed by a hash of the article texts and the
+        scikit-learn version, so edits to the articles trigger a refit.
+
+        Returns:
+            Tuple of (vectorizer, tfidf_matrix)
+        """
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{sklearn.__version__}|".encode())
+        h.update("\x1f".join(self.article_texts).encode("utf-8"))
+        key = h.hexdigest()
+
+        try:
+            cached_key, vectorizer, matrix = joblib.load(self.tfidf_cache_file)
+            if cached_key == key:
+                return vectorizer, matrix
+        except Exception:
+            pass
+
+        vectorizer = TfidfVectorizer(
             analyzer="char_wb",   # char n-grams work well for Persian
             ngram_range=(2, 4),
             max_features=8000,
+            dtype=np.float32,     # half the memory of the float64 default
         )
-        self._tfidf_matrix = self._vectorizer.fit_transform(self.article_texts)
+        matrix = vectorizer.fit_transform(self.article_texts)
 
-    def _load_articles(self) -> List[Dict[str, Any]]:
-        """Load legal articles from JSON file."""
+        # Write to a temp file and rename so a crash never leaves a torn cache
         try:
-            with open(self.articles_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data['articles']
+            tmp_file = self.tfidf_cache_file.with_suffix(".tmp")
+            joblib.dump((key, vectorizer, matrix), tmp_file)
+            os.replace(tmp_file, self.tfidf_cache_file)
         except Exception as e:
-            st.error(f"❌ خطا در بارگذاری مواد قانونی: {str(e)}")
-            return []
+            print(f"Failed to save TF-IDF cache: {e}")
+
+        return vectorizer, matrix
 
     def _article_to_text(self, article: Dict[str, Any]) -> str:
         """
@@ -90,48 +162,73 @@ class LegalKnowledgeBase:
         top_k = top_k or self.settings.TOP_K_ARTICLES
         similarity_threshold = similarity_threshold or self.settings.SIMILARITY_THRESHOLD
 
-        # TF-IDF similarity (local, no API)
-        query_vec = self._vectorizer.transform([query])
-        similarities = cosine_similarity(query_vec, self._tfidf_matrix).flatten()
+        similarities = self._score_query(query)
+
+        # Get top-k indices (partial selection unless every article is wanted)
+        if top_k < len(similarities):
+            top_indices = np.argpartition(-similarities, top_k)[:top_k]
+            top_indices = top_indices[np.argsort(-similarities[top_indices])]
+        else:
+            top_indices = np.argsort(-similarities)
 
-        # Get top-k indices
-        top_indices = similarities.argsort()[::-1][:top_k]
+        if use_hybrid:
+            keyword_scores = self._score_keywords(query.lower())
 
         results = []
         for idx in top_indices:
-            article = self.articles[idx].copy()
             similarity = float(similarities[idx])
 
             # Keyword matching bonus (hybrid approach)
             if use_hybrid:
-                keyword_score = self._keyword_match_score(query, article)
-                final_score = 0.7 * similarity + 0.3 * keyword_score
+                final_score = 0.7 * similarity + 0.3 * float(keyword_scores[idx])
             else:
                 final_score = similarity
 
-            article['relevance_score'] = final_score
-            article['similarity'] = similarity
-
             if final_score >= similarity_threshold:
-                results.append(article)
+                results.append({
+                    **self.articles[idx],
+                    'relevance_score': final_score,
+                    'similarity': similarity,
+                })
 
         results.sort(key=lambda x: x['relevance_score'], reverse=True)
         return results
 
-    def _keyword_match_score(self, query: str, article: Dict[str, Any]) -> float:
+    def _tfidf_scores(self, query: str) -> np.ndarray:
         """
-        Calculate keyword match score between query and article.
+        Cosine similarity between the query and every article.
+
+        TF-IDF rows are already L2-normalized, so the dot product is the
+        cosine similarity (local, no API).
+
+        Args:
+            query: Search query
 
-        Simple but effective: count how many article keywords appear in query.
+        Returns:
+            Array of similarities, one per article
         """
-        query_lower = query.lower()
-        keywords = article.get('keywords', [])
+        query_vec = self._vectorizer.transform([query])
+        if self._tfidf_dense is not None:
+            return self._tfidf_dense @ query_vec.toarray().ravel()
+        return linear_kernel(query_vec, self._tfidf_matrix).ravel()
 
-        if not keywords:
-            return 0.0
+    def _keyword_match_scores(self, query_lower: str) -> np.ndarray:
+        """
+        Calculate keyword match scores between the query and every article.
 
-        matches = sum(1 for kw in keywords if kw.lower() in query_lower)
-        return matches / len(keywords)
+        Simple but effective: the fraction of each article's keywords that
+        appear in the query. Each distinct keyword is searched for once.
+
+        Args:
+            query_lower: Lower-cased query
+
+        Returns:
+            Array of scores, one per article
+        """
+        hits = np.fromiter(
+            (kw in query_lower for kw in self._kw_vocab), dtype=np.float32, count=len(self._kw_vocab)
+        )
+        return (self._kw_incidence @ hits) / self._kw_totals
 
     def get_article_by_number(self, article_num: int) -> Optional[Dict[str, Any]]:
         """
@@ -141,12 +238,10 @@ class LegalKnowledgeBase:
             article_num: Article number
 
         Returns:
-            Article dict or None if not found
+            Article dict (a copy the caller may modify) or None if not found
         """
-        for article in self.articles:
-            if article['article_number'] == article_num:
-                return article.copy()
-        return None
+        article = self._by_number.get(article_num)
+        return article.copy() if article else None
 
     def get_related_articles(
         self,
@@ -163,23 +258,23 @@ class LegalKnowledgeBase:
             depth: How many levels to traverse
 
         Returns:
-            List of related articles
+            List of related articles (copies)
         """
         visited = set()
-        queue = [(article_num, 0)]  # (article_num, current_depth)
+        queue = deque([(article_num, 0)])  # (article_num, current_depth)
         results = []
 
         while queue:
-            current_num, current_depth = queue.pop(0)
+            current_num, current_depth = queue.popleft()
 
             if current_num in visited or current_depth > depth:
                 continue
 
             visited.add(current_num)
-            article = self.get_article_by_number(current_num)
+            article = self._by_number.get(current_num)
 
             if article and current_num != article_num:  # Don't include starting article
-                results.append(article)
+                results.append(article.copy())
 
             # Add related articles to queue
             if article and current_depth < depth:
@@ -190,7 +285,7 @@ class LegalKnowledgeBase:
         return results
 
     def get_all_articles(self) -> List[Dict[str, Any]]:
-        """Get all articles in the knowledge base."""
+        """Get all articles in the knowledge base (copies)."""
         return [a.copy() for a in self.articles]
 
     def get_legal_concept(self, concept_name: str) -> Optional[Dict[str, Any]]:
@@ -203,13 +298,7 @@ class LegalKnowledgeBase:
         Returns:
             Concept details or None
         """
-        try:
-            with open(self.articles_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                concepts = data.get('legal_concepts', {})
-                return concepts.get(concept_name)
-        except Exception:
-            return None
+        return self._concepts.get(concept_name)
 
     def search_by_keywords(self, keywords: List[str], match_all: bool = False) -> List[Dict[str, Any]]:
         """
@@ -220,25 +309,17 @@ class LegalKnowledgeBase:
             match_all: If True, article must contain all keywords
 
         Returns:
-            Matching articles
+            Matching articles (copies)
         """
+        wanted = [kw.lower() for kw in keywords]
+        match = all if match_all else any
         results = []
 
-        for article in self.articles:
-            article_keywords = [kw.lower() for kw in article.get('keywords', [])]
-            article_text = article['text'].lower()
-
-            if match_all:
-                # Must match all keywords
-                if all(any(kw.lower() in article_text or kw.lower() in article_keywords
-                          for kw in [keyword])
-                      for keyword in keywords):
-                    results.append(article.copy())
-            else:
-                # Match any keyword
-                if any(kw.lower() in article_text or kw.lower() in article_keywords
-                      for kw in keywords):
-                    results.append(article.copy())
+        for article, article_keywords, article_text in zip(
+            self.articles, self._kw_lower, self._text_lower
+        ):
+            if match(kw in article_text or kw in article_keywords for kw in wanted):
+                results.append(article.copy())
 
         return results
 
@@ -13,15 +13,96 @@ can be used interchangeably throughout the application.
 Author: Master's Thesis Project - Mahsa Mirzaei
 """
 
-import json
-from typing import Optional, Dict, Any, List
-
-import tiktoken
+import asyncio
+import atexit
+import random
+import threading
+from functools import lru_cache
+from typing import Optional, Dict, Any, Iterator, List
+
+import orjson
 import streamlit as st
-from openai import OpenAI, RateLimitError, APIError
 
-from modules.legal_engine.base_client import LLMClient
+from modules.legal_engine.base_client import LLMClient, StreamInterruptedError
+from modules.legal_engine.rate_limiter import get_token_bucket
 from config.settings import get_settings
+from config.prompts import LEGAL_EXPERT_SYSTEM_PROMPT
+
+# Embedding requests sent concurrently, and the token budget of each one
+# (kept under the 8192-token request limit of the embedding models)
+_EMBEDDING_CONCURRENCY = 5
+_EMBEDDING_BATCH_TOKENS = 6000
+
+# One keep-alive connection pool shared by every OpenAIClient in the process,
+# so rebuilding the client (new key/model) doesn't redo TCP + TLS handshakes
+_http_client = None
+_http_client_lock = threading.Lock()
+_warmed_hosts = set()  # Hosts already pre-connected by _prewarm_connection()
+
+
+def _get_http_client():
+    """Get the shared httpx client (created on first use, closed at exit)."""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            import httpx
+            _http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_keepalive_connections=20,
+                    max_connections=100,
+                    keepalive_expiry=30.0,
+                ),
+                timeout=httpx.Timeout(60.0, connect=10.0),
+            )
+            atexit.register(_http_client.close)
+        return _http_client
+
+
+def _prewarm_connection(url) -> None:
+    """
+    Open a pooled connection to *url*'s host in a background thread.
+
+    Runs once per host, so the TCP + TLS handshake is already done when the
+    first real request is sent.
+
+    Args:
+        url: httpx.URL of the API (e.g. the SDK client's base_url)
+    """
+    with _http_client_lock:
+        if url.host in _warmed_hosts:
+            return
+        _warmed_hosts.add(url.host)
+
+    def _head():
+        try:
+            _get_http_client().head(url)
+        except Exception:
+            pass  # Only an optimization; the first real request will connect
+
+    threading.Thread(target=_head, daemon=True).start()
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model_name: str):
+    """
+    Load the tiktoken encoding for *model_name* once per process.
+
+    Rebuilt clients (new key/model) reuse the already-parsed BPE tables.
+    """
+    import tiktoken
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.encoding_for_model("gpt-4")
+
+
+@lru_cache(maxsize=1024)
+def _count_tokens(model_name: str, text: str) -> int:
+    """
+    Token count of *text*, memoized so constant strings such as the system
+    prompt are encoded only once.
+    """
+    return len(_get_encoding(model_name).encode(text))
 
 
 class OpenAIClient(LLMClient):
@@ -62,12 +143,25 @@ class OpenAIClient(LLMClient):
             or self.settings.OPENAI_MODEL
         )
 
-        self.client = OpenAI(api_key=resolved_key)
-
+        # Import SDK only when a client is actually built
         try:
-            self.encoding = tiktoken.encoding_for_model(self._model_name)
-        except KeyError:
-            self.encoding = tiktoken.encoding_for_model("gpt-4")
+            from openai import OpenAI, RateLimitError, APIError
+        except ImportError:
+            raise ImportError(
+                "پکیج openai نصب نیست. "
+                "لطفاً اجرا کنید: pip install openai"
+            )
+
+        self._rate_limit_errors = (RateLimitError,)
+        self._api_errors = (APIError,)
+        self.client = OpenAI(api_key=resolved_key, http_client=_get_http_client())
+        _prewarm_connection(self.client.base_url)
+
+        # Gate chat requests locally on the account's RPM / TPM limits
+        # instead of only backing off after a RateLimitError (a limit <= 0 means no cap)
+        rpm, tpm = self.settings.OPENAI_RPM_LIMIT, self.settings.OPENAI_TPM_LIMIT
+        self._request_bucket = get_token_bucket(f"openai|rpm|{resolved_key}", rpm) if rpm > 0 else None
+        self._token_bucket = get_token_bucket(f"openai|tpm|{resolved_key}", tpm) if tpm > 0 else None
 
     # ─── Properties ───────────────────────────────────────────────────
 
@@ -83,6 +177,14 @@ class OpenAIClient(LLMClient):
     def embedding_dimension(self) -> int:
         return self.settings.EMBEDDING_DIMENSION
 
+    def _wait_for_capacity(self, messages: List[Dict[str, str]], max_tokens: int):
+        """Block until the rate limits admit a chat request of this size."""
+        if self._request_bucket is not None:
+            self._request_bucket.acquire(1)
+        if self._token_bucket is not None:
+            prompt_tokens = sum(self.count_tokens(m["content"]) for m in messages)
+            self._token_bucket.acquire(prompt_tokens + max_tokens)
+
     # ─── Token counting ───────────────────────────────────────────────
 
     def count_tokens(self, text: str) -> int:
@@ -95,7 +197,7 @@ class OpenAIClient(LLMClient):
         Returns:
             Number of tokens
         """
-        return len(self.encoding.encode(text))
+        return _count_tokens(self._model_name, text)
 
     # ─── Chat completion ──────────────────────────────────────────────
 
@@ -106,6 +208,8 @@ class OpenAIClient(LLMClient):
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
         use_cache: bool = True,
+        cache_ttl: Optional[float] = None,
+        semantic_cache: bool = False,
     ) -> Optional[str]:
         """
         Get completion from OpenAI with retry logic and caching.
@@ -116,13 +220,15 @@ class OpenAIClient(LLMClient):
             temperature: Sampling temperature (0-2)
             max_tokens: Maximum tokens in response
             use_cache: Whether to use cached responses
+            cache_ttl: Ignore cached responses older than this many seconds
+            semantic_cache: Also reuse answers to near-identical prompts
+                (only for prompts without case-specific fields)
 
         Returns:
             Generated text or None if failed
         """
         # Use default system prompt if not provided
         if system_prompt is None:
-            from config.prompts import LEGAL_EXPERT_SYSTEM_PROMPT
             system_prompt = LEGAL_EXPERT_SYSTEM_PROMPT
 
         # Use settings defaults if not specified
@@ -130,18 +236,34 @@ class OpenAIClient(LLMClient):
         max_tokens = max_tokens or self.settings.OPENAI_MAX_TOKENS
 
         # Check cache first
-        cache_key = self._cache_key(prompt, temperature=temperature, max_tokens=max_tokens)
-        if use_cache and cache_key in self._cache:
-            return self._cache[cache_key]
+        cache_key = self._cache_key(
+            prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens
+        )
+        if use_cache:
+            cached = self._cache_get(cache_key, max_age=cache_ttl)
+            if cached is not None:
+                return cached
+
+        # Near-duplicate prompts (a few characters apart) can reuse an answer
+        semantic_slot = None
+        if use_cache and semantic_cache and self.settings.SEMANTIC_CACHE_ENABLED:
+            semantic_slot, cached = self._semantic_cache_lookup(
+                prompt, system_prompt, temperature=temperature, max_tokens=max_tokens
+            )
+            if cached is not None:
+                return cached
 
         # API call with retry
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt},
+        ]
+
         def _call():
+            self._wait_for_capacity(messages, max_tokens)
             response = self.client.chat.completions.create(
                 model=self._model_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt},
-                ],
+                messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
             )
@@ -149,16 +271,98 @@ class OpenAIClient(LLMClient):
 
         result = self._retry_with_backoff(
             _call,
-            rate_limit_exceptions=(RateLimitError,),
-            api_exceptions=(APIError,),
+            rate_limit_exceptions=self._rate_limit_errors,
+            api_exceptions=self._api_errors,
         )
 
         if result and use_cache:
-            self._cache[cache_key] = result
-            self._save_cache()
+            self._cache_set(cache_key, result)
+            if semantic_slot is not None:
+                self._semantic_cache_set(*semantic_slot, result)
 
         return result
 
+    def get_completion_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        cache_ttl: Optional[float] = None,
+    ) -> Iterator[str]:
+        """
+        Stream a completion from OpenAI chunk by chunk.
+
+        Args:
+            prompt: User prompt (in Persian)
+            system_prompt: System prompt (optional, defaults to legal expert)
+            temperature: Sampling temperature (0-2)
+            max_tokens: Maximum tokens in response
+            use_cache: Whether to use cached responses
+            cache_ttl: Ignore cached responses older than this many seconds
+
+        Yields:
+            Text chunks as they arrive (a cached answer arrives in one piece)
+
+        Raises:
+            StreamInterruptedError: If the stream fails after it was opened
+        """
+        if system_prompt is None:
+            system_prompt = LEGAL_EXPERT_SYSTEM_PROMPT
+
+        temperature = temperature if temperature is not None else self.settings.OPENAI_TEMPERATURE
+        max_tokens = max_tokens or self.settings.OPENAI_MAX_TOKENS
+
+        cache_key = self._cache_key(
+            prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens
+        )
+        if use_cache:
+            cached = self._cache_get(cache_key, max_age=cache_ttl)
+            if cached is not None:
+                yield cached
+                return
+
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt},
+        ]
+
+        def _open():
+            self._wait_for_capacity(messages, max_tokens)
+            return self.client.chat.completions.create(
+                model=self._model_name,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+            )
+
+        # Opening the stream is retried like get_completion(); a failure
+        # after text has been yielded can't be, so it is handed to the caller
+        stream = self._retry_with_backoff(
+            _open,
+            rate_limit_exceptions=self._rate_limit_errors,
+            api_exceptions=self._api_errors,
+        )
+        if stream is None:
+            return
+
+        chunks = []
+        try:
+            for event in stream:
+                if not event.choices:
+                    continue
+                text = event.choices[0].delta.content
+                if text:
+                    chunks.append(text)
+                    yield text
+        except Exception as e:
+            raise StreamInterruptedError(str(e)) from e
+
+        if chunks and use_cache:
+            self._cache_set(cache_key, "".join(chunks))
+
     # ─── Structured JSON ──────────────────────────────────────────────
 
     def get_structured_json(
@@ -166,6 +370,8 @@ class OpenAIClient(LLMClient):
         prompt: str,
         system_prompt: Optional[str] = None,
         temperature: float = 0.1,
+        use_cache: bool = False,
+        cache_ttl: Optional[float] = None,
     ) -> Optional[Dict[str, Any]]:
         """
         Get structured JSON response using OpenAI's JSON mode.
@@ -174,6 +380,8 @@ class OpenAIClient(LLMClient):
             prompt: User prompt
             system_prompt: System prompt
             temperature: Low temperature for consistency
+            use_cache: Whether to use cached responses
+            cache_ttl: Ignore cached responses older than this many seconds
 
         Returns:
             Parsed JSON dict or None if failed
@@ -181,21 +389,32 @@ class OpenAIClient(LLMClient):
         if system_prompt is None:
             system_prompt = "شما باید خروجی را به صورت JSON معتبر ارائه دهید."
 
+        cache_key = self._cache_key(
+            prompt, system_prompt=system_prompt, temperature=temperature, json_mode=True
+        )
+        if use_cache:
+            cached = self._cache_get(cache_key, max_age=cache_ttl)
+            if cached is not None:
+                return orjson.loads(cached)
+
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt},
+        ]
+
         try:
+            self._wait_for_capacity(messages, self.settings.OPENAI_MAX_TOKENS)
             response = self.client.chat.completions.create(
                 model=self._model_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt},
-                ],
+                messages=messages,
                 response_format={"type": "json_object"},
                 temperature=temperature,
             )
 
             result_text = response.choices[0].message.content
-            return json.loads(result_text)
+            result = orjson.loads(result_text)
 
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             st.error(f"❌ خطا در پردازش JSON: {str(e)}")
             return None
 
@@ -203,6 +422,11 @@ class OpenAIClient(LLMClient):
             st.error(f"❌ خطا در دریافت JSON: {str(e)}")
             return None
 
+        if use_cache:
+            self._cache_set(cache_key, result_text)
+
+        return result
+
     # ─── Embeddings ───────────────────────────────────────────────────
 
     def get_embedding(self, text: str) -> Optional[List[float]]:
@@ -226,35 +450,87 @@ class OpenAIClient(LLMClient):
             st.error(f"❌ خطا در تولید embedding: {str(e)}")
             return None
 
+    def _pack_embedding_batches(self, texts: List[str]) -> List[List[str]]:
+        """
+        Greedily group texts so each request stays within the token budget.
+
+        A batch holds at most EMBEDDING_BATCH_SIZE texts and
+        _EMBEDDING_BATCH_TOKENS tokens, so many short titles share one
+        request while long statute texts are split across several.
+        """
+        batches: List[List[str]] = []
+        batch: List[str] = []
+        batch_tokens = 0
+        for text in texts:
+            tokens = self.count_tokens(text)
+            if batch and (
+                batch_tokens + tokens > _EMBEDDING_BATCH_TOKENS
+                or len(batch) >= self.settings.EMBEDDING_BATCH_SIZE
+            ):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
     def get_embeddings_batch(self, texts: List[str]) -> Optional[List[List[float]]]:
         """
         Generate embeddings for multiple texts efficiently.
 
+        Texts are packed into batches by token count (see
+        _pack_embedding_batches) and up to _EMBEDDING_CONCURRENCY batches
+        are in flight at once; each batch is retried on its own if
+        rate-limited.
+
         Args:
             texts: List of texts to embed
 
         Returns:
             List of embedding vectors or None if failed
         """
-        try:
-            # Process in batches of 100 (OpenAI limit)
-            batch_size = 100
-            all_embeddings = []
+        # Embed each distinct text once and fan the vectors back out
+        unique_texts = list(dict.fromkeys(texts))
+        batches = self._pack_embedding_batches(unique_texts)
+
+        def _embed(batch: List[str]) -> List[List[float]]:
+            response = self.client.embeddings.create(
+                model=self.settings.EMBEDDING_MODEL,
+                input=batch,
+            )
+            return [e.embedding for e in response.data]
+
+        async def _embed_all():
+            semaphore = asyncio.Semaphore(_EMBEDDING_CONCURRENCY)
 
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i : i + batch_size]
-                response = self.client.embeddings.create(
-                    model=self.settings.EMBEDDING_MODEL,
-                    input=batch,
-                )
-                all_embeddings.extend([e.embedding for e in response.data])
+            async def _one(batch: List[str]):
+                async with semaphore:
+                    # Small jitter so concurrent batches don't hit the API in lockstep
+                    await asyncio.sleep(random.uniform(0, 0.1))
+                    return await self._run_in_thread(
+                        self._retry_with_backoff,
+                        lambda: _embed(batch),
+                        rate_limit_exceptions=self._rate_limit_errors,
+                        api_exceptions=self._api_errors,
+                    )
 
-            return all_embeddings
+            return await asyncio.gather(*(_one(batch) for batch in batches))
 
+        try:
+            results = asyncio.run(_embed_all())
         except Exception as e:
             st.error(f"❌ خطا در تولید embeddings: {str(e)}")
             return None
 
+        if any(r is None for r in results):
+            return None
+        by_text = dict(zip(
+            unique_texts,
+            (embedding for batch_embeddings in results for embedding in batch_embeddings),
+        ))
+        return [by_text[text] for text in texts]
+
 
 # ─── Backward-compatible helper ──────────────────────────────────────
 # Kept so that any stray imports of get_openai_client still work.
@@ -0,0 +1,231 @@
+"""
+Client-side Rate Limiting for LLM Providers.
+
+Paces outgoing API requests so that the provider's requests-per-minute
+quota is never exceeded, instead of firing requests and backing off after
+a 429 / ResourceExhausted error, and adapts how many requests may be in
+flight at once (AIMD, as in TCP congestion control).
+
+Author: Master's Thesis Project - Mahsa Mirzaei
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Tuple, Type
+
+
+class SlidingWindowLimiter:
+    """
+    Thread-safe sliding-window limiter: at most *max_calls* per *period* seconds.
+
+    wait() blocks until a slot is free and then records the call, so it
+    must be invoked right before dispatching each request.
+    """
+
+    def __init__(self, max_calls: int, period: float = 60.0):
+        """
+        Initialize limiter.
+
+        Args:
+            max_calls: Maximum requests allowed inside one window
+            period: Window length in seconds
+        """
+        self.max_calls = max(1, max_calls)
+        self.period = period
+        self._call_times: deque = deque()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until another request may be sent, then record it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._call_times and now - self._call_times[0] >= self.period:
+                    self._call_times.popleft()
+
+                if len(self._call_times) < self.max_calls:
+                    self._call_times.append(now)
+                    return
+
+                delay = self.period - (now - self._call_times[0]) + 0.05
+
+            time.sleep(delay)
+
+
+class AIMDConcurrencyLimiter:
+    """
+    Adaptive cap on concurrent requests (additive increase, multiplicative decrease).
+
+    Each successful request whose latency is at or below *target_latency*
+    raises the cap by *increase*; an overload error (429 / 5xx) multiplies
+    it by *decrease*. Callers waiting for a slot are woken as it changes.
+    """
+
+    def __init__(
+        self,
+        initial: float = 2.0,
+        min_limit: float = 1.0,
+        max_limit: float = 8.0,
+        increase: float = 0.5,
+        decrease: float = 0.5,
+        target_latency: float = 2.0,
+    ):
+        """
+        Initialize limiter.
+
+        Args:
+            initial: Starting concurrency cap
+            min_limit: Lowest cap the limiter may shrink to
+            max_limit: Highest cap the limiter may grow to
+            increase: Amount added to the cap after a fast success
+            decrease: Factor applied to the cap after an overload error
+            target_latency: Latency (seconds) under which the cap may grow
+        """
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.target_latency = target_latency
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self, overload_exceptions: Tuple[Type[BaseException], ...] = ()):
+        """
+        Hold one concurrency slot for the duration of a request.
+
+        Args:
+            overload_exceptions: Exceptions meaning the server is overloaded;
+                they shrink the cap and are re-raised
+        """
+        with self._cond:
+            while self._in_flight >= int(self.limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+        start = time.monotonic()
+        try:
+            yield
+        except overload_exceptions:
+            with self._cond:
+                self.limit = max(self.min_limit, self.limit * self.decrease)
+            raise
+        else:
+            if time.monotonic() - start <= self.target_latency:
+                with self._cond:
+                    self.limit = min(self.max_limit, self.limit + self.increase)
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: holds up to *capacity* tokens, refilled at *refill_rate*/s.
+
+    acquire(n) blocks until *n* tokens are available and takes them, which
+    lets short bursts through while holding the long-run rate to the limit.
+    """
+
+    def __init__(self, capacity: float, refill_rate: float):
+        """
+        Initialize bucket (starts full).
+
+        Args:
+            capacity: Maximum tokens the bucket can hold (burst size)
+            refill_rate: Tokens added per second (must be positive)
+        """
+        if refill_rate <= 0:
+            raise ValueError(f"refill_rate must be positive, got {refill_rate}")
+        self.capacity = max(1.0, capacity)
+        self.refill_rate = refill_rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: float = 1.0):
+        """Block until *n* tokens are available, then take them."""
+        # A request larger than the bucket could never be admitted otherwise
+        n = min(n, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.refill_rate
+                )
+                self._updated = now
+
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return
+
+                delay = (n - self._tokens) / self.refill_rate
+
+            # Jitter keeps waiting threads from all retrying at the same instant
+            time.sleep(delay + random.uniform(0, 0.05))
+
+
+# One limiter per API key, shared by every client/session using that key
+_limiters: Dict[str, SlidingWindowLimiter] = {}
+_concurrency_limiters: Dict[str, "AIMDConcurrencyLimiter"] = {}
+_token_buckets: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(key: str, max_calls: int, period: float = 60.0) -> SlidingWindowLimiter:
+    """
+    Get the shared limiter for *key* (typically provider + API key).
+
+    Args:
+        key: Identifier of the quota being protected
+        max_calls: Maximum requests per window (used on first creation)
+        period: Window length in seconds (used on first creation)
+
+    Returns:
+        SlidingWindowLimiter instance
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = SlidingWindowLimiter(max_calls, period)
+        return limiter
+
+
+def get_concurrency_limiter(key: str) -> AIMDConcurrencyLimiter:
+    """
+    Get the shared AIMD concurrency limiter for *key*.
+
+    Args:
+        key: Identifier of the quota being protected
+
+    Returns:
+        AIMDConcurrencyLimiter instance
+    """
+    with _limiters_lock:
+        limiter = _concurrency_limiters.get(key)
+        if limiter is None:
+            limiter = _concurrency_limiters[key] = AIMDConcurrencyLimiter()
+        return limiter
+
+
+def get_token_bucket(key: str, per_minute: float) -> TokenBucket:
+    """
+    Get the shared token bucket for *key*, sized for *per_minute* tokens.
+
+    Args:
+        key: Identifier of the quota being protected (e.g. requests or tokens per minute)
+        per_minute: Budget per minute (used on first creation)
+
+    Returns:
+        TokenBucket instance
+    """
+    with _limiters_lock:
+        bucket = _token_buckets.get(key)
+        if bucket is None:
+            bucket = _token_buckets[key] = TokenBucket(per_minute, per_minute / 60.0)
+        return bucket
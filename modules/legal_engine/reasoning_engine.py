@@ -13,17 +13,50 @@ a multi-step reasoning process that mirrors how judges analyze cases:
 Author: Master's Thesis Project - Mahsa Mirzaei
 """
 
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass, field
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
+from modules.legal_engine.base_client import StreamInterruptedError
 from modules.legal_engine.client_factory import get_llm_client
 from modules.legal_engine.knowledge_base import get_knowledge_base
 from modules.legal_engine.entity_extractor import CaseEntities
 from config.prompts import (
     ARTICLE_APPLICABILITY_PROMPT,
-    DEDUCTION_GENERATION_PROMPT
+    BATCH_ARTICLE_APPLICABILITY_PROMPT,
+    DEDUCTION_GENERATION_PROMPT,
+    LEGAL_EXPERT_SYSTEM_PROMPT
 )
+from config.settings import get_settings
+
+# Article applicability analyses requested from the LLM at the same time
+MAX_PARALLEL_ANALYSES = 5
+
+# How long cached LLM answers stay valid (seconds): the law text changes
+# rarely, deductions depend on the combined analyses and are refreshed daily
+ARTICLE_ANALYSIS_CACHE_TTL = 30 * 24 * 3600
+DEDUCTION_CACHE_TTL = 24 * 3600
+
+# Confidence keyword tiers, strongest first; one regex group per tier
+_CONFIDENCE_TIERS = (
+    (0.95, ('قطعاً', 'حتماً', 'بدون شک', 'کاملاً')),         # High
+    (0.80, ('احتمالاً', 'به نظر می‌رسد', 'مرتبط است')),      # Good
+    (0.60, ('ممکن است', 'شاید', 'می‌تواند')),                # Medium
+    (0.30, ('نامحتمل', 'بعید', 'کمتر مرتبط')),               # Low
+)
+_CONFIDENCE_SCORES = tuple(score for score, _ in _CONFIDENCE_TIERS)
+# Zero-width lookahead so overlapping keywords (e.g. 'کمتر مرتبط' and
+# 'مرتبط است') are all seen, as separate substring checks would
+_CONFIDENCE_RE = re.compile("(?=" + "|".join(
+    "(" + "|".join(map(re.escape, keywords)) + ")" for _, keywords in _CONFIDENCE_TIERS
+) + ")")
+
+# A numbered or bulleted list item; captures the item text without its marker
+_DEDUCTION_RE = re.compile(r'^\s*[\d\-•][\d.\-•)\s]*([^\d.\-•)\s].*?)\s*$')
 
 
 @dataclass
@@ -59,6 +92,18 @@ class ReasoningResult:
     deductions: List[str]
     graph_data: Optional[Dict[str, Any]] = None
     overall_confidence: float = 0.0
+    # FACT / ARTICLE steps, split out of reasoning_steps once at construction
+    fact_steps: List[ReasoningStep] = field(init=False, repr=False)
+    article_steps: List[ReasoningStep] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.fact_steps = []
+        self.article_steps = []
+        for step in self.reasoning_steps:
+            if step.step_type == "FACT":
+                self.fact_steps.append(step)
+            elif step.step_type == "ARTICLE":
+                self.article_steps.append(step)
 
 
 class ReasoningEngine:
@@ -74,6 +119,7 @@ class ReasoningEngine:
         """Initialize reasoning engine with knowledge base and LLM client."""
         self.client = get_llm_client()
         self.kb = get_knowledge_base()
+        self.settings = get_settings()
 
     def analyze_case(
         self,
@@ -95,23 +141,32 @@ class ReasoningEngine:
         Returns:
             ReasoningResult with complete analysis or None if failed
         """
-        st.info("🔍 شروع تحلیل پرونده...")
+        # Progress messages go to one placeholder that is rewritten in place,
+        # instead of adding a new Streamlit element for every step
+        status = st.empty()
+        ui_log = []
+
+        def _log(message: str):
+            ui_log.append(message)
+            status.info("  \n".join(ui_log))
+
+        _log("🔍 شروع تحلیل پرونده...")
 
         # Step 1: Retrieve relevant articles using RAG
-        st.info("📚 بازیابی مواد قانونی مرتبط...")
+        _log("📚 بازیابی مواد قانونی مرتبط...")
         articles = self.kb.retrieve_relevant_articles(
             query=case_description,
             top_k=3
         )
 
         if not articles:
-            st.error("❌ هیچ ماده قانونی مرتبطی یافت نشد")
+            status.error("❌ هیچ ماده قانونی مرتبطی یافت نشد")
             return None
 
-        st.success(f"✅ {len(articles)} ماده قانونی بازیابی شد")
+        _log(f"✅ {len(articles)} ماده قانونی بازیابی شد")
 
         # Step 2: Analyze each article's applicability
-        st.info("⚖️ تحلیل کاربرد هر ماده...")
+        _log("⚖️ تحلیل کاربرد هر ماده...")
         reasoning_steps = []
 
         # Add initial facts as reasoning steps
@@ -123,19 +178,32 @@ class ReasoningEngine:
             )
             reasoning_steps.append(step)
 
-        # Analyze each retrieved article (with delay to respect rate limits)
-        import time as _time
+        # Analyze the retrieved articles concurrently (the LLM client paces
+        # requests itself), then render the results in order
+        ctx = get_script_run_ctx()
+
+        def _analyze(article: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            if ctx is not None:
+                add_script_run_ctx(threading.current_thread(), ctx)
+            return self._analyze_article_applicability(
+                article=article,
+                case_facts=entities.key_facts,
+                case_desc=case_description
+            )
+
+        analyses = None
+        if self.settings.BATCH_ARTICLE_ANALYSIS:
+            # One JSON request for all articles; per-article calls on failure
+            analyses = self._analyze_articles_batched(articles, entities.key_facts)
+
+        if analyses is None:
+            with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_ANALYSES, len(articles))) as pool:
+                analyses = list(pool.map(_analyze, articles))
+
         article_analyses = []
-        for i, article in enumerate(articles, 1):
-            if i > 1:
-                _time.sleep(2)  # Delay between API calls to avoid rate limits
+        confidence_sum = 0.0
+        for i, (article, analysis) in enumerate(zip(articles, analyses), 1):
             with st.expander(f"📜 تحلیل ماده {article['article_number']}", expanded=(i == 1)):
-                analysis = self._analyze_article_applicability(
-                    article=article,
-                    case_facts=entities.key_facts,
-                    case_desc=case_description
-                )
-
                 if analysis:
                     article_analyses.append(analysis)
 
@@ -148,11 +216,12 @@ class ReasoningEngine:
                         metadata={'article': article}
                     )
                     reasoning_steps.append(step)
+                    confidence_sum += analysis['confidence']
 
                     st.success(f"اطمینان: {analysis['confidence']*100:.0f}%")
 
         # Step 3: Generate deductions
-        st.info("💡 استنتاج نتیجه‌گیری‌های حقوقی...")
+        _log("💡 استنتاج نتیجه‌گیری‌های حقوقی...")
         deductions = self._generate_deductions(
             articles=articles,
             analyses=article_analyses,
@@ -168,9 +237,9 @@ class ReasoningEngine:
             )
             reasoning_steps.append(step)
 
-        # Calculate overall confidence
-        article_confidences = [s.confidence for s in reasoning_steps if s.step_type == "ARTICLE"]
-        overall_confidence = sum(article_confidences) / len(article_confidences) if article_confidences else 0.5
+        # Overall confidence: mean of the article confidences, accumulated
+        # while the ARTICLE steps were built
+        overall_confidence = confidence_sum / len(article_analyses) if article_analyses else 0.5
 
         # Create result
         result = ReasoningResult(
@@ -182,7 +251,8 @@ class ReasoningEngine:
             overall_confidence=overall_confidence
         )
 
-        st.success(f"✅ تحلیل کامل شد - اطمینان کلی: {overall_confidence*100:.0f}%")
+        ui_log.append(f"✅ تحلیل کامل شد - اطمینان کلی: {overall_confidence*100:.0f}%")
+        status.success("  \n".join(ui_log))
 
         return result
 
@@ -220,7 +290,8 @@ class ReasoningEngine:
         # Get GPT analysis
         analysis_text = self.client.get_completion(
             prompt=prompt,
-            temperature=0.3  # Low temperature for consistent legal analysis
+            temperature=0.3,  # Low temperature for consistent legal analysis
+            cache_ttl=ARTICLE_ANALYSIS_CACHE_TTL
         )
 
         if not analysis_text:
@@ -236,6 +307,71 @@ class ReasoningEngine:
             'is_applicable': confidence > 0.6  # Threshold for applicability
         }
 
+    def _analyze_articles_batched(
+        self,
+        articles: List[Dict[str, Any]],
+        case_facts: List[str]
+    ) -> Optional[List[Optional[Dict[str, Any]]]]:
+        """
+        Analyze all articles' applicability with a single JSON-mode request.
+
+        Args:
+            articles: Retrieved legal articles
+            case_facts: List of case facts
+
+        Returns:
+            Analysis dicts aligned with *articles* (None where the model
+            skipped an article), or None if the request failed
+        """
+        facts_text = "\n".join([f"{i+1}. {fact}" for i, fact in enumerate(case_facts)])
+        articles_text = "\n\n".join([
+            f"ماده {a['article_number']}: {a['title']}\nمتن ماده: {a['text']}"
+            for a in articles
+        ])
+
+        result = self.client.get_structured_json(
+            prompt=BATCH_ARTICLE_APPLICABILITY_PROMPT.format(
+                case_facts=facts_text,
+                articles=articles_text
+            ),
+            system_prompt=LEGAL_EXPERT_SYSTEM_PROMPT + "\n\nخروجی را فقط به صورت JSON معتبر ارائه دهید.",
+            temperature=0.3,
+            use_cache=True,  # Cached as long as the per-article analyses
+            cache_ttl=ARTICLE_ANALYSIS_CACHE_TTL
+        )
+        if not result or not isinstance(result.get('analyses'), list):
+            return None
+
+        by_number = {}
+        for item in result['analyses']:
+            try:
+                by_number[int(item['article_number'])] = item
+            except (KeyError, TypeError, ValueError):
+                continue
+
+        analyses = []
+        for article in articles:
+            item = by_number.get(article['article_number'])
+            analysis_text = item.get('analysis') if item else None
+            if not analysis_text:
+                analyses.append(None)
+                continue
+
+            try:
+                confidence = float(item.get('confidence'))
+                confidence = min(max(confidence / 100 if confidence > 1 else confidence, 0.0), 1.0)
+            except (TypeError, ValueError):
+                confidence = self._extract_confidence(analysis_text)
+
+            analyses.append({
+                'article_number': article['article_number'],
+                'analysis_text': analysis_text,
+                'confidence': confidence,
+                'is_applicable': confidence > 0.6  # Threshold for applicability
+            })
+
+        return analyses
+
     def _extract_confidence(self, text: str) -> float:
         """
         Extract confidence score from analysis text.
@@ -249,23 +385,10 @@ class ReasoningEngine:
         Returns:
             Confidence score (0-1)
         """
-        text_lower = text.lower()
-
-        # High confidence keywords
-        if any(kw in text_lower for kw in ['قطعاً', 'حتماً', 'بدون شک', 'کاملاً']):
-            return 0.95
-
-        # Good confidence keywords
-        if any(kw in text_lower for kw in ['احتمالاً', 'به نظر می‌رسد', 'مرتبط است']):
-            return 0.80
-
-        # Medium confidence keywords
-        if any(kw in text_lower for kw in ['ممکن است', 'شاید', 'می‌تواند']):
-            return 0.60
-
-        # Low confidence keywords
-        if any(kw in text_lower for kw in ['نامحتمل', 'بعید', 'کمتر مرتبط']):
-            return 0.30
+        # One scan over the text; the strongest tier found wins
+        tiers = {m.lastindex for m in _CONFIDENCE_RE.finditer(text)}
+        if tiers:
+            return _CONFIDENCE_SCORES[min(tiers) - 1]
 
         # Default medium confidence
         return 0.70
@@ -303,29 +426,62 @@ class ReasoningEngine:
             case_facts=facts_text
         )
 
-        # Get deductions from GPT
-        result = self.client.get_completion(
-            prompt=prompt,
-            temperature=0.3
-        )
-
-        if not result:
-            return []
-
-        # Parse deductions (simple line-based parsing)
-        # In production, would use more sophisticated parsing
+        # Stream deductions from GPT and show each one as soon as its line
+        # is complete, instead of waiting for the whole answer
+        placeholder = st.empty()
         deductions = []
-        for line in result.split('\n'):
-            line = line.strip()
-            # Look for numbered or bulleted deductions
-            if line and (line[0].isdigit() or line.startswith('-') or line.startswith('•')):
-                # Clean up formatting
-                deduction = line.lstrip('0123456789.-•) ').strip()
-                if deduction:
-                    deductions.append(deduction)
+        buffer = ""
+
+        def _take_line(line: str):
+            deduction = self._parse_deduction_line(line)
+            if deduction:
+                deductions.append(deduction)
+                placeholder.markdown("\n".join(f"- {d}" for d in deductions))
+
+        try:
+            for chunk in self.client.get_completion_stream(
+                prompt=prompt,
+                temperature=0.3,
+                cache_ttl=DEDUCTION_CACHE_TTL
+            ):
+                buffer += chunk
+                *lines, buffer = buffer.split('\n')
+                for line in lines:
+                    _take_line(line)
+        except StreamInterruptedError:
+            # Deductions from a cut-off answer may be incomplete: start over
+            # from the full (non-streamed) response
+            deductions.clear()
+            placeholder.empty()
+            buffer = self.client.get_completion(
+                prompt=prompt,
+                temperature=0.3,
+                cache_ttl=DEDUCTION_CACHE_TTL
+            ) or ""
+            *lines, buffer = buffer.split('\n')
+            for line in lines:
+                _take_line(line)
+        _take_line(buffer)
 
         return deductions
 
+    @staticmethod
+    def _parse_deduction_line(line: str) -> Optional[str]:
+        """
+        Extract a deduction from one line of model output.
+
+        Simple line-based parsing; in production, would use more
+        sophisticated parsing.
+
+        Args:
+            line: A single line of the deduction response
+
+        Returns:
+            The deduction text, or None if the line isn't a list item
+        """
+        match = _DEDUCTION_RE.match(line)
+        return match.group(1) if match else None
+
     def get_reasoning_chain_text(self, result: ReasoningResult) -> str:
         """
         Format reasoning chain as readable text.
@@ -340,16 +496,14 @@ class ReasoningEngine:
 
         # Facts section
         parts.append("## واقعیات پرونده")
-        fact_steps = [s for s in result.reasoning_steps if s.step_type == "FACT"]
-        for i, step in enumerate(fact_steps, 1):
+        for i, step in enumerate(result.fact_steps, 1):
             parts.append(f"{i}. {step.content}")
 
         parts.append("")
 
         # Articles section
         parts.append("## مواد قانونی قابل اعمال")
-        article_steps = [s for s in result.reasoning_steps if s.step_type == "ARTICLE"]
-        for i, step in enumerate(article_steps, 1):
+        for step in result.article_steps:
             parts.append(f"### ماده {step.related_article}")
             parts.append(step.content)
             parts.append(f"**اطمینان:** {step.confidence*100:.0f}%")
@@ -0,0 +1,138 @@
+"""
+Persistent Verdict Cache.
+
+Stores parsed verdicts on disk keyed by a hash of everything that shapes
+the verdict request (provider, model, temperature and the full prompt), so
+re-running an identical case - in a new session or after a restart -
+returns the earlier verdict without another 3000-token completion.
+
+Author: Master's Thesis Project - Mahsa Mirzaei
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+import orjson
+
+# Version of the stored verdict fields, part of every key: bump it when the
+# Verdict dataclass changes so entries in the old layout are never returned
+SCHEMA_VERSION = 1
+
+
+class VerdictCache:
+    """
+    SQLite-backed (WAL mode) map of request hash -> parsed verdict fields.
+    """
+
+    _cache_file: Path = Path(__file__).resolve().parent.parent.parent / "data" / "verdict_cache.sqlite3"
+    _max_entries: int = 1000  # Oldest verdicts beyond this are evicted
+
+    def __init__(self):
+        """Open (or create) the cache database."""
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        try:
+            self._cache_file.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self._cache_file, timeout=30, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            db.commit()
+            self._db = db
+        except Exception as e:
+            print(f"Failed to load verdict cache: {e}")
+
+    @staticmethod
+    def make_key(provider: str, model: str, temperature: float, prompt: str) -> str:
+        """
+        Build the cache key for a verdict request (and schema version).
+
+        Args:
+            provider: LLM provider name
+            model: Model name
+            temperature: Sampling temperature of the request
+            prompt: Fully formatted verdict prompt
+
+        Returns:
+            Hex digest identifying the request
+        """
+        hasher = hashlib.sha256(
+            f"v{SCHEMA_VERSION}|{provider}|{model}|t={temperature}|".encode()
+        )
+        hasher.update(prompt.encode("utf-8"))
+        return hasher.hexdigest()
+
+    def get(self, key: str, max_age: float) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached verdict fields for *key*, or None on a miss.
+
+        Args:
+            key: Value from make_key()
+            max_age: Entries older than this many seconds count as a miss
+        """
+        if self._db is None:
+            return None
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM verdicts WHERE key = ?", (key,)
+                ).fetchone()
+            if row is None or time.time() - row[1] > max_age:
+                return None
+            return orjson.loads(row[0])
+        except Exception as e:
+            print(f"Failed to read verdict cache: {e}")
+            return None
+
+    def set(self, key: str, fields: Dict[str, Any]):
+        """
+        Store verdict fields under *key*.
+
+        Args:
+            key: Value from make_key()
+            fields: Verdict fields (dataclasses.asdict of a Verdict)
+        """
+        if self._db is None:
+            return
+        try:
+            with self._lock, self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?)",
+                    (key, orjson.dumps(fields).decode(), time.time()),
+                )
+                self._db.execute(
+                    "DELETE FROM verdicts WHERE key IN ("
+                    "SELECT key FROM verdicts ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self._max_entries,),
+                )
+        except Exception as e:
+            print(f"Failed to save verdict cache: {e}")
+
+    def clear(self):
+        """Delete every cached verdict."""
+        if self._db is None:
+            return
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM verdicts")
+
+
+# Global instance
+_verdict_cache: Optional[VerdictCache] = None
+
+def get_verdict_cache() -> VerdictCache:
+    """
+    Get global verdict cache instance.
+
+    Returns:
+        VerdictCache singleton
+    """
+    global _verdict_cache
+    if _verdict_cache is None:
+        _verdict_cache = VerdictCache()
+    return _verdict_cache
@@ -12,13 +12,49 @@ Outputs structured verdict with:
 Author: Master's Thesis Project - Mahsa Mirzaei
 """
 
-from typing import Optional, Dict, Any
-from dataclasses import dataclass
+import re
+from typing import Optional, Dict, Any, Tuple
+from dataclasses import dataclass, asdict
 import streamlit as st
 
-from modules.legal_engine.client_factory import get_llm_client
+from modules.legal_engine.base_client import LLMClient, StreamInterruptedError
+from modules.legal_engine.client_factory import get_economy_client, get_llm_client
 from modules.legal_engine.reasoning_engine import ReasoningResult
+from modules.legal_engine.verdict_cache import get_verdict_cache
 from config.prompts import VERDICT_GENERATION_PROMPT
+from config.settings import get_settings
+
+# Section header -> Verdict field (longer variants first in the regex below)
+_SECTION_FIELDS = {
+    'خلاصه پرونده': 'summary',
+    'خلاصه': 'summary',
+    'واقعیات اثبات شده': 'proven_facts',
+    'واقعیات': 'proven_facts',
+    'تحلیل حقوقی': 'legal_analysis',
+    'استدلال حقوقی': 'legal_analysis',
+    'حکم': 'ruling',
+    'رأی': 'ruling',
+    'جزئیات اجرایی': 'implementation',
+    'اجرا': 'implementation',
+    'قابلیت اعتراض': 'appealable',
+    'قابل اعتراض': 'appealable',
+    'اعتراض': 'appealable',
+}
+_SECTION_NAMES = "|".join(map(re.escape, _SECTION_FIELDS))
+# A header line: a heading marker (##, **, "۱.") followed by a section name,
+# or a section name alone on its line (optionally with ':' / '**')
+_SECTION_RE = re.compile(
+    rf'^[ \t]*(?:(?:#+|\*\*|[0-9۰-۹]+[.)])[ \t]*)+(?P<marked>{_SECTION_NAMES})[^\n]*$'
+    rf'|^[ \t]*(?P<bare>{_SECTION_NAMES})[ \t:*]*$',
+    re.M
+)
+
+# Very low temperature for formal legal language
+VERDICT_TEMPERATURE = 0.2
+# Allow a long response so the complete verdict fits
+VERDICT_MAX_TOKENS = 3000
+# Streamed chunks received between two redraws of the verdict preview
+STREAM_RENDER_INTERVAL = 8
 
 
 @dataclass
@@ -42,8 +78,11 @@ class VerdictGenerator:
     """
 
     def __init__(self):
-        """Initialize verdict generator with LLM client."""
+        """Initialize verdict generator with LLM clients."""
         self.client = get_llm_client()
+        self.economy_client = get_economy_client()
+        self.settings = get_settings()
+        self.cache = get_verdict_cache()
 
     def generate_verdict(self, reasoning_result: ReasoningResult) -> Optional[Verdict]:
         """
@@ -57,6 +96,62 @@ class VerdictGenerator:
         """
         st.info("📜 در حال تولید حکم نهایی...")
 
+        client, prompt, cache_key = self._build_request(reasoning_result)
+
+        verdict = self._get_cached_verdict(reasoning_result, cache_key)
+        if verdict:
+            st.success("✅ حکم نهایی صادر شد")
+            return verdict
+
+        # Stream the verdict into a placeholder so the text fills in while
+        # it is generated; it is parsed only once the stream has finished
+        placeholder = st.empty()
+        chunks = []
+        try:
+            for i, chunk in enumerate(client.get_completion_stream(
+                prompt=prompt,
+                temperature=VERDICT_TEMPERATURE,
+                max_tokens=VERDICT_MAX_TOKENS,
+                use_cache=False  # Verdicts are cached parsed, in the verdict cache
+            ), 1):
+                chunks.append(chunk)
+                if i % STREAM_RENDER_INTERVAL == 0:
+                    placeholder.markdown("".join(chunks) + " ▌")
+            verdict_text = "".join(chunks)
+        except StreamInterruptedError:
+            # A partial verdict must not be parsed: drop it and request the
+            # whole text again without streaming (with the usual retries)
+            placeholder.empty()
+            st.warning("⚠️ دریافت حکم قطع شد؛ تلاش دوباره...")
+            verdict_text = client.get_completion(
+                prompt=prompt,
+                temperature=VERDICT_TEMPERATURE,
+                max_tokens=VERDICT_MAX_TOKENS,
+                use_cache=False
+            )
+        placeholder.empty()
+
+        if not verdict_text:
+            st.error("❌ خطا در تولید حکم")
+            return None
+
+        verdict = self._finish_verdict(verdict_text, reasoning_result, cache_key)
+
+        if verdict:
+            st.success("✅ حکم نهایی صادر شد")
+
+        return verdict
+
+    def _build_request(self, reasoning_result: ReasoningResult) -> Tuple[LLMClient, str, str]:
+        """
+        Prepare the verdict request for a reasoning result.
+
+        Args:
+            reasoning_result: Complete reasoning analysis
+
+        Returns:
+            (client, prompt, verdict cache key)
+        """
         # Prepare reasoning chain text
         reasoning_chain = self._format_reasoning_chain(reasoning_result)
 
@@ -75,26 +170,57 @@ class VerdictGenerator:
             defendant=defendant
         )
 
-        # Generate verdict
-        verdict_text = self.client.get_completion(
-            prompt=prompt,
-            temperature=0.2,  # Very low temperature for formal legal language
-            max_tokens=3000  # Allow longer response for complete verdict
+        # Draft with the cheaper model unless the reasoning is uncertain
+        if reasoning_result.overall_confidence < self.settings.VERDICT_ESCALATION_CONFIDENCE:
+            client = self.client
+        else:
+            client = self.economy_client
+
+        cache_key = self.cache.make_key(
+            client.provider_name, client.model_name, VERDICT_TEMPERATURE, prompt
         )
+        return client, prompt, cache_key
 
-        if not verdict_text:
-            st.error("❌ خطا در تولید حکم")
+    def _get_cached_verdict(self, reasoning_result: ReasoningResult, cache_key: str) -> Optional[Verdict]:
+        """
+        Return the stored verdict for an identical request, if still fresh.
+
+        An identical request (same model, temperature and prompt) made
+        within VERDICT_CACHE_TTL reuses the verdict stored on disk. Stored
+        fields that no longer match the Verdict dataclass count as a miss.
+        """
+        cache_ttl = self.settings.VERDICT_CACHE_TTL
+        if cache_ttl <= 0:
+            return None
+        fields = self.cache.get(cache_key, max_age=cache_ttl)
+        if not isinstance(fields, dict):
+            return None
+        try:
+            return Verdict(
+                case_id=reasoning_result.case_id,
+                confidence=reasoning_result.overall_confidence,
+                **fields
+            )
+        except TypeError:
             return None
 
-        # Parse verdict into structured format
+    def _finish_verdict(
+        self,
+        verdict_text: str,
+        reasoning_result: ReasoningResult,
+        cache_key: str
+    ) -> Optional[Verdict]:
+        """Parse generated verdict text and store the result in the verdict cache."""
         verdict = self._parse_verdict(
             verdict_text=verdict_text,
             case_id=reasoning_result.case_id,
             confidence=reasoning_result.overall_confidence
         )
 
-        if verdict:
-            st.success("✅ حکم نهایی صادر شد")
+        if verdict and self.settings.VERDICT_CACHE_TTL > 0:
+            fields = asdict(verdict)
+            del fields['case_id'], fields['confidence']
+            self.cache.set(cache_key, fields)
 
         return verdict
 
@@ -112,24 +238,22 @@ class VerdictGenerator:
 
         # Facts
         parts.append("واقعیات:")
-        fact_steps = [s for s in result.reasoning_steps if s.step_type == "FACT"]
-        for step in fact_steps:
-            parts.append(f"- {step.content}")
+        parts.extend(f"- {step.content}" for step in result.fact_steps)
 
         parts.append("")
 
         # Articles
         parts.append("مواد قانونی:")
-        article_steps = [s for s in result.reasoning_steps if s.step_type == "ARTICLE"]
-        for step in article_steps:
-            parts.append(f"ماده {step.related_article}: {step.content[:200]}...")
+        parts.extend(
+            f"ماده {step.related_article}: {step.content[:200]}..."
+            for step in result.article_steps
+        )
 
         parts.append("")
 
         # Deductions
         parts.append("نتیجه‌گیری‌ها:")
-        for deduction in result.deductions:
-            parts.append(f"- {deduction}")
+        parts.extend(f"- {deduction}" for deduction in result.deductions)
 
         return "\n".join(parts)
 
@@ -149,15 +273,7 @@ class VerdictGenerator:
             Verdict object
         """
         try:
-            # Simple section extraction based on headers
-            sections = {
-                'summary': self._extract_section(verdict_text, ['خلاصه پرونده', 'خلاصه']),
-                'proven_facts': self._extract_section(verdict_text, ['واقعیات اثبات شده', 'واقعیات']),
-                'legal_analysis': self._extract_section(verdict_text, ['تحلیل حقوقی', 'استدلال حقوقی']),
-                'ruling': self._extract_section(verdict_text, ['حکم', 'رأی']),
-                'implementation': self._extract_section(verdict_text, ['جزئیات اجرایی', 'اجرا']),
-                'appealable': self._extract_section(verdict_text, ['قابل اعتراض', 'اعتراض'])
-            }
+            sections = self._split_sections(verdict_text)
 
             # If section extraction failed, use full text
             if not any(sections.values()):
@@ -187,44 +303,33 @@ class VerdictGenerator:
             st.error(f"❌ خطا در پردازش حکم: {str(e)}")
             return None
 
-    def _extract_section(self, text: str, headers: list) -> str:
+    @staticmethod
+    def _split_sections(text: str) -> Dict[str, str]:
         """
-        Extract a section from verdict text based on headers.
+        Split verdict text into its sections in a single pass over the text.
 
         Args:
             text: Full verdict text
-            headers: Possible header variations
 
         Returns:
-            Section content or empty string
+            Mapping of Verdict field name to section content ('' if missing)
         """
-        lines = text.split('\n')
-        section_lines = []
-        capturing = False
-
-        for line in lines:
-            line_stripped = line.strip()
-
-            # Check if this line contains a header
-            is_header = any(header in line_stripped for header in headers)
-
-            if is_header:
-                capturing = True
-                continue
-
-            # Stop if we hit another section header (starts with ##, **, or numbers)
-            if capturing and line_stripped:
-                if line_stripped.startswith(('##', '**', '۱.', '۲.', '۳.', '۴.', '۵.')):
-                    # Check if it's not a list item
-                    if not any(h in line_stripped for h in headers):
-                        break
-
-            if capturing and line_stripped:
-                section_lines.append(line_stripped)
+        sections = dict.fromkeys(set(_SECTION_FIELDS.values()), '')
+        headers = list(_SECTION_RE.finditer(text))
+
+        for header, next_header in zip(headers, headers[1:] + [None]):
+            field = _SECTION_FIELDS[header['marked'] or header['bare']]
+            if sections[field]:
+                continue  # First occurrence of a section wins
+            body = text[header.end():next_header.start() if next_header else len(text)]
+            sections[field] = '\n'.join(
+                line.strip() for line in body.splitlines() if line.strip()
+            )
 
-        return '\n'.join(section_lines).strip()
+        return sections
 
-    def format_verdict_display(self, verdict: Verdict) -> str:
+    @staticmethod
+    def format_verdict_display(verdict: Verdict) -> str:
         """
         Format verdict for display in UI.
 
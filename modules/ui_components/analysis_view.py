@@ -1,14 +1,28 @@
 """Analysis View — judicial analysis tab."""
 
+import html
 import streamlit as st
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Tuple
+
+import networkx as nx
 
 from modules.legal_engine.entity_extractor import get_entity_extractor
 from modules.legal_engine.reasoning_engine import get_reasoning_engine
-from modules.legal_engine.verdict_generator import get_verdict_generator
+from modules.legal_engine.verdict_generator import VerdictGenerator, get_verdict_generator
 from modules.graph_builder.reasoning_graph import ReasoningGraph
 from modules.ui_components.persian_utils import get_persian_utils
 
+# Relevance color by minimum score (first matching threshold wins)
+_RELEVANCE_COLORS = ((0.8, "#10b981"), (0.6, "#f59e0b"), (0.0, "#94a3b8"))
+
+# One retrieved article in the «مواد قانونی مرتبط» expander
+_ARTICLE_TEMPLATE = (
+    "**ماده {number}** — {title}  \n"
+    "ارتباط: <span style='color:{color};font-weight:600;'>{relevance}</span>\n\n"
+    "<div style='color:#a1a1aa;font-size:0.875rem;'>{text}</div>"
+)
+
 
 def render_analysis(case_data: Dict[str, Any]):
     """Render complete case analysis."""
@@ -16,17 +30,24 @@ def render_analysis(case_data: Dict[str, Any]):
     cache_key = f"analysis_{case_data['case_id']}"
 
     if cache_key not in st.session_state:
-        st.info("برای شروع تحلیل پرونده، دکمه زیر را بزنید.")
-        if st.button("شروع تحلیل", type="primary", use_container_width=True):
+        # The pipeline's progress output lives in one placeholder that is
+        # cleared on success, so the results render in this same run
+        # instead of through a second full script run (st.rerun)
+        pipeline = st.empty()
+        with pipeline.container():
+            st.info("برای شروع تحلیل پرونده، دکمه زیر را بزنید.")
+            if not st.button("شروع تحلیل", type="primary", use_container_width=True):
+                return
             with st.spinner("در حال تحلیل پرونده…"):
                 _perform_analysis(case_data, cache_key)
-        return
+        if cache_key not in st.session_state:
+            return  # Failed: keep the error messages visible
+        pipeline.empty()
 
-    if cache_key in st.session_state:
-        if st.button("تحلیل مجدد", type="secondary"):
-            del st.session_state[cache_key]
-            st.rerun()
-        _display_results(st.session_state[cache_key], utils)
+    if st.button("تحلیل مجدد", type="secondary"):
+        del st.session_state[cache_key]
+        st.rerun()
+    _display_results(st.session_state[cache_key], utils)
 
 
 def _perform_analysis(case_data: Dict[str, Any], cache_key: str):
@@ -52,25 +73,46 @@ def _perform_analysis(case_data: Dict[str, Any], cache_key: str):
     if not reasoning:
         st.error("تحلیل ناموفق بود.")
         return
-    progress.progress(50, text="ساخت گراف…")
-
-    # 3 — Graph
-    graph_builder = ReasoningGraph()
-    graph = graph_builder.build_from_reasoning(reasoning)
-    progress.progress(75, text="صدور حکم…")
-
-    # 4 — Verdict
-    verdict_gen = get_verdict_generator()
-    verdict = verdict_gen.generate_verdict(reasoning)
+    progress.progress(50, text="ساخت گراف و صدور حکم…")
+
+    # 3/4 — The graph is built in a worker thread (CPU only, no Streamlit
+    # calls) while the verdict request runs here in the script thread
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        graph_future = pool.submit(_build_graph, reasoning)
+        verdict_gen = get_verdict_generator()
+        verdict = verdict_gen.generate_verdict(reasoning)
+        graph, graph_stats = graph_future.result()
     progress.progress(100, text="تحلیل کامل شد")
 
+    # Cached analyses are listed in "_analysis_keys" so the sidebar's
+    # clear button can drop them without scanning every session key
+    st.session_state.setdefault("_analysis_keys", set()).add(cache_key)
     st.session_state[cache_key] = {
         "entities": entities,
         "reasoning_result": reasoning,
         "graph": graph,
+        "graph_stats": graph_stats,
         "verdict": verdict,
     }
-    st.rerun()
+
+
+def _build_graph(reasoning) -> Tuple[nx.DiGraph, Dict[str, Any]]:
+    """Build the reasoning graph and its statistics (computed once, kept with the results)."""
+    graph_builder = ReasoningGraph()
+    graph = graph_builder.build_from_reasoning(reasoning)
+    return graph, graph_builder.get_statistics()
+
+
+def _format_article(article: Dict[str, Any], utils) -> str:
+    """Render one retrieved article as a markdown/HTML block."""
+    relevance = article.get("relevance_score", 0)
+    return _ARTICLE_TEMPLATE.format(
+        number=article["article_number"],
+        title=article["title"],
+        color=next((c for threshold, c in _RELEVANCE_COLORS if relevance >= threshold), "#94a3b8"),
+        relevance=utils.format_confidence(relevance),
+        text=html.escape(article["text"]),
+    )
 
 
 def _display_results(results: Dict[str, Any], utils):
@@ -101,47 +143,43 @@ def _display_results(results: Dict[str, Any], utils):
             st.markdown(tag_html, unsafe_allow_html=True)
 
         if entities.key_facts:
-            st.markdown("**واقعیات کلیدی:**")
-            for i, fact in enumerate(entities.key_facts, 1):
-                st.markdown(f"{i}. {fact}")
+            st.markdown("**واقعیات کلیدی:**\n\n" + "\n".join(
+                f"{i}. {fact}" for i, fact in enumerate(entities.key_facts, 1)
+            ))
+
+    # Each section below is joined into one markdown string, so it is sent
+    # to the browser as a single element instead of one per line
 
     # ── Articles ──
     with st.expander("مواد قانونی مرتبط", expanded=False):
-        for article in reasoning.retrieved_articles:
-            relevance = article.get("relevance_score", 0)
-            pct = utils.format_confidence(relevance)
-            st.markdown(
-                f"**ماده {article['article_number']}** — {article['title']}  \n"
-                f"ارتباط: {pct}"
-            )
-            st.caption(article["text"])
-            st.markdown("")
+        st.markdown("\n\n".join(
+            _format_article(article, utils) for article in reasoning.retrieved_articles
+        ), unsafe_allow_html=True)
 
     # ── Reasoning chain ──
     with st.expander("زنجیره استدلال", expanded=True):
-        facts = [s for s in reasoning.reasoning_steps if s.step_type == "FACT"]
-        articles = [s for s in reasoning.reasoning_steps if s.step_type == "ARTICLE"]
+        sections = []
 
-        if facts:
-            st.markdown("**واقعیات**")
-            for s in facts:
-                st.markdown(f"- {s.content}")
+        if reasoning.fact_steps:
+            sections.append("**واقعیات**\n\n" + "\n".join(
+                f"- {s.content}" for s in reasoning.fact_steps
+            ))
 
-        if articles:
-            st.markdown("")
-            st.markdown("**تحلیل مواد**")
-            for s in articles:
-                pct = utils.format_confidence(s.confidence)
-                st.markdown(f"ماده {s.related_article} ({pct}): {s.content}")
+        if reasoning.article_steps:
+            sections.append("**تحلیل مواد**\n\n" + "\n\n".join(
+                f"ماده {s.related_article} ({utils.format_confidence(s.confidence)}): {s.content}"
+                for s in reasoning.article_steps
+            ))
 
         if reasoning.deductions:
-            st.markdown("")
-            st.markdown("**نتیجه‌گیری**")
-            for i, d in enumerate(reasoning.deductions, 1):
-                st.markdown(f"{i}. {d}")
+            sections.append("**نتیجه‌گیری**\n\n" + "\n".join(
+                f"{i}. {d}" for i, d in enumerate(reasoning.deductions, 1)
+            ))
+
+        if sections:
+            st.markdown("\n\n".join(sections))
 
     # ── Verdict ──
     if verdict:
         with st.expander("حکم نهایی", expanded=True):
-            verdict_gen = get_verdict_generator()
-            st.markdown(verdict_gen.format_verdict_display(verdict))
+            st.markdown(VerdictGenerator.format_verdict_display(verdict))
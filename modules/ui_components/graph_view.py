@@ -15,11 +15,13 @@ def render_graph_view():
 
     graph: nx.DiGraph = st.session_state["current_case_graph"]
 
-    # Stats
-    from modules.graph_builder.reasoning_graph import ReasoningGraph
-    gb = ReasoningGraph()
-    gb.graph = graph
-    stats = gb.get_statistics()
+    # Stats (computed once when the analysis ran)
+    stats = st.session_state.get("current_case_stats")
+    if stats is None:
+        from modules.graph_builder.reasoning_graph import ReasoningGraph
+        gb = ReasoningGraph()
+        gb.graph = graph
+        stats = gb.get_statistics()
 
     c1, c2, c3, c4 = st.columns(4)
     c1.metric("گره‌ها", stats["total_nodes"])
@@ -1,12 +1,18 @@
 """Input Form — Case data entry tab."""
 
-import json
 import streamlit as st
 from pathlib import Path
 from typing import Optional, Dict, Any
 
 from modules.ui_components.persian_utils import get_persian_utils
 
+# Widget placeholder texts
+_NAME_PLACEHOLDER = "نام و نام خانوادگی"
+_DESCRIPTION_PLACEHOLDER = "شرح کامل پرونده شامل واقعیات، ادعاها و شواهد را بنویسید…"
+_DESCRIPTION_HEIGHT = 220
+
+_SAMPLE_PATH = Path(__file__).resolve().parent.parent.parent / "data" / "sample_cases.json"
+
 
 def render_input_form() -> Optional[Dict[str, Any]]:
     """Render case input form. Returns dict with case data if submitted."""
@@ -20,12 +26,12 @@ def render_input_form() -> Optional[Dict[str, Any]]:
         with col1:
             case_id = st.text_input(
                 "شناسه پرونده",
-                value=sample.get("case_id", f"1403-{st.session_state.get('case_counter', 1):03d}"),
+                value=sample.get("case_id") or f"1403-{st.session_state.get('case_counter', 1):03d}",
             )
         with col2:
             case_date = st.text_input(
                 "تاریخ",
-                value=sample.get("date", utils.format_persian_date()),
+                value=sample.get("date") or utils.format_persian_date(),
             )
 
         # Row 2: parties
@@ -34,23 +40,21 @@ def render_input_form() -> Optional[Dict[str, Any]]:
             plaintiff = st.text_input(
                 "خواهان",
                 value=sample.get("plaintiff", ""),
-                placeholder="نام و نام خانوادگی",
+                placeholder=_NAME_PLACEHOLDER,
             )
         with col4:
             defendant = st.text_input(
                 "خوانده",
                 value=sample.get("defendant", ""),
-                placeholder="نام و نام خانوادگی",
+                placeholder=_NAME_PLACEHOLDER,
             )
 
         # Description
         case_description = st.text_area(
             "شرح پرونده",
             value=sample.get("description", ""),
-            height=220,
-            placeholder=(
-                "شرح کامل پرونده شامل واقعیات، ادعاها و شواهد را بنویسید…"
-            ),
+            height=_DESCRIPTION_HEIGHT,
+            placeholder=_DESCRIPTION_PLACEHOLDER,
         )
 
         submitted = st.form_submit_button(
@@ -83,21 +87,28 @@ def render_input_form() -> Optional[Dict[str, Any]]:
     return None
 
 
+@st.cache_data(show_spinner=False)
+def _read_sample_cases() -> Dict[str, Any]:
+    """Read and parse the sample cases file once per process (errors are not cached)."""
+    # Only needed when a sample is requested, so not imported at start-up
+    import orjson
+
+    return orjson.loads(_SAMPLE_PATH.read_bytes())
+
+
 def load_sample_case() -> Optional[Dict[str, Any]]:
     """Load first sample case from data file."""
-    sample_path = Path(__file__).resolve().parent.parent.parent / "data" / "sample_cases.json"
     try:
-        with open(sample_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if data.get("cases"):
-                s = data["cases"][0]
-                return {
-                    "case_id": s["case_id"],
-                    "date": s["date"],
-                    "plaintiff": s["plaintiff"],
-                    "defendant": s["defendant"],
-                    "description": s["description"],
-                }
+        data = _read_sample_cases()
+        if data.get("cases"):
+            s = data["cases"][0]
+            return {
+                "case_id": s["case_id"],
+                "date": s["date"],
+                "plaintiff": s["plaintiff"],
+                "defendant": s["defendant"],
+                "description": s["description"],
+            }
     except Exception:
         pass
     return None
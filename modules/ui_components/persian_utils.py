@@ -1,16 +1,98 @@
 """Persian Text Utilities — RTL and formatting helpers."""
 
-import jdatetime
-from typing import Optional
-from hazm import Normalizer
+import datetime
+from functools import cached_property, lru_cache
+
+from typing import Optional, TYPE_CHECKING
+
+import streamlit as st
+
+if TYPE_CHECKING:
+    import jdatetime
+    from hazm import Normalizer
+
+# Digit translation tables, built once at import
+_LATIN_TO_PERSIAN = str.maketrans('0123456789', '۰۱۲۳۴۵۶۷۸۹')
+_PERSIAN_TO_LATIN = str.maketrans('۰۱۲۳۴۵۶۷۸۹', '0123456789')
+
+
+def _int_to_persian(n: int) -> str:
+    """Decimal digits of *n* in Persian numerals."""
+    return str(n).translate(_LATIN_TO_PERSIAN)
+
+
+def rtl_wrap(text: str, tag: str = "div") -> str:
+    """
+    Wrap text in an RTL container (free-function form of PersianUtils.rtl_wrapper).
+
+    Args:
+        text: Persian text
+        tag: HTML tag (div, span, p)
+
+    Returns:
+        HTML string with RTL direction
+    """
+    return f'<{tag} dir="rtl" style="text-align: right;">{text}</{tag}>'
+
+
+@lru_cache(maxsize=1)
+def _format_today(day_ordinal: int) -> str:
+    """Persian date string for a Gregorian day ordinal, computed once per calendar day."""
+    import jdatetime  # Imported on first use to keep app start-up light
+
+    day = jdatetime.date.fromgregorian(date=datetime.date.fromordinal(day_ordinal))
+    return day.strftime("%Y/%m/%d").translate(_LATIN_TO_PERSIAN)
+
+
+# Card / badge HTML is a pure function of its arguments and the same few
+# combinations are rendered on every rerun, so the strings are memoized
+@lru_cache(maxsize=256)
+def _card_html(title: str, content: str, color: str) -> str:
+    """HTML for PersianUtils.create_card_html()."""
+    return f"""
+        <div style="
+            background: #18181b;
+            border: 1px solid #27272a;
+            border-right: 3px solid {color};
+            border-radius: 8px;
+            padding: 1rem 1.25rem;
+            margin-bottom: 0.75rem;
+            direction: rtl;
+            text-align: right;
+        ">
+            <div style="color:#a1a1aa; font-size:0.8rem; margin-bottom:0.25rem;">{title}</div>
+            <div style="color:#fafafa; font-size:1rem; font-weight:500;">{content}</div>
+        </div>
+        """
+
+
+@lru_cache(maxsize=256)
+def _badge_html(text: str, color: str) -> str:
+    """HTML for PersianUtils.create_badge()."""
+    return f"""
+        <span style="
+            background: {color}22;
+            color: {color};
+            padding: 0.2rem 0.625rem;
+            border-radius: 9999px;
+            font-size: 0.8rem;
+            font-weight: 500;
+            display: inline-block;
+            margin: 0.2rem;
+            border: 1px solid {color}44;
+        ">{text}</span>
+        """
 
 
 class PersianUtils:
     """Utilities for Persian text processing and display."""
 
-    def __init__(self):
-        """Initialize with Hazm normalizer."""
-        self.normalizer = Normalizer()
+    @cached_property
+    def normalizer(self) -> "Normalizer":
+        """Hazm normalizer, imported and built on first normalize() call."""
+        from hazm import Normalizer
+
+        return Normalizer()
 
     @staticmethod
     def rtl_wrapper(text: str, tag: str = "div") -> str:
@@ -24,7 +106,7 @@ class PersianUtils:
         Returns:
             HTML string with RTL direction
         """
-        return f'<{tag} dir="rtl" style="text-align: right;">{text}</{tag}>'
+        return rtl_wrap(text, tag)
 
     @staticmethod
     def to_persian_numbers(text: str) -> str:
@@ -37,11 +119,7 @@ class PersianUtils:
         Returns:
             Text with Persian numbers (۰-۹)
         """
-        persian_digits = '۰۱۲۳۴۵۶۷۸۹'
-        latin_digits = '0123456789'
-
-        translation_table = str.maketrans(latin_digits, persian_digits)
-        return text.translate(translation_table)
+        return text.translate(_LATIN_TO_PERSIAN)
 
     @staticmethod
     def to_latin_numbers(text: str) -> str:
@@ -54,14 +132,10 @@ class PersianUtils:
         Returns:
             Text with Latin numbers (0-9)
         """
-        persian_digits = '۰۱۲۳۴۵۶۷۸۹'
-        latin_digits = '0123456789'
-
-        translation_table = str.maketrans(persian_digits, latin_digits)
-        return text.translate(translation_table)
+        return text.translate(_PERSIAN_TO_LATIN)
 
     @staticmethod
-    def format_persian_date(date: Optional[jdatetime.date] = None) -> str:
+    def format_persian_date(date: Optional["jdatetime.date"] = None) -> str:
         """
         Format date in Persian calendar.
 
@@ -72,7 +146,7 @@ class PersianUtils:
             Formatted Persian date string (e.g., "۱۴۰۳/۱۱/۲۳")
         """
         if date is None:
-            date = jdatetime.date.today()
+            return _format_today(datetime.date.today().toordinal())
 
         # Format as YYYY/MM/DD
         formatted = date.strftime("%Y/%m/%d")
@@ -114,7 +188,9 @@ class PersianUtils:
         if len(text) <= max_length:
             return text
 
-        return text[:max_length - len(suffix)] + suffix
+        # Clamped so a suffix longer than max_length cannot turn into a negative slice
+        keep = max(max_length - len(suffix), 0)
+        return f"{text[:keep]}{suffix}"
 
     @staticmethod
     def format_confidence(confidence: float) -> str:
@@ -127,9 +203,7 @@ class PersianUtils:
         Returns:
             Formatted percentage (e.g., "۸۵٪")
         """
-        percentage = int(confidence * 100)
-        persian_num = PersianUtils.to_persian_numbers(str(percentage))
-        return f"{persian_num}٪"
+        return _int_to_persian(int(confidence * 100)) + "٪"
 
     @staticmethod
     def create_card_html(title: str, content: str, color: str = "#3b82f6") -> str:
@@ -144,21 +218,7 @@ class PersianUtils:
         Returns:
             HTML string
         """
-        return f"""
-        <div style="
-            background: #18181b;
-            border: 1px solid #27272a;
-            border-right: 3px solid {color};
-            border-radius: 8px;
-            padding: 1rem 1.25rem;
-            margin-bottom: 0.75rem;
-            direction: rtl;
-            text-align: right;
-        ">
-            <div style="color:#a1a1aa; font-size:0.8rem; margin-bottom:0.25rem;">{title}</div>
-            <div style="color:#fafafa; font-size:1rem; font-weight:500;">{content}</div>
-        </div>
-        """
+        return _card_html(title, content, color)
 
     @staticmethod
     def create_badge(text: str, color: str = "#3b82f6") -> str:
@@ -172,32 +232,15 @@ class PersianUtils:
         Returns:
             HTML string
         """
-        return f"""
-        <span style="
-            background: {color}22;
-            color: {color};
-            padding: 0.2rem 0.625rem;
-            border-radius: 9999px;
-            font-size: 0.8rem;
-            font-weight: 500;
-            display: inline-block;
-            margin: 0.2rem;
-            border: 1px solid {color}44;
-        ">{text}</span>
-        """
-
+        return _badge_html(text, color)
 
-# Global instance
-_utils_instance: Optional[PersianUtils] = None
 
+@st.cache_resource
 def get_persian_utils() -> PersianUtils:
     """
-    Get global PersianUtils instance.
+    Get global PersianUtils instance (cached by Streamlit).
 
     Returns:
         PersianUtils singleton
     """
-    global _utils_instance
-    if _utils_instance is None:
-        _utils_instance = PersianUtils()
-    return _utils_instance
+    return PersianUtils()
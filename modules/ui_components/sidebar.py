@@ -1,8 +1,12 @@
 """Sidebar — Case metadata display & AI settings."""
 
+import html
+
 import streamlit as st
 from typing import Optional, Dict, Any
 
+from config.settings import get_settings
+from modules.legal_engine.client_factory import reset_client
 from modules.ui_components.persian_utils import get_persian_utils
 
 # ── Model catalogues ──
@@ -22,10 +26,79 @@ PROVIDER_MODELS = {
     ],
 }
 
+# Position of each model in its provider's list (selectbox default index)
+_MODEL_INDEX = {
+    provider: {model: i for i, model in enumerate(models)}
+    for provider, models in PROVIDER_MODELS.items()
+}
+
+
+# ── Static sidebar blocks ──
+
+_BRAND_HTML = (
+    "<div style='text-align:center; padding: 0.5rem 0 0.75rem;'>"
+    "<svg xmlns='http://www.w3.org/2000/svg' width='32' height='32' viewBox='0 0 24 24' fill='none' "
+    "stroke='#2563eb' stroke-width='1.5' stroke-linecap='round' stroke-linejoin='round' "
+    "style='display:inline-block; margin-bottom:0.375rem;'>"
+    "<path d='M5.7 15l1.3-2.6 1.3 2.6'/>"
+    "<path d='M12 3l0 18'/>"
+    "<path d='M9 3h6'/>"
+    "<path d='M15.7 15l1.3-2.6 1.3 2.6'/>"
+    "<path d='M4 15h4'/>"
+    "<path d='M16 15h4'/>"
+    "<path d='M12 15a4 4 0 0 1-4 4h8a4 4 0 0 1-4-4'/>"
+    "</svg>"
+    "<h3 style='margin:0; font-size:1.0625rem; font-weight:600; color:#fafafa;'>دادیار هوشمند</h3>"
+    "<p style='color:#71717a; font-size:0.75rem; margin:0.125rem 0 0;'>تحلیل پرونده‌های حقوقی</p>"
+    "</div>"
+)
+
+_CAPABILITIES_MD = (
+    "استخراج اطلاعات · تحلیل مواد قانونی  \n"
+    "استدلال گام‌به‌گام · گراف تعاملی  \n"
+    "صدور حکم نهایی"
+)
+
+_FOOTER_HTML = (
+    "<div style='text-align:center; color:#52525b; font-size:0.7rem; line-height:1.6;'>"
+    "توسعه‌دهنده: مهسا میرزایی<br>"
+    "نسخه ۱.۲.۰"
+    "</div>"
+)
+
+# Small muted label, like st.caption, usable inside a larger markdown block
+_CAPTION_HTML = "<p style='color:#a1a1aa; font-size:0.875rem; margin:0;'>{}</p>"
+
+_ACTIVE_MODEL_CAPTION = _CAPTION_HTML.format("مدل فعال")
+
+# Everything below the active-model line, sent as part of a single element
+_SIDEBAR_TAIL_MD = (
+    _CAPTION_HTML.format("قابلیت‌ها") + "\n\n"
+    + _CAPABILITIES_MD + "\n\n---\n\n"
+    + _FOOTER_HTML
+)
+
+
+def _render_case_block(case_data: Dict[str, Any]) -> str:
+    """Markdown/HTML for the active-case summary."""
+    case_id, date, plaintiff, defendant = (
+        html.escape(str(case_data.get(field, "—")))
+        for field in ("case_id", "date", "plaintiff", "defendant")
+    )
+    return (
+        "##### پرونده فعال\n\n"
+        "<div style='display:flex; gap:1rem;'>"
+        f"<div style='flex:1;'>{_CAPTION_HTML.format('شناسه')}<strong>{case_id}</strong></div>"
+        f"<div style='flex:1;'>{_CAPTION_HTML.format('تاریخ')}<strong>{date}</strong></div>"
+        "</div>\n\n"
+        f"{_CAPTION_HTML.format('طرفین')}\n\n"
+        f"خواهان: {plaintiff}  \n"
+        f"خوانده: {defendant}\n\n---"
+    )
+
 
 def _init_ai_defaults():
     """Ensure AI-related session state keys exist."""
-    from config.settings import get_settings
     settings = get_settings()
 
     defaults = {
@@ -45,74 +118,24 @@ def render_sidebar(case_data: Optional[Dict[str, Any]] = None):
     utils = get_persian_utils()
 
     with st.sidebar:
-        # Brand
-        st.markdown(
-            "<div style='text-align:center; padding: 0.5rem 0 0.75rem;'>"
-            "<svg xmlns='http://www.w3.org/2000/svg' width='32' height='32' viewBox='0 0 24 24' fill='none' "
-            "stroke='#2563eb' stroke-width='1.5' stroke-linecap='round' stroke-linejoin='round' "
-            "style='display:inline-block; margin-bottom:0.375rem;'>"
-            "<path d='M5.7 15l1.3-2.6 1.3 2.6'/>"
-            "<path d='M12 3l0 18'/>"
-            "<path d='M9 3h6'/>"
-            "<path d='M15.7 15l1.3-2.6 1.3 2.6'/>"
-            "<path d='M4 15h4'/>"
-            "<path d='M16 15h4'/>"
-            "<path d='M12 15a4 4 0 0 1-4 4h8a4 4 0 0 1-4-4'/>"
-            "</svg>"
-            "<h3 style='margin:0; font-size:1.0625rem; font-weight:600; color:#fafafa;'>دادیار هوشمند</h3>"
-            "<p style='color:#71717a; font-size:0.75rem; margin:0.125rem 0 0;'>تحلیل پرونده‌های حقوقی</p>"
-            "</div>",
-            unsafe_allow_html=True,
-        )
-        st.markdown("---")
+        # Brand (with its separator, as one element)
+        st.markdown(_BRAND_HTML + "\n\n---", unsafe_allow_html=True)
 
-        # ── Current case ──
+        # ── Current case ── (heading, id/date, parties and separator as one element)
         if case_data:
-            st.markdown("##### پرونده فعال")
-
-            col1, col2 = st.columns(2)
-            with col1:
-                st.caption("شناسه")
-                st.markdown(f"**{case_data.get('case_id', '—')}**")
-            with col2:
-                st.caption("تاریخ")
-                st.markdown(f"**{case_data.get('date', '—')}**")
-
-            st.caption("طرفین")
-            st.markdown(
-                f"خواهان: {case_data.get('plaintiff', '—')}  \n"
-                f"خوانده: {case_data.get('defendant', '—')}"
-            )
-            st.markdown("---")
+            st.markdown(_render_case_block(case_data), unsafe_allow_html=True)
 
         # ── AI Settings ──
         with st.expander("تنظیمات مدل", expanded=False):
             _render_ai_settings()
 
-        st.markdown("---")
-
-        # ── Info ──
+        # ── Info ── (active model, capabilities and footer as one element)
         provider = st.session_state.get("ai_provider", "openai")
         provider_label = "OpenAI" if provider == "openai" else "Gemini"
         model = st.session_state.get("ai_model", "") or "پیش‌فرض"
 
-        st.caption("مدل فعال")
-        st.markdown(f"**{provider_label}** · {model}")
-
-        st.markdown("")
-        st.caption("قابلیت‌ها")
         st.markdown(
-            "استخراج اطلاعات · تحلیل مواد قانونی  \n"
-            "استدلال گام‌به‌گام · گراف تعاملی  \n"
-            "صدور حکم نهایی"
-        )
-
-        st.markdown("---")
-        st.markdown(
-            "<div style='text-align:center; color:#52525b; font-size:0.7rem; line-height:1.6;'>"
-            "توسعه‌دهنده: مهسا میرزایی<br>"
-            "نسخه ۱.۲.۰"
-            "</div>",
+            f"---\n\n{_ACTIVE_MODEL_CAPTION}\n\n**{provider_label}** · {model}\n\n{_SIDEBAR_TAIL_MD}",
             unsafe_allow_html=True,
         )
 
@@ -121,8 +144,6 @@ def render_sidebar(case_data: Optional[Dict[str, Any]] = None):
 
 def _render_ai_settings():
     """Interactive AI provider / model / API‑key controls."""
-    from modules.legal_engine.client_factory import reset_client
-
     # Provider
     provider_options = list(PROVIDER_MODELS.keys())
     current_provider = st.session_state.get("ai_provider", "openai")
@@ -145,7 +166,8 @@ def _render_ai_settings():
             key="_openai_key_input",
             help="platform.openai.com",
         )
-        st.session_state["openai_api_key"] = api_key
+        if st.session_state.get("openai_api_key") != api_key:
+            st.session_state["openai_api_key"] = api_key
     else:
         api_key = st.text_input(
             "کلید API",
@@ -154,15 +176,13 @@ def _render_ai_settings():
             key="_gemini_key_input",
             help="aistudio.google.com",
         )
-        st.session_state["gemini_api_key"] = api_key
+        if st.session_state.get("gemini_api_key") != api_key:
+            st.session_state["gemini_api_key"] = api_key
 
     # Model
     models = PROVIDER_MODELS[selected_provider]
     current_model = st.session_state.get("ai_model", "")
-    try:
-        default_idx = models.index(current_model)
-    except ValueError:
-        default_idx = 0
+    default_idx = _MODEL_INDEX[selected_provider].get(current_model, 0)
 
     selected_model = st.selectbox(
         "مدل",
@@ -193,9 +213,8 @@ def _render_ai_settings():
 
     st.markdown("")
     if st.button("پاک‌سازی حافظه نهان", use_container_width=True):
-        for key in list(st.session_state.keys()):
-            if key.startswith("analysis_"):
-                del st.session_state[key]
+        for key in st.session_state.pop("_analysis_keys", set()):
+            st.session_state.pop(key, None)
         reset_client()
         st.toast("حافظه پاک شد")
         st.rerun()
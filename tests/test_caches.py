@@ -0,0 +1,203 @@
+"""
+Tests for the SQLite-backed LLM response cache.
+"""
+
+import sqlite3
+import threading
+import time as real_time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import pytest
+
+from config.settings import Settings
+
+from modules.legal_engine import base_client
+from modules.legal_engine.base_client import LLMClient
+from modules.legal_engine.openai_client import OpenAIClient
+
+
+class _FakeClock:
+    """Stand-in for the time module with a settable time()."""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+class _StubClient(LLMClient):
+    """Minimal concrete client; only the cache helpers are exercised."""
+
+    provider_name = "stub"
+    model_name = "stub-model"
+    embedding_dimension = 4
+
+    def get_completion(self, prompt, **kwargs):
+        return None
+
+    def get_structured_json(self, prompt, **kwargs):
+        return None
+
+    def get_embedding(self, text):
+        return None
+
+    def get_embeddings_batch(self, texts):
+        return None
+
+    def count_tokens(self, text):
+        return len(text)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _FakeClock()
+    monkeypatch.setattr(base_client, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def llm_client(tmp_path, monkeypatch, clock):
+    monkeypatch.setattr(LLMClient, "_cache_file", tmp_path / "llm_cache.sqlite3")
+    monkeypatch.setattr(LLMClient, "_cache_db", None)
+    monkeypatch.setattr(LLMClient, "_memory_cache", OrderedDict())
+    monkeypatch.setattr(LLMClient, "_semantic_cache", {})
+    client = _StubClient()
+    yield client
+    LLMClient._cache_db.close()
+
+
+# ─── LLM response cache ───────────────────────────────────────────────
+
+def test_llm_cache_round_trip(llm_client):
+    key = llm_client._cache_key("پرسش", system_prompt="سیستم", temperature=0.2, max_tokens=100)
+    assert llm_client._cache_get(key) is None
+    llm_client._cache_set(key, {"پاسخ": [1, 2]})
+    assert llm_client._cache_get(key) == {"پاسخ": [1, 2]}
+
+
+def test_llm_cache_key_separates_parameters(llm_client):
+    key = llm_client._cache_key("پرسش", temperature=0.2, max_tokens=100)
+    llm_client._cache_set(key, "a")
+    for other in (
+        llm_client._cache_key("پرسش", temperature=0.3, max_tokens=100),
+        llm_client._cache_key("پرسش", temperature=0.2, max_tokens=200),
+        llm_client._cache_key("پرسش", system_prompt="x", temperature=0.2, max_tokens=100),
+        llm_client._cache_key("پرسش دیگر", temperature=0.2, max_tokens=100),
+    ):
+        assert llm_client._disk_key(other) != llm_client._disk_key(key)
+        assert llm_client._cache_get(other) is None
+
+
+def test_llm_cache_survives_restart_through_sqlite(llm_client, monkeypatch):
+    key = llm_client._cache_key("پرسش")
+    llm_client._cache_set(key, "پاسخ")
+    # A new process starts with an empty memory layer
+    monkeypatch.setattr(LLMClient, "_memory_cache", OrderedDict())
+    assert llm_client._cache_get(key) == "پاسخ"
+    assert key in LLMClient._memory_cache
+
+
+@pytest.mark.parametrize("drop_memory", [False, True])
+def test_llm_cache_max_age(llm_client, clock, monkeypatch, drop_memory):
+    key = llm_client._cache_key("پرسش")
+    llm_client._cache_set(key, "پاسخ")
+    clock.now += 100
+    if drop_memory:
+        monkeypatch.setattr(LLMClient, "_memory_cache", OrderedDict())
+    assert llm_client._cache_get(key, max_age=200) == "پاسخ"
+    assert llm_client._cache_get(key, max_age=50) is None
+    assert llm_client._cache_get(key) == "پاسخ"
+
+
+def test_llm_cache_evicts_least_recently_used(llm_client, clock, monkeypatch):
+    monkeypatch.setattr(LLMClient, "_cache_max_entries", 2)
+    keys = [llm_client._cache_key(f"پرسش {i}") for i in range(3)]
+    for i, key in enumerate(keys[:2]):
+        clock.now += 1
+        llm_client._cache_set(key, i)
+    # Touch the oldest entry on disk so the second one becomes least recent
+    monkeypatch.setattr(LLMClient, "_memory_cache", OrderedDict())
+    clock.now += 1
+    assert llm_client._cache_get(keys[0]) == 0
+    clock.now += 1
+    llm_client._cache_set(keys[2], 2)
+
+    monkeypatch.setattr(LLMClient, "_memory_cache", OrderedDict())
+    assert llm_client._cache_get(keys[0]) == 0
+    assert llm_client._cache_get(keys[1]) is None
+    assert llm_client._cache_get(keys[2]) == 2
+
+
+def test_llm_cache_clear(llm_client):
+    key = llm_client._cache_key("پرسش")
+    llm_client._cache_set(key, "پاسخ")
+    llm_client.clear_cache()
+    assert llm_client._cache_get(key) is None
+
+
+def test_json_mode_keys_are_separate(llm_client):
+    text_key = llm_client._cache_key("پرسش", temperature=0.3)
+    json_key = llm_client._cache_key("پرسش", temperature=0.3, json_mode=True)
+    assert json_key != text_key
+    assert llm_client._disk_key(json_key) != llm_client._disk_key(text_key)
+
+
+def _json_client() -> OpenAIClient:
+    """OpenAIClient whose JSON-mode calls return a fixed object and are counted."""
+    client = OpenAIClient.__new__(OpenAIClient)
+    client.settings = Settings()
+    client._model_name = "gpt-4o"
+    client._request_bucket = None
+    client._token_bucket = None
+    client.calls = 0
+
+    def _create(**kwargs):
+        client.calls += 1
+        message = SimpleNamespace(content='{"analyses": [{"article_number": 308}]}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=_create)))
+    return client
+
+
+def test_structured_json_cache_is_opt_in(llm_client, clock):
+    # llm_client only provides the isolated cache database
+    client = _json_client()
+
+    client.get_structured_json("پرسش")
+    client.get_structured_json("پرسش")
+    assert client.calls == 2
+
+    first = client.get_structured_json("پرسش", use_cache=True, cache_ttl=60)
+    second = client.get_structured_json("پرسش", use_cache=True, cache_ttl=60)
+    assert client.calls == 3
+    assert second == first == {"analyses": [{"article_number": 308}]}
+    assert second is not first  # Parsed afresh on every hit
+
+    clock.now += 61
+    client.get_structured_json("پرسش", use_cache=True, cache_ttl=60)
+    assert client.calls == 4
+
+
+def test_clients_created_concurrently_share_one_connection(tmp_path, monkeypatch):
+    monkeypatch.setattr(LLMClient, "_cache_file", tmp_path / "llm_cache.sqlite3")
+    monkeypatch.setattr(LLMClient, "_cache_db", None)
+    connections = []
+    connect = sqlite3.connect
+
+    def _slow_connect(*args, **kwargs):
+        real_time.sleep(0.05)  # Widen the window between the check and the assignment
+        connections.append(connect(*args, **kwargs))
+        return connections[-1]
+
+    monkeypatch.setattr(base_client.sqlite3, "connect", _slow_connect)
+    threads = [threading.Thread(target=_StubClient) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert connections == [LLMClient._cache_db]
+    LLMClient._cache_db.close()
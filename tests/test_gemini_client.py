@@ -0,0 +1,112 @@
+"""
+Tests for GeminiClient's streaming completions: retries, interruption and
+the adaptive concurrency slot. The google-genai SDK is
+replaced by fakes, and the response cache is not used (use_cache=False).
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from config.settings import Settings
+from modules.legal_engine import base_client, gemini_client
+from modules.legal_engine.base_client import StreamInterruptedError
+from modules.legal_engine.gemini_client import GeminiClient
+from modules.legal_engine.rate_limiter import AIMDConcurrencyLimiter
+
+
+class _ResourceExhausted(Exception):
+    pass
+
+
+class _FakeModels:
+    """generate_content_stream() yields the given chunks, then optionally fails."""
+
+    def __init__(self, texts, fail_after: bool = False, rate_limited: int = 0):
+        self.texts = texts
+        self.fail_after = fail_after
+        self.rate_limited = rate_limited
+        self.calls = 0
+
+    def generate_content_stream(self, model, contents, config):
+        self.calls += 1
+        if self.calls <= self.rate_limited:
+            raise _ResourceExhausted("429")
+        for text in self.texts:
+            yield SimpleNamespace(text=text)
+        if self.fail_after:
+            raise RuntimeError("connection reset")
+
+
+def _make_client(models: _FakeModels) -> GeminiClient:
+    client = GeminiClient.__new__(GeminiClient)
+    client.settings = Settings()
+    client._model_name = "gemini-2.0-flash"
+    client._client = SimpleNamespace(models=models)
+    client._rate_limiter = SimpleNamespace(wait=lambda: None)
+    client._concurrency_limiter = AIMDConcurrencyLimiter(initial=2.0)
+    client._overload_exceptions = (_ResourceExhausted,)
+    client._google_exceptions = SimpleNamespace(
+        ResourceExhausted=_ResourceExhausted,
+        GoogleAPIError=RuntimeError,
+        InvalidArgument=ValueError,
+    )
+    client._genai_types = SimpleNamespace(GenerateContentConfig=lambda **kwargs: kwargs)
+    return client
+
+
+@pytest.fixture(autouse=True)
+def quiet_streamlit(monkeypatch):
+    monkeypatch.setattr(gemini_client.st, "error", lambda *a, **k: None)
+    monkeypatch.setattr(gemini_client.st, "warning", lambda *a, **k: None)
+    monkeypatch.setattr(base_client.st, "error", lambda *a, **k: None)
+    monkeypatch.setattr(base_client.st, "warning", lambda *a, **k: None)
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    """Skip the retry back-off sleeps (base_client.time is the time module itself)."""
+    monkeypatch.setattr(base_client.time, "sleep", lambda seconds: None)
+
+
+def test_stream_yields_all_chunks():
+    client = _make_client(_FakeModels(["الف", "", "ب"]))
+    assert list(client.get_completion_stream("پرسش", use_cache=False)) == ["الف", "ب"]
+
+
+def test_stream_releases_concurrency_slot_before_yielding():
+    client = _make_client(_FakeModels(["الف", "ب"]))
+    limiter = client._concurrency_limiter
+    stream = client.get_completion_stream("پرسش", use_cache=False)
+
+    assert next(stream) == "الف"
+    assert limiter._in_flight == 0
+
+
+def test_abandoned_stream_does_not_grow_concurrency_limit():
+    client = _make_client(_FakeModels(["الف", "ب", "ج"]))
+    limiter = client._concurrency_limiter
+    stream = client.get_completion_stream("پرسش", use_cache=False)
+    next(stream)
+    limit = limiter.limit
+    stream.close()
+
+    assert limiter.limit == limit
+    assert limiter._in_flight == 0
+
+
+def test_stream_retries_rate_limited_open(no_backoff):
+    models = _FakeModels(["الف"], rate_limited=1)
+    client = _make_client(models)
+
+    assert list(client.get_completion_stream("پرسش", use_cache=False)) == ["الف"]
+    assert models.calls == 2
+
+
+def test_stream_failure_after_text_raises_interrupted():
+    client = _make_client(_FakeModels(["الف"], fail_after=True))
+    received = []
+    with pytest.raises(StreamInterruptedError):
+        for chunk in client.get_completion_stream("پرسش", use_cache=False):
+            received.append(chunk)
+    assert received == ["الف"]
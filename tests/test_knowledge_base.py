@@ -0,0 +1,115 @@
+"""
+Tests for LegalKnowledgeBase: TF-IDF retrieval, keyword search, related
+articles and the article copies handed to callers.
+"""
+
+import pytest
+
+from modules.legal_engine import knowledge_base
+from modules.legal_engine.knowledge_base import LegalKnowledgeBase
+
+ARTICLES = [
+    {
+        "article_number": 308,
+        "title": "تعریف غصب",
+        "text": "غصب استیلا بر حق غیر است به نحو عدوان.",
+        "keywords": ["غصب", "استیلا", "عدوان"],
+        "related_articles": [309],
+    },
+    {
+        "article_number": 309,
+        "title": "مزاحمت",
+        "text": "هرگاه کسی مالک را از تصرف در مال خود مانع شود غاصب نیست.",
+        "keywords": ["مزاحمت", "تصرف"],
+        "related_articles": [308, 311],
+    },
+    {
+        "article_number": 311,
+        "title": "رد مال",
+        "text": "غاصب باید مال مغصوب را عیناً به صاحب آن رد نماید.",
+        "keywords": ["رد مال", "مال مغصوب"],
+        "related_articles": [],
+    },
+]
+
+
+@pytest.fixture
+def kb(tmp_path, monkeypatch):
+    fit = LegalKnowledgeBase._load_or_fit_tfidf
+
+    def _fit_in_tmp(self):
+        self.tfidf_cache_file = tmp_path / "tfidf_cache.joblib"
+        return fit(self)
+
+    monkeypatch.setattr(LegalKnowledgeBase, "_load_data", lambda self: {
+        "articles": [dict(a) for a in ARTICLES], "legal_concepts": {},
+    })
+    monkeypatch.setattr(LegalKnowledgeBase, "_load_or_fit_tfidf", _fit_in_tmp)
+    return LegalKnowledgeBase()
+
+
+def test_retrieval_ranks_matching_article_first(kb):
+    results = kb.retrieve_relevant_articles("رد مال مغصوب به صاحب آن", top_k=3, similarity_threshold=0.01)
+
+    assert results[0]["article_number"] == 311
+    scores = [r["relevance_score"] for r in results]
+    assert scores == sorted(scores, reverse=True)
+    assert all(0 <= r["similarity"] <= 1 for r in results)
+
+
+def test_hybrid_score_adds_keyword_matches(kb):
+    query = "استیلا و عدوان"
+    plain = kb.retrieve_relevant_articles(query, top_k=1, similarity_threshold=0.01, use_hybrid=False)
+    hybrid = kb.retrieve_relevant_articles(query, top_k=1, similarity_threshold=0.01)
+
+    assert plain[0]["article_number"] == hybrid[0]["article_number"] == 308
+    similarity = plain[0]["similarity"]
+    assert hybrid[0]["relevance_score"] == pytest.approx(0.7 * similarity + 0.3 * 2 / 3)
+
+
+def test_threshold_filters_results(kb):
+    assert kb.retrieve_relevant_articles("غصب", top_k=3, similarity_threshold=0.99) == []
+
+
+def test_tfidf_model_is_reused_from_disk(kb, monkeypatch):
+    def _no_refit(**kwargs):
+        raise AssertionError("TF-IDF model was fitted again")
+
+    monkeypatch.setattr(knowledge_base, "TfidfVectorizer", _no_refit)
+    cached = LegalKnowledgeBase()
+    query = "غاصب و مال مغصوب"
+    assert (cached._score_query(query) == kb._score_query(query)).all()
+
+
+@pytest.mark.parametrize("keywords, match_all, expected", [
+    (["غصب"], False, [308]),
+    (["تصرف", "رد مال"], False, [309, 311]),
+    (["غاصب", "مال"], True, [309, 311]),
+    (["مزاحمت", "غصب"], True, []),
+])
+def test_search_by_keywords(kb, keywords, match_all, expected):
+    results = kb.search_by_keywords(keywords, match_all=match_all)
+    assert [a["article_number"] for a in results] == expected
+
+
+def test_related_articles(kb):
+    assert [a["article_number"] for a in kb.get_related_articles(308)] == [309]
+    assert [a["article_number"] for a in kb.get_related_articles(308, depth=2)] == [309, 311]
+
+
+def test_returned_articles_are_plain_copies(kb):
+    article = kb.get_article_by_number(308)
+    assert type(article) is dict
+    article["title"] = "تغییر"
+
+    for articles in (
+        kb.get_all_articles(),
+        kb.search_by_keywords(["غصب"]),
+        kb.get_related_articles(309),
+    ):
+        assert all(type(a) is dict for a in articles)
+        for a in articles:
+            a["title"] = "تغییر"
+
+    assert kb.get_article_by_number(308)["title"] == "تعریف غصب"
+    assert kb.get_article_by_number(999) is None
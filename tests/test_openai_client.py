@@ -0,0 +1,170 @@
+"""
+Tests for OpenAIClient: batched embeddings (de-duplication, token-budget
+packing, concurrent fan-out) and streamed completions. The SDK client is
+replaced by fakes.
+"""
+
+import threading
+import time
+from dataclasses import replace
+from types import SimpleNamespace
+
+import pytest
+
+from config.settings import Settings
+from modules.legal_engine import base_client, openai_client
+from modules.legal_engine.base_client import StreamInterruptedError
+from modules.legal_engine.openai_client import OpenAIClient
+
+
+class _FakeEmbeddings:
+    """Records each embeddings.create() batch and returns [len(text)] vectors."""
+
+    def __init__(self, delay: float = 0.0, fail_on: str = None):
+        self.batches = []
+        self.delay = delay
+        self.fail_on = fail_on
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def create(self, model, input):
+        with self._lock:
+            self.batches.append(list(input))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if self.fail_on in input:
+                raise RuntimeError("boom")
+            return SimpleNamespace(data=[
+                SimpleNamespace(embedding=[float(len(text))]) for text in input
+            ])
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class _RateLimited(Exception):
+    pass
+
+
+def _make_client(embeddings: _FakeEmbeddings, batch_size: int = 100) -> OpenAIClient:
+    client = OpenAIClient.__new__(OpenAIClient)
+    client.settings = replace(Settings(), EMBEDDING_BATCH_SIZE=batch_size)
+    client.client = SimpleNamespace(embeddings=embeddings)
+    client._model_name = "gpt-4o"
+    client._rate_limit_errors = (_RateLimited,)
+    client._api_errors = ()
+    client._request_bucket = None
+    client._token_bucket = None
+    client.count_tokens = len  # One "token" per character
+    return client
+
+
+@pytest.fixture(autouse=True)
+def quiet_streamlit(monkeypatch):
+    monkeypatch.setattr(openai_client.st, "error", lambda *a, **k: None)
+    monkeypatch.setattr(openai_client.st, "warning", lambda *a, **k: None)
+    monkeypatch.setattr(base_client.st, "error", lambda *a, **k: None)
+    monkeypatch.setattr(base_client.st, "warning", lambda *a, **k: None)
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    """Skip the retry back-off sleeps (base_client.time is the time module itself)."""
+    monkeypatch.setattr(base_client.time, "sleep", lambda seconds: None)
+
+
+def test_embeddings_batch_dedupes_and_keeps_order():
+    fake = _FakeEmbeddings()
+    client = _make_client(fake)
+    texts = ["a", "bb", "a", "ccc", "bb"]
+
+    assert client.get_embeddings_batch(texts) == [[1.0], [2.0], [1.0], [3.0], [2.0]]
+    sent = [text for batch in fake.batches for text in batch]
+    assert sorted(sent) == ["a", "bb", "ccc"]
+
+
+def test_embeddings_batches_respect_size_and_token_budget(monkeypatch):
+    monkeypatch.setattr(openai_client, "_EMBEDDING_BATCH_TOKENS", 10)
+    client = _make_client(_FakeEmbeddings(), batch_size=3)
+    texts = ["x" * 4, "y" * 4, "z" * 4, "w", "v", "u", "t"]
+
+    batches = client._pack_embedding_batches(texts)
+
+    assert batches == [["x" * 4, "y" * 4], ["z" * 4, "w", "v"], ["u", "t"]]
+    # A single text over the budget still gets its own batch
+    assert client._pack_embedding_batches(["x" * 50, "y"]) == [["x" * 50], ["y"]]
+
+
+def test_embeddings_batches_are_sent_concurrently():
+    fake = _FakeEmbeddings(delay=0.2)
+    client = _make_client(fake, batch_size=1)
+    texts = [f"text {i}" for i in range(8)]
+
+    result = client.get_embeddings_batch(texts)
+
+    assert result == [[float(len(t))] for t in texts]
+    assert len(fake.batches) == 8
+    assert 1 < fake.max_in_flight <= openai_client._EMBEDDING_CONCURRENCY
+
+
+def test_embeddings_batch_failure_returns_none():
+    client = _make_client(_FakeEmbeddings(fail_on="bad"), batch_size=1)
+    assert client.get_embeddings_batch(["good", "bad"]) is None
+
+
+# ─── Streaming ────────────────────────────────────────────────────────
+
+class _FakeCompletions:
+    """create(stream=True) fails *rate_limited* times, then streams *texts*."""
+
+    def __init__(self, texts, rate_limited: int = 0, fail_after: bool = False):
+        self.texts = texts
+        self.rate_limited = rate_limited
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def create(self, stream, **kwargs):
+        self.calls += 1
+        if self.calls <= self.rate_limited:
+            raise _RateLimited("429")
+        return self._events()
+
+    def _events(self):
+        for text in self.texts:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+        if self.fail_after:
+            raise RuntimeError("connection reset")
+
+
+def _make_streaming_client(completions: _FakeCompletions) -> OpenAIClient:
+    client = _make_client(_FakeEmbeddings())
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return client
+
+
+def test_stream_retries_rate_limited_open(no_backoff):
+    completions = _FakeCompletions(["الف", "ب"], rate_limited=2)
+    client = _make_streaming_client(completions)
+
+    assert list(client.get_completion_stream("پرسش", use_cache=False)) == ["الف", "ب"]
+    assert completions.calls == 3
+
+
+def test_stream_gives_up_after_max_retries(no_backoff):
+    completions = _FakeCompletions(["الف"], rate_limited=10)
+    client = _make_streaming_client(completions)
+
+    assert list(client.get_completion_stream("پرسش", use_cache=False)) == []
+    assert completions.calls == 3
+
+
+def test_stream_failure_after_text_raises_interrupted():
+    client = _make_streaming_client(_FakeCompletions(["الف"], fail_after=True))
+    received = []
+    with pytest.raises(StreamInterruptedError):
+        for chunk in client.get_completion_stream("پرسش", use_cache=False):
+            received.append(chunk)
+    assert received == ["الف"]
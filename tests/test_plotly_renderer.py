@@ -0,0 +1,65 @@
+"""
+Tests for PlotlyRenderer: graph fingerprints, SVG/WebGL trace choice and
+the cached figure being returned as a copy.
+"""
+
+import networkx as nx
+import plotly.graph_objects as go
+
+from modules.graph_builder import plotly_renderer
+from modules.graph_builder.plotly_renderer import PlotlyRenderer
+
+
+def _chain_graph(length: int, confidence: float = 0.8) -> nx.DiGraph:
+    """FACT → ARTICLE → DEDUCTION → VERDICT layers, repeated *length* times."""
+    graph = nx.DiGraph()
+    for i in range(length):
+        node_type = i % 4
+        graph.add_node(
+            f"n{i}", node_type=node_type, label=f"گره {i}", text="متن",
+            confidence=confidence, article_number=i if node_type == 1 else None,
+        )
+        if i:
+            graph.add_edge(f"n{i - 1}", f"n{i}")
+    return graph
+
+
+def test_fingerprint_uses_content_key():
+    graph = _chain_graph(4)
+    graph.graph["content_key"] = "abc"
+    assert PlotlyRenderer._fingerprint(graph) == "abc"
+
+
+def test_fingerprint_is_content_based():
+    assert PlotlyRenderer._fingerprint(_chain_graph(4)) == PlotlyRenderer._fingerprint(_chain_graph(4))
+    assert PlotlyRenderer._fingerprint(_chain_graph(4)) != PlotlyRenderer._fingerprint(_chain_graph(4, 0.5))
+    assert PlotlyRenderer._fingerprint(_chain_graph(4)) != PlotlyRenderer._fingerprint(_chain_graph(5))
+
+
+def test_fingerprint_is_stable_across_processes():
+    # hash() of a str is salted per process; the fallback must not depend on it
+    fingerprint = PlotlyRenderer._fingerprint(_chain_graph(4))
+    assert len(fingerprint) == 32
+    int(fingerprint, 16)
+
+
+def test_small_graphs_use_svg_and_large_graphs_webgl():
+    renderer = PlotlyRenderer()
+    small = renderer._build_figure(_chain_graph(8), 800, 600)
+    large = renderer._build_figure(_chain_graph(plotly_renderer._WEBGL_THRESHOLD), 800, 600)
+
+    assert {trace.type for trace in small.data} == {"scatter"}
+    assert {trace.type for trace in large.data} == {"scattergl"}
+
+
+def test_render_returns_a_copy_of_the_cached_figure():
+    renderer = PlotlyRenderer()
+    graph = _chain_graph(8)
+
+    first = renderer.render(graph, 800, 600)
+    first.update_layout(title_text="تغییر")
+    second = renderer.render(graph, 800, 600)
+
+    assert isinstance(second, go.Figure)
+    assert second is not first
+    assert second.layout.title.text != "تغییر"
@@ -0,0 +1,159 @@
+"""
+Tests for the client-side rate limiters.
+
+Time is simulated: sleep() advances a fake monotonic clock, so waiting
+behaviour is checked without real delays.
+"""
+
+import pytest
+
+from config.settings import Settings
+from modules.legal_engine import rate_limiter
+from modules.legal_engine.rate_limiter import (
+    AIMDConcurrencyLimiter,
+    SlidingWindowLimiter,
+    TokenBucket,
+)
+
+
+class _FakeTime:
+    """Stand-in for the time module: sleep() advances monotonic()."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+        self.slept += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _FakeTime()
+    monkeypatch.setattr(rate_limiter, "time", fake)
+    return fake
+
+
+# ─── TokenBucket ──────────────────────────────────────────────────────
+
+def test_token_bucket_allows_burst_then_waits_for_refill(clock):
+    bucket = TokenBucket(capacity=60, refill_rate=1.0)
+    bucket.acquire(60)
+    assert clock.slept == 0
+
+    bucket.acquire(10)
+    assert 10 <= clock.slept < 10.1
+
+
+def test_token_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(capacity=5, refill_rate=1.0)
+    bucket.acquire(5)
+    clock.now += 1000
+    bucket.acquire(5)
+    assert clock.slept == 0
+    bucket.acquire(1)
+    assert clock.slept > 0
+
+
+def test_token_bucket_oversized_request_is_clamped_to_capacity(clock):
+    bucket = TokenBucket(capacity=10, refill_rate=1.0)
+    bucket.acquire(50)
+    assert clock.slept == 0
+
+
+@pytest.mark.parametrize("refill_rate", [0.0, -1.0])
+def test_token_bucket_rejects_non_positive_refill(refill_rate):
+    with pytest.raises(ValueError):
+        TokenBucket(capacity=10, refill_rate=refill_rate)
+
+
+def test_get_token_bucket_shares_by_key(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_token_buckets", {})
+    bucket = rate_limiter.get_token_bucket("k", 600)
+    assert rate_limiter.get_token_bucket("k", 1) is bucket
+    assert bucket.capacity == 600
+    assert bucket.refill_rate == 10
+
+
+def test_token_cap_is_off_by_default():
+    # max_tokens is charged in full, so a fixed default cap would throttle
+    # accounts whose real TPM limit is far higher
+    assert Settings().OPENAI_TPM_LIMIT == 0
+
+
+def test_openai_client_skips_disabled_limits():
+    from modules.legal_engine.openai_client import OpenAIClient
+
+    client = OpenAIClient.__new__(OpenAIClient)
+    client._request_bucket = None
+    client._token_bucket = None
+    # Would fail on count_tokens / acquire if a bucket were consulted
+    client._wait_for_capacity([{"role": "user", "content": None}], max_tokens=10)
+
+
+# ─── SlidingWindowLimiter ─────────────────────────────────────────────
+
+def test_sliding_window_waits_for_oldest_call_to_expire(clock):
+    limiter = SlidingWindowLimiter(max_calls=2, period=60.0)
+    limiter.wait()
+    clock.now = 10.0
+    limiter.wait()
+    assert clock.slept == 0
+
+    limiter.wait()
+    assert clock.now >= 60.0
+
+
+def test_sliding_window_clamps_zero_limit_to_one(clock):
+    limiter = SlidingWindowLimiter(max_calls=0, period=60.0)
+    assert limiter.max_calls == 1
+    limiter.wait()
+    limiter.wait()
+    assert clock.now >= 60.0
+
+
+# ─── AIMDConcurrencyLimiter ───────────────────────────────────────────
+
+class _Overloaded(Exception):
+    pass
+
+
+def test_aimd_fast_success_increases_limit(clock):
+    limiter = AIMDConcurrencyLimiter(initial=2.0, max_limit=3.0, increase=0.5)
+    with limiter.slot():
+        pass
+    assert limiter.limit == 2.5
+    for _ in range(5):
+        with limiter.slot():
+            pass
+    assert limiter.limit == 3.0
+
+
+def test_aimd_slow_success_keeps_limit(clock):
+    limiter = AIMDConcurrencyLimiter(initial=2.0, target_latency=1.0)
+    with limiter.slot():
+        clock.now += 5
+    assert limiter.limit == 2.0
+
+
+def test_aimd_overload_decreases_limit_and_reraises(clock):
+    limiter = AIMDConcurrencyLimiter(initial=4.0, min_limit=1.0, decrease=0.5)
+    for expected in (2.0, 1.0, 1.0):
+        with pytest.raises(_Overloaded):
+            with limiter.slot(overload_exceptions=(_Overloaded,)):
+                raise _Overloaded()
+        assert limiter.limit == expected
+    assert limiter._in_flight == 0
+
+
+def test_aimd_other_errors_leave_limit_unchanged(clock):
+    limiter = AIMDConcurrencyLimiter(initial=2.0)
+    with pytest.raises(KeyError):
+        with limiter.slot(overload_exceptions=(_Overloaded,)):
+            raise KeyError("x")
+    assert limiter.limit == 2.0
+    assert limiter._in_flight == 0
@@ -0,0 +1,143 @@
+"""
+Tests for ReasoningEngine's parsers of LLM output and streamed deductions.
+
+The previous implementations are kept here as references, so the compiled
+regexes are pinned to their results on representative lines.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from modules.legal_engine import reasoning_engine
+from modules.legal_engine.base_client import StreamInterruptedError
+from modules.legal_engine.reasoning_engine import ReasoningEngine
+
+
+# ─── Reference (previous) implementations ─────────────────────────────
+
+def _legacy_parse_deduction_line(line):
+    line = line.strip()
+    if line and (line[0].isdigit() or line.startswith('-') or line.startswith('•')):
+        return line.lstrip('0123456789.-•) ').strip() or None
+    return None
+
+
+def _legacy_extract_confidence(text):
+    text_lower = text.lower()
+    if any(kw in text_lower for kw in ['قطعاً', 'حتماً', 'بدون شک', 'کاملاً']):
+        return 0.95
+    if any(kw in text_lower for kw in ['احتمالاً', 'به نظر می‌رسد', 'مرتبط است']):
+        return 0.80
+    if any(kw in text_lower for kw in ['ممکن است', 'شاید', 'می‌تواند']):
+        return 0.60
+    if any(kw in text_lower for kw in ['نامحتمل', 'بعید', 'کمتر مرتبط']):
+        return 0.30
+    return 0.70
+
+
+# ─── Deduction lines ──────────────────────────────────────────────────
+
+@pytest.mark.parametrize("line", [
+    "1. خوانده متعهد به پرداخت است",
+    "  2) قرارداد نافذ است  ",
+    "- تأخیر در پرداخت محرز است",
+    "• مطالبه خسارت وارد است",
+    "10. مورد دهم",
+    "1.\tمتن با جداکننده تب",
+    "\t3 -  مورد سوم",
+    "عنوان بدون شماره",
+    "",
+    "   ",
+    "1.",
+    "- ",
+])
+def test_parse_deduction_line_matches_legacy_parser(line):
+    assert ReasoningEngine._parse_deduction_line(line) == _legacy_parse_deduction_line(line)
+
+
+def test_parse_deduction_line_keeps_tab_separated_items():
+    assert ReasoningEngine._parse_deduction_line("1.\tمتن") == "متن"
+
+
+# ─── Keyword confidence ───────────────────────────────────────────────
+
+@pytest.mark.parametrize("text", [
+    "این ماده قطعاً قابل اعمال است",
+    "به نظر می‌رسد ماده مرتبط است",
+    "ممکن است این ماده اعمال شود",
+    "اعمال این ماده بعید است",
+    "این ماده کمتر مرتبط است",  # Overlaps the 'مرتبط است' keyword
+    "شاید، ولی کاملاً روشن نیست",
+    "متن بدون کلیدواژه",
+])
+def test_extract_confidence_matches_legacy(text):
+    engine = ReasoningEngine.__new__(ReasoningEngine)
+    assert engine._extract_confidence(text) == _legacy_extract_confidence(text)
+
+
+# ─── Streamed deductions ──────────────────────────────────────────────
+
+class _BrokenStreamClient:
+    """Streams the first lines of *text*, then breaks off mid-line."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.completion_calls = 0
+
+    def get_completion_stream(self, **kwargs):
+        yield self.text[:len(self.text) // 2]
+        raise StreamInterruptedError("connection reset")
+
+    def get_completion(self, **kwargs):
+        self.completion_calls += 1
+        return self.text
+
+
+def test_interrupted_deduction_stream_restarts_from_full_completion(monkeypatch):
+    shown = []
+    placeholder = SimpleNamespace(markdown=shown.append, empty=lambda: shown.append(None))
+    monkeypatch.setattr(reasoning_engine, "st", SimpleNamespace(empty=lambda: placeholder))
+    client = _BrokenStreamClient(
+        "1. قرارداد نافذ است\n2. خوانده متعهد به پرداخت است\n3. تأخیر محرز است"
+    )
+    engine = ReasoningEngine.__new__(ReasoningEngine)
+    engine.client = client
+
+    deductions = engine._generate_deductions(
+        articles=[],
+        analyses=[{"article_number": 10, "analysis_text": "نافذ", "is_applicable": True}],
+        case_facts=["قرارداد کتبی"],
+    )
+
+    assert client.completion_calls == 1
+    assert deductions == [
+        "قرارداد نافذ است", "خوانده متعهد به پرداخت است", "تأخیر محرز است",
+    ]
+    assert None in shown  # The partial list was cleared before the restart
+
+
+# ─── Batched article analysis ─────────────────────────────────────────
+
+def test_batched_analysis_is_cached_like_per_article_analysis():
+    calls = []
+
+    def _structured_json(**kwargs):
+        calls.append(kwargs)
+        return {"analyses": [
+            {"article_number": 308, "analysis": "قطعاً مرتبط است", "confidence": 90},
+        ]}
+
+    engine = ReasoningEngine.__new__(ReasoningEngine)
+    engine.client = SimpleNamespace(get_structured_json=_structured_json)
+    articles = [
+        {"article_number": 308, "title": "غصب", "text": "متن"},
+        {"article_number": 309, "title": "مزاحمت", "text": "متن"},
+    ]
+
+    analyses = engine._analyze_articles_batched(articles, ["واقعیت"])
+
+    assert calls[0]["use_cache"] is True
+    assert calls[0]["cache_ttl"] == reasoning_engine.ARTICLE_ANALYSIS_CACHE_TTL
+    assert analyses[0]["confidence"] == 0.9
+    assert analyses[1] is None
@@ -0,0 +1,97 @@
+"""
+Tests for ReasoningGraph: building the layered graph, converting the flat
+arrays to NetworkX, and layer/statistics queries after later edits.
+"""
+
+import pytest
+
+from modules.graph_builder.reasoning_graph import (
+    NODE_ARTICLE, NODE_DEDUCTION, NODE_FACT, NODE_VERDICT,
+    REL_APPLIES, REL_LEADS, REL_TO, ReasoningGraph,
+)
+from modules.legal_engine.entity_extractor import CaseEntities
+from modules.legal_engine.reasoning_engine import ReasoningResult, ReasoningStep
+
+
+def _reasoning(overall_confidence: float = 0.85) -> ReasoningResult:
+    return ReasoningResult(
+        case_id="C1",
+        entities=CaseEntities(plaintiff="الف", defendant="ب", key_facts=["واقعیت"]),
+        retrieved_articles=[],
+        reasoning_steps=[
+            ReasoningStep("FACT", "واقعیت ۱", 1.0),
+            ReasoningStep("FACT", "واقعیت ۲", 0.9),
+            ReasoningStep("ARTICLE", "ماده", 0.8, related_article=308),
+        ],
+        deductions=["نتیجه ۱", "نتیجه ۲"],
+        overall_confidence=overall_confidence,
+    )
+
+
+@pytest.fixture
+def builder():
+    builder = ReasoningGraph()
+    builder.build_from_reasoning(_reasoning())
+    return builder
+
+
+def test_nodes_per_layer(builder):
+    types = {node: d["node_type"] for node, d in builder.graph.nodes(data=True)}
+    assert types == {
+        1: NODE_FACT, 2: NODE_FACT, 3: NODE_ARTICLE,
+        4: NODE_DEDUCTION, 5: NODE_DEDUCTION, 6: NODE_VERDICT,
+    }
+    assert builder.graph.nodes[3]["article_number"] == 308
+    assert builder.get_node_layers() == {
+        "FACT": [1, 2], "ARTICLE": [3], "DEDUCTION": [4, 5], "VERDICT": [6],
+    }
+
+
+def test_edges_connect_consecutive_layers(builder):
+    assert dict(((u, v), d["relationship"]) for u, v, d in builder.graph.edges(data=True)) == {
+        (1, 3): REL_APPLIES, (2, 3): REL_APPLIES,
+        (3, 4): REL_LEADS, (3, 5): REL_LEADS,
+        (4, 6): REL_TO, (5, 6): REL_TO,
+    }
+
+
+def test_confidences_are_plain_floats(builder):
+    confidences = [d["confidence"] for _, d in builder.graph.nodes(data=True)]
+    assert all(type(c) is float for c in confidences)
+    assert confidences[1] == 0.9  # Not rounded through float32
+    assert builder.graph.nodes[6]["confidence"] == 0.85
+
+
+def test_to_networkx_matches_built_graph(builder):
+    rebuilt = builder.data.to_networkx()
+    assert dict(rebuilt.nodes(data=True)) == dict(builder.graph.nodes(data=True))
+    assert list(rebuilt.edges(data=True)) == list(builder.graph.edges(data=True))
+
+
+def test_statistics(builder):
+    stats = builder.get_statistics()
+    assert stats["total_nodes"] == 6
+    assert stats["total_edges"] == 6
+    assert (stats["num_facts"], stats["num_articles"], stats["num_deductions"]) == (2, 1, 2)
+    assert stats["has_verdict"] is True
+    assert stats["average_confidence"] == pytest.approx((1.0 + 0.9 + 0.8 * 3 + 0.85) / 6)
+
+
+def test_queries_follow_later_graph_edits(builder):
+    builder.graph.remove_node(1)
+    assert builder.get_node_layers()["FACT"] == [2]
+    assert builder.get_statistics()["num_facts"] == 1
+
+
+def test_builds_are_independent():
+    first, second = ReasoningGraph(), ReasoningGraph()
+    graph = first.build_from_reasoning(_reasoning())
+    graph.remove_node(1)
+
+    assert second.build_from_reasoning(_reasoning()).number_of_nodes() == 6
+    assert graph.graph["content_key"] == second.graph.graph["content_key"]
+
+
+def test_content_key_changes_with_content():
+    key = ReasoningGraph().build_from_reasoning(_reasoning(0.85)).graph["content_key"]
+    assert ReasoningGraph().build_from_reasoning(_reasoning(0.5)).graph["content_key"] != key
@@ -0,0 +1,179 @@
+"""
+Tests for the semantic response cache: similarity lookups, namespaces,
+persistence, concurrent writers and the per-call opt-in.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from config.settings import Settings
+from modules.legal_engine import openai_client
+from modules.legal_engine.base_client import LLMClient
+from modules.legal_engine.openai_client import OpenAIClient
+
+
+def _unit(*values) -> list:
+    vector = np.asarray(values, dtype=np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+# Prompt embeddings: the first two are near-identical (cosine ≈ 0.999)
+EMBEDDINGS = {
+    "پرسش": _unit(1, 0, 0, 0),
+    "پرسش؟": _unit(1, 0.04, 0, 0),
+    "موضوع دیگر": _unit(0, 1, 0, 0),
+}
+
+
+class _StubClient(LLMClient):
+    """Minimal concrete client embedding prompts from EMBEDDINGS."""
+
+    provider_name = "stub"
+    model_name = "stub-model"
+    embedding_dimension = 4
+
+    def __init__(self):
+        super().__init__()
+        self.settings = Settings()
+        self.embedded = []
+
+    def get_completion(self, prompt, **kwargs):
+        return None
+
+    def get_structured_json(self, prompt, **kwargs):
+        return None
+
+    def get_embedding(self, text):
+        self.embedded.append(text)
+        return EMBEDDINGS.get(text)
+
+    def get_embeddings_batch(self, texts):
+        return None
+
+    def count_tokens(self, text):
+        return len(text)
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(LLMClient, "_cache_file", tmp_path / "llm_cache.sqlite3")
+    monkeypatch.setattr(LLMClient, "_cache_db", None)
+    monkeypatch.setattr(LLMClient, "_memory_cache", OrderedDict())
+    monkeypatch.setattr(LLMClient, "_semantic_cache", {})
+    yield
+    if LLMClient._cache_db is not None:
+        LLMClient._cache_db.close()
+
+
+@pytest.fixture
+def client():
+    return _StubClient()
+
+
+def test_similar_prompt_hits(client):
+    slot, cached = client._semantic_cache_lookup("پرسش", None, temperature=0.3)
+    assert cached is None
+    client._semantic_cache_set(*slot, "پاسخ")
+
+    assert client._semantic_cache_lookup("پرسش؟", None, temperature=0.3)[1] == "پاسخ"
+    assert client._semantic_cache_lookup("موضوع دیگر", None, temperature=0.3)[1] is None
+
+
+def test_namespace_separates_parameters(client):
+    slot, _ = client._semantic_cache_lookup("پرسش", "سیستم", temperature=0.3)
+    client._semantic_cache_set(*slot, "پاسخ")
+
+    assert client._semantic_cache_lookup("پرسش", "سیستم", temperature=0.7)[1] is None
+    assert client._semantic_cache_lookup("پرسش", "دیگر", temperature=0.3)[1] is None
+
+
+def test_unembeddable_prompt_is_not_cached(client):
+    assert client._semantic_cache_lookup("ناشناخته", None) == (None, None)
+
+
+def test_entries_are_reloaded_from_sqlite(client, monkeypatch):
+    slot, _ = client._semantic_cache_lookup("پرسش", None)
+    client._semantic_cache_set(*slot, "پاسخ")
+    # A new process starts with no entries in memory
+    monkeypatch.setattr(LLMClient, "_semantic_cache", {})
+
+    assert client._semantic_cache_lookup("پرسش؟", None)[1] == "پاسخ"
+
+
+def test_oldest_entries_are_dropped(client, monkeypatch):
+    monkeypatch.setattr(LLMClient, "_semantic_cache_max_entries", 2)
+    namespace = client._semantic_namespace(None)
+    for i in range(3):
+        client._semantic_cache_set(namespace, np.asarray(_unit(1, i, 0, 0), dtype=np.float32), str(i))
+
+    assert LLMClient._semantic_cache[namespace][1] == ["1", "2"]
+    monkeypatch.setattr(LLMClient, "_semantic_cache", {})
+    assert client._semantic_entries(namespace)[1] == ["1", "2"]
+
+
+def test_concurrent_writers_keep_every_entry(client):
+    namespace = client._semantic_namespace(None)
+    vector = np.asarray(_unit(1, 0, 0, 0), dtype=np.float32)
+
+    def _write(worker):
+        for i in range(25):
+            client._semantic_cache_set(namespace, vector, f"{worker}-{i}")
+
+    threads = [threading.Thread(target=_write, args=(w,)) for w in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    matrix, responses = LLMClient._semantic_cache[namespace]
+    assert len(responses) == matrix.shape[0] == 200
+
+
+# ─── Opt-in from get_completion ──────────────────────────────────────
+
+def _make_openai_client(enabled: bool) -> OpenAIClient:
+    client = OpenAIClient.__new__(OpenAIClient)
+    client._load_cache()
+    client.settings = replace(Settings(), SEMANTIC_CACHE_ENABLED=enabled, EMBEDDING_DIMENSION=4)
+    client._model_name = "gpt-4o"
+    client._rate_limit_errors = ()
+    client._api_errors = ()
+    client._request_bucket = None
+    client._token_bucket = None
+    client.count_tokens = len
+    client.calls = []
+
+    def _create(model, messages, **kwargs):
+        client.calls.append(messages[-1]["content"])
+        message = SimpleNamespace(content=f"پاسخ {len(client.calls)}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def _embed(model, input):
+        return SimpleNamespace(data=[SimpleNamespace(embedding=EMBEDDINGS[input])])
+
+    client.client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=_create)),
+        embeddings=SimpleNamespace(create=_embed),
+    )
+    return client
+
+
+@pytest.mark.parametrize("enabled, opt_in, expected_calls", [
+    (True, True, 1),    # The near-identical second prompt reuses the first answer
+    (True, False, 2),   # Callers must opt in per call
+    (False, True, 2),   # ... and the setting must be on
+])
+def test_completion_semantic_cache_is_opt_in(monkeypatch, enabled, opt_in, expected_calls):
+    monkeypatch.setattr(openai_client.st, "error", lambda *a, **k: None)
+    client = _make_openai_client(enabled)
+
+    first = client.get_completion("پرسش", semantic_cache=opt_in)
+    second = client.get_completion("پرسش؟", semantic_cache=opt_in)
+
+    assert len(client.calls) == expected_calls
+    assert (second == first) is (expected_calls == 1)
@@ -0,0 +1,68 @@
+"""
+Tests for Settings.from_env environment parsing.
+"""
+
+import os
+
+import pytest
+
+from config.settings import Settings
+
+
+@pytest.fixture
+def env(monkeypatch, tmp_path):
+    """Isolate os.environ without Settings variables; return a path for a .env file."""
+    # load_dotenv writes into os.environ, so work on a copy that is restored afterwards
+    monkeypatch.setattr(os, "environ", {
+        name: value for name, value in os.environ.items()
+        if name not in Settings.__dataclass_fields__
+    })
+    return tmp_path / ".env"
+
+
+def test_defaults_without_environment(env):
+    assert Settings.from_env(str(env)) == Settings()
+
+
+def test_casts_by_annotation(env, monkeypatch):
+    monkeypatch.setenv("OPENAI_MAX_TOKENS", "1500")
+    monkeypatch.setenv("OPENAI_TEMPERATURE", "0.5")
+    monkeypatch.setenv("BATCH_ARTICLE_ANALYSIS", "yes")
+    monkeypatch.setenv("RTL_ENABLED", "0")
+    monkeypatch.setenv("AI_PROVIDER", "gemini")
+
+    settings = Settings.from_env(str(env))
+
+    assert settings.OPENAI_MAX_TOKENS == 1500
+    assert settings.OPENAI_TEMPERATURE == 0.5
+    assert settings.BATCH_ARTICLE_ANALYSIS is True
+    assert settings.RTL_ENABLED is False
+    assert settings.AI_PROVIDER == "gemini"
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("true", True), (" True ", True), ("1", True), ("on", True), ("YES", True),
+    ("false", False), ("0", False), ("no", False), ("", False),
+])
+def test_bool_values(env, monkeypatch, raw, expected):
+    monkeypatch.setenv("SEMANTIC_CACHE_ENABLED", raw)
+    assert Settings.from_env(str(env)).SEMANTIC_CACHE_ENABLED is expected
+
+
+def test_env_file_is_read_as_utf8(env):
+    env.write_text("AI_PROVIDER=gemini\nOPENAI_RPM_LIMIT=0\n# توضیح فارسی\n", encoding="utf-8")
+    settings = Settings.from_env(str(env))
+    assert settings.AI_PROVIDER == "gemini"
+    assert settings.OPENAI_RPM_LIMIT == 0
+
+
+def test_environment_overrides_env_file(env, monkeypatch):
+    env.write_text("OPENAI_MODEL=from-file\n", encoding="utf-8")
+    monkeypatch.setenv("OPENAI_MODEL", "from-env")
+    assert Settings.from_env(str(env)).OPENAI_MODEL == "from-env"
+
+
+def test_invalid_number_raises(env, monkeypatch):
+    monkeypatch.setenv("OPENAI_MAX_TOKENS", "many")
+    with pytest.raises(ValueError):
+        Settings.from_env(str(env))
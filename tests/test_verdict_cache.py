@@ -0,0 +1,77 @@
+"""
+Tests for the SQLite-backed verdict cache.
+"""
+
+import pytest
+
+from modules.legal_engine import verdict_cache
+from modules.legal_engine.verdict_cache import VerdictCache
+
+
+class _FakeClock:
+    """Stand-in for the time module with a settable time()."""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _FakeClock()
+    monkeypatch.setattr(verdict_cache, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch, clock):
+    monkeypatch.setattr(VerdictCache, "_cache_file", tmp_path / "verdict_cache.sqlite3")
+    cache = VerdictCache()
+    yield cache
+    cache._db.close()
+
+
+def test_round_trip_and_ttl(cache, clock):
+    key = VerdictCache.make_key("openai", "gpt-4o", 0.2, "پرامپت")
+    fields = {"case_id": "C1", "ruling": "محکومیت خوانده", "confidence": 0.8}
+    assert cache.get(key, max_age=60) is None
+
+    cache.set(key, fields)
+    assert cache.get(key, max_age=60) == fields
+
+    clock.now += 61
+    assert cache.get(key, max_age=60) is None
+    assert cache.get(key, max_age=120) == fields
+
+
+def test_key_covers_request():
+    key = VerdictCache.make_key("openai", "gpt-4o", 0.2, "پرامپت")
+    assert key == VerdictCache.make_key("openai", "gpt-4o", 0.2, "پرامپت")
+    assert key != VerdictCache.make_key("gemini", "gpt-4o", 0.2, "پرامپت")
+    assert key != VerdictCache.make_key("openai", "gpt-4o-mini", 0.2, "پرامپت")
+    assert key != VerdictCache.make_key("openai", "gpt-4o", 0.3, "پرامپت")
+    assert key != VerdictCache.make_key("openai", "gpt-4o", 0.2, "پرامپت دیگر")
+
+
+def test_key_covers_schema_version(monkeypatch):
+    key = VerdictCache.make_key("openai", "gpt-4o", 0.2, "پرامپت")
+    monkeypatch.setattr(verdict_cache, "SCHEMA_VERSION", verdict_cache.SCHEMA_VERSION + 1)
+    assert VerdictCache.make_key("openai", "gpt-4o", 0.2, "پرامپت") != key
+
+
+def test_evicts_oldest(cache, clock, monkeypatch):
+    monkeypatch.setattr(VerdictCache, "_max_entries", 2)
+    for i in range(3):
+        clock.now += 1
+        cache.set(f"k{i}", {"i": i})
+    assert cache.get("k0", max_age=60) is None
+    assert cache.get("k1", max_age=60) == {"i": 1}
+    assert cache.get("k2", max_age=60) == {"i": 2}
+
+
+def test_clear(cache):
+    cache.set("k", {"i": 1})
+    cache.clear()
+    assert cache.get("k", max_age=60) is None
@@ -0,0 +1,252 @@
+"""
+Tests for VerdictGenerator: section splitting, request routing and the
+fallback when a streamed verdict breaks off.
+
+The previous line-scanning implementation is kept here as a reference, so
+the header regex is pinned to its results on representative verdicts.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from config.settings import Settings
+from modules.legal_engine import verdict_generator
+from modules.legal_engine.base_client import StreamInterruptedError
+from modules.legal_engine.entity_extractor import CaseEntities
+from modules.legal_engine.reasoning_engine import ReasoningResult, ReasoningStep
+from modules.legal_engine.verdict_cache import VerdictCache
+from modules.legal_engine.verdict_generator import VerdictGenerator
+
+
+# ─── Reference (previous) implementation ──────────────────────────────
+
+_SECTION_HEADERS = {
+    'summary': ['خلاصه پرونده', 'خلاصه'],
+    'proven_facts': ['واقعیات اثبات شده', 'واقعیات'],
+    'legal_analysis': ['تحلیل حقوقی', 'استدلال حقوقی'],
+    'ruling': ['حکم', 'رأی'],
+    'implementation': ['جزئیات اجرایی', 'اجرا'],
+    'appealable': ['قابل اعتراض', 'اعتراض'],
+}
+
+
+def _legacy_extract_section(text, headers):
+    section_lines = []
+    capturing = False
+    for line in text.split('\n'):
+        line_stripped = line.strip()
+        if any(header in line_stripped for header in headers):
+            capturing = True
+            continue
+        if capturing and line_stripped:
+            if line_stripped.startswith(('##', '**', '۱.', '۲.', '۳.', '۴.', '۵.')):
+                if not any(h in line_stripped for h in headers):
+                    break
+        if capturing and line_stripped:
+            section_lines.append(line_stripped)
+    return '\n'.join(section_lines).strip()
+
+
+# ─── Verdict sections ─────────────────────────────────────────────────
+
+MARKDOWN_VERDICT = """## خلاصه پرونده
+خواهان مدعی است که خوانده مبلغ قرض را بازنگردانده.
+
+## واقعیات اثبات شده
+- سند عادی قرض ارائه شد.
+- خوانده دریافت وجه را انکار نکرد.
+
+## تحلیل حقوقی
+طبق ماده ۲۶۵ قانون مدنی، پرداخت ظهور در عدم تبرع دارد.
+
+## حکم نهایی
+خوانده به پرداخت مبلغ پانصد میلیون ریال محکوم می‌شود.
+
+## جزئیات اجرایی
+پرداخت ظرف یک ماه از ابلاغ.
+
+## قابلیت اعتراض
+این رأی ظرف ۲۰ روز قابل تجدیدنظر است.
+"""
+
+NUMBERED_VERDICT = """۱. خلاصه پرونده
+مطالبه اجاره‌بها.
+۲. واقعیات اثبات شده
+تأخیر سه‌ماهه.
+۳. تحلیل حقوقی
+مستأجر ملزم به پرداخت است.
+۴. حکم
+الزام به پرداخت.
+۵. جزئیات اجرایی
+پرداخت فوری.
+"""
+
+BOLD_VERDICT = """**خلاصه پرونده:**
+دعوای مطالبه وجه.
+
+**واقعیات اثبات شده:**
+قرارداد کتبی وجود دارد.
+
+**تحلیل حقوقی:**
+ماده ۱۰ قانون مدنی قرارداد را نافذ می‌داند.
+
+**حکم:**
+محکومیت خوانده.
+
+**جزئیات اجرایی:**
+از طریق اجرای احکام.
+
+**قابلیت اعتراض:**
+ظرف بیست روز در دادگاه تجدیدنظر.
+"""
+
+
+@pytest.mark.parametrize("text", [MARKDOWN_VERDICT, NUMBERED_VERDICT])
+def test_split_sections_matches_legacy_parser(text):
+    sections = VerdictGenerator._split_sections(text)
+    for field, headers in _SECTION_HEADERS.items():
+        assert sections[field] == _legacy_extract_section(text, headers)
+
+
+def test_split_sections_ignores_header_words_inside_body():
+    # The old substring check took 'اجرای احکام' for an 'اجرا' header and
+    # returned an empty implementation section
+    sections = VerdictGenerator._split_sections(BOLD_VERDICT)
+    assert sections == {
+        'summary': 'دعوای مطالبه وجه.',
+        'proven_facts': 'قرارداد کتبی وجود دارد.',
+        'legal_analysis': 'ماده ۱۰ قانون مدنی قرارداد را نافذ می‌داند.',
+        'ruling': 'محکومیت خوانده.',
+        'implementation': 'از طریق اجرای احکام.',
+        'appealable': 'ظرف بیست روز در دادگاه تجدیدنظر.',
+    }
+
+
+def test_split_sections_without_headers_is_empty():
+    sections = VerdictGenerator._split_sections("متن آزاد بدون عنوان بخش")
+    assert not any(sections.values())
+
+
+# ─── Request routing ──────────────────────────────────────────────────
+
+def _make_generator(economy_model: str) -> VerdictGenerator:
+    generator = VerdictGenerator.__new__(VerdictGenerator)
+    generator.settings = Settings()
+    generator.client = SimpleNamespace(provider_name="openai", model_name="gpt-4o")
+    generator.economy_client = SimpleNamespace(provider_name="openai", model_name=economy_model)
+    generator.cache = SimpleNamespace(make_key=VerdictCache.make_key)
+    return generator
+
+
+def _reasoning(confidence: float) -> ReasoningResult:
+    return ReasoningResult(
+        case_id="C1",
+        entities=CaseEntities(plaintiff="الف", defendant="ب", key_facts=["واقعیت"]),
+        retrieved_articles=[],
+        reasoning_steps=[ReasoningStep("ARTICLE", "تحلیل", 0.8, related_article=308)],
+        deductions=["نتیجه"],
+        overall_confidence=confidence,
+    )
+
+
+def test_economy_model_is_opt_in():
+    assert Settings().OPENAI_ECONOMY_MODEL == ""
+    assert Settings().GEMINI_ECONOMY_MODEL == ""
+
+
+@pytest.mark.parametrize("confidence, expected_model", [
+    (0.9, "gpt-4o-mini"),  # Confident reasoning is drafted by the economy model
+    (0.3, "gpt-4o"),       # Uncertain reasoning escalates to the main model
+])
+def test_build_request_routes_by_confidence(confidence, expected_model):
+    generator = _make_generator("gpt-4o-mini")
+    client, prompt, cache_key = generator._build_request(_reasoning(confidence))
+
+    assert client.model_name == expected_model
+    assert cache_key == VerdictCache.make_key("openai", expected_model, 0.2, prompt)
+
+
+# ─── Cached verdicts ──────────────────────────────────────────────────
+
+_CACHED_FIELDS = {
+    "summary": "خلاصه", "proven_facts": "واقعیات", "legal_analysis": "تحلیل",
+    "ruling": "حکم", "implementation": "اجرا", "appealable": "اعتراض",
+}
+
+
+@pytest.mark.parametrize("fields, hit", [
+    (_CACHED_FIELDS, True),
+    ({**_CACHED_FIELDS, "precedents": "سابقه"}, False),  # Field since removed
+    ({k: v for k, v in _CACHED_FIELDS.items() if k != "appealable"}, False),  # Field since added
+    (["not", "a", "dict"], False),
+])
+def test_cached_verdict_with_other_layout_is_a_miss(fields, hit):
+    generator = _make_generator("")
+    generator.cache = SimpleNamespace(get=lambda key, max_age: fields)
+
+    verdict = generator._get_cached_verdict(_reasoning(0.9), "key")
+
+    assert (verdict is not None) is hit
+    if hit:
+        assert verdict.case_id == "C1" and verdict.confidence == 0.9
+
+
+# ─── Interrupted stream ───────────────────────────────────────────────
+
+class _FakePlaceholder:
+    def __init__(self):
+        self.text = None
+
+    def markdown(self, text):
+        self.text = text
+
+    def empty(self):
+        self.text = None
+
+
+class _BrokenStreamClient:
+    """Streams half a verdict, then breaks off; get_completion returns it whole."""
+
+    provider_name = "openai"
+    model_name = "gpt-4o"
+
+    def __init__(self, text: str):
+        self.text = text
+        self.completion_calls = []
+
+    def get_completion_stream(self, **kwargs):
+        for line in self.text.splitlines(keepends=True)[:4]:
+            yield line
+        raise StreamInterruptedError("connection reset")
+
+    def get_completion(self, **kwargs):
+        self.completion_calls.append(kwargs)
+        return self.text
+
+
+def test_interrupted_stream_falls_back_to_full_completion(monkeypatch):
+    placeholder = _FakePlaceholder()
+    monkeypatch.setattr(verdict_generator, "st", SimpleNamespace(
+        info=lambda *a: None, success=lambda *a: None, warning=lambda *a: None,
+        error=lambda *a: None, empty=lambda: placeholder,
+    ))
+    monkeypatch.setattr(verdict_generator, "STREAM_RENDER_INTERVAL", 1)
+    client = _BrokenStreamClient(MARKDOWN_VERDICT)
+    stored = {}
+    generator = _make_generator("")
+    generator.client = generator.economy_client = client
+    generator.cache = SimpleNamespace(
+        make_key=VerdictCache.make_key,
+        get=lambda key, max_age: None,
+        set=stored.__setitem__,
+    )
+
+    verdict = generator.generate_verdict(_reasoning(0.3))
+
+    assert len(client.completion_calls) == 1
+    assert client.completion_calls[0]["use_cache"] is False
+    assert placeholder.text is None  # The partial text is cleared
+    assert verdict.ruling == "خوانده به پرداخت مبلغ پانصد میلیون ریال محکوم می‌شود."
+    assert verdict.implementation == "پرداخت ظرف یک ماه از ابلاغ."
+    assert len(stored) == 1